@@ -61,7 +61,7 @@ const App: React.FC = () => {
 
           // Map Backend Data to Frontend Type
           const mappedProperties: Property[] = data.data.map((item: any, index: number) => ({
-            id: item.link || `prop-${index}`,
+            id: item.id || item.link || `prop-${index}`,
             title: item.title,
             location: {
               city: 'Salvador',
@@ -74,7 +74,7 @@ const App: React.FC = () => {
             type: 'apartment',
             tags: ['Premium', 'Vista Mar'],
             aiGeneratedTitle: item.ai_title,
-            priceHistory: item.price_history || []
+            priceHistory: item.price_history // Carregado sob demanda pelo card (/price-history)
           }));
 
           if (mappedProperties.length > 0) {
@@ -454,6 +454,18 @@ const ValuationModule: React.FC = () => {
 // --- Property Card with "PropertyGate" (Blur Logic) & Charts ---
 const PropertyCard: React.FC<{ property: Property; onUnlock: () => void }> = ({ property, onUnlock }) => {
   const isLuxury = property.price >= 1500000;
+  const [priceHistory, setPriceHistory] = useState(property.priceHistory);
+
+  // Histórico fora do payload da listagem: buscar só os pontos que o mini gráfico exibe
+  useEffect(() => {
+    if (property.priceHistory) return;
+    let cancelled = false;
+    fetch(`http://localhost:8000/properties/${encodeURIComponent(property.id)}/price-history?max_points=24`)
+      .then(response => (response.ok ? response.json() : { data: [] }))
+      .then(data => { if (!cancelled) setPriceHistory(data.data); })
+      .catch(() => { if (!cancelled) setPriceHistory([]); });
+    return () => { cancelled = true; };
+  }, [property.id, property.priceHistory]);
 
   return (
     <div className="group bg-[#121212] border border-white/10 rounded-2xl overflow-hidden hover:border-blue-500/30 transition-all duration-500 flex flex-col relative hover:-translate-y-2 shadow-xl shadow-black/50">
@@ -523,7 +535,7 @@ const PropertyCard: React.FC<{ property: Property; onUnlock: () => void }> = ({
         {/* Price History Mini Chart */}
         <div className="h-16 w-full mb-4 opacity-50 hover:opacity-100 transition-opacity">
           <ResponsiveContainer width="100%" height="100%">
-            <AreaChart data={property.priceHistory}>
+            <AreaChart data={priceHistory}>
               <defs>
                 <linearGradient id={`grad${property.id}`} x1="0" y1="0" x2="0" y2="1">
                   <stop offset="5%" stopColor="#2563eb" stopOpacity={0.3} />
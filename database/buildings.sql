@@ -1,6 +1,6 @@
 CREATE TABLE IF NOT EXISTS buildings (
     id SERIAL PRIMARY KEY,
-    name VARCHAR(255) NOT NULL UNIQUE,
+    name VARCHAR(255) NOT NULL, -- Display name; buildings are identified by slug
     slug VARCHAR(255) NOT NULL UNIQUE,
     neighborhood VARCHAR(100),
     description TEXT, -- Generated by AI
@@ -10,3 +10,6 @@ CREATE TABLE IF NOT EXISTS buildings (
 );
 
 CREATE INDEX idx_buildings_slug ON buildings(slug);
+
+-- Existing databases: slugs are derived from the building key, names may repeat
+ALTER TABLE buildings DROP CONSTRAINT IF EXISTS buildings_name_key;
@@ -0,0 +1,10 @@
+CREATE TABLE IF NOT EXISTS slugs (
+    slug VARCHAR(255) PRIMARY KEY,
+    link VARCHAR(500) NOT NULL,
+    base VARCHAR(255) NOT NULL, -- Semantic slug before disambiguation
+    active BOOLEAN NOT NULL DEFAULT TRUE, -- Retired slugs redirect to the listing's active slug
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    retired_at TIMESTAMP
+);
+
+CREATE INDEX idx_slugs_link ON slugs(link);
@@ -1,10 +1,12 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Header, Query
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
+import json
 import logging
 import sys
 import asyncio
 import os
+from contextlib import asynccontextmanager
 from datetime import datetime
 from dotenv import load_dotenv
 
@@ -24,16 +26,67 @@ from services.value_generator import ValueGenerator
 from services.seo.aggregator import EntityAggregator
 from services.seo.metadata import MetadataGenerator
 from services.seo.schema import SchemaFactory
-from fastapi.responses import Response
+from services.inventory_cache import InventoryCache
+from services.inventory_index import PRICE_PROFILES, SORT_OPTIONS, InventoryIndex, decode_cursor, encode_cursor
+from services.storage import Storage
+from services.browser_pool import BrowserPool
+from services.llm_cache import get_llm_cache
+from services.executor import executor
+from services.price_history import DOWNSAMPLING_METHODS, ITEM_HISTORY_POINTS
+from services.search_index import prefix_token, search_index
+from services.building_index import building_index
+from services.slug_registry import SlugRegistry
+from services.dossier_cache import DossierCache, listing_key
+from services.enrichment_cache import EnrichmentCache
+from services.seo.sitemap import INDEX_NAME as SITEMAP_INDEX, SitemapBuilder
+from services.http_utils import etag_response, file_response
+from fastapi.responses import JSONResponse, RedirectResponse, Response, StreamingResponse
 
 # Configuração de Logs
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("BahiaSatelliteAPI")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pools para trabalho bloqueante (I/O em threads, PDF em processos)
+    executor.start(
+        io_workers=int(os.getenv("IO_WORKERS", "16")),
+        cpu_workers=int(os.getenv("CPU_WORKERS", "2"))
+    )
+    # Aquecer o cache com o inventário persistido (evita coleta a frio após restart)
+    await executor.run_io(slug_registry.load)
+    persisted = await executor.run_io(storage.load_properties)
+    if persisted:
+        # Imóveis anteriores ao registro de slugs recebem slug único (antes de semear os caches)
+        if slug_registry.adopt(persisted):
+            await executor.run_io(slug_registry.flush)
+        slug_registry.track(persisted)
+        enrichment_cache.seed(persisted)
+    # Imóveis retirados do ar ficam no banco (histórico/redirecionamentos), mas não no inventário servido
+    active = [p for p in persisted if p.get('status') != 'DELISTED']
+    if active:
+        inventory_cache.seed(1, active)
+        inventory_indexes[1] = await executor.run_io(InventoryIndex, active)
+        await executor.run_io(search_index.upsert_many, active)
+        logger.info(f"Cache de inventário aquecido com {len(active)} imóveis do banco")
+    schedule_background(publish_site(active))
+    # Navegador persistente para o Ghost Validator (evita cold start por lead)
+    try:
+        await browser_pool.start()
+    except Exception as e:
+        # Sem Chromium no host: a API sobe mesmo assim; o pool tenta de novo no primeiro uso
+        logger.error(f"Falha ao iniciar o pool de navegador (nova tentativa no primeiro uso): {e}")
+    yield
+    # Encerrar pools de conexão mantidos pelos serviços
+    await collector.aclose()
+    await browser_pool.stop()
+    executor.shutdown()
+
 app = FastAPI(
     title="Bahia Satellite - Stealth Predator Engine",
     description="Backend Headless para Inteligência Imobiliária",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configuração de CORS
@@ -49,15 +102,39 @@ app.add_middleware(
 # Instanciação dos Serviços
 # NOTA: Em produção, usar injeção de dependência e gestão de segredos adequada (.env)
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "") # Definir via variável de ambiente
-collector = LopesScraper()  # Scraper otimizado para Windows (requests + BeautifulSoup)
+storage = Storage()  # DATABASE_URL (padrão: SQLite local)
+collector = LopesScraper(  # Scraper otimizado para Windows (httpx/requests + BeautifulSoup)
+    requests_per_second=float(os.getenv("LOPES_RATE_LIMIT", "0.5")),
+    burst=int(os.getenv("LOPES_RATE_BURST", "2")),
+    concurrency=int(os.getenv("LOPES_CONCURRENCY", "4")),
+    storage=storage
+)
+# Profundidade máxima de coleta pedida pela API (?pages=): cada valor é uma coleta e uma entrada do cache
+MAX_PAGES = int(os.getenv("MAX_INVENTORY_PAGES", "20"))
 refiner = ChameleonRefiner(api_key=GEMINI_API_KEY) if GEMINI_API_KEY else None
+REFINER_BATCH_SIZE = int(os.getenv("REFINER_BATCH_SIZE", "10"))
+# Upgrade opcional das meta descriptions com IA (0 = desligado; só templates locais)
+SEO_LLM_UPGRADE_TOP_N = int(os.getenv("SEO_LLM_UPGRADE_TOP_N", "0"))
+# Descrições de edifícios geradas por execução do job (chamadas ao Gemini)
+BUILDING_DESCRIPTION_BATCH = int(os.getenv("BUILDING_DESCRIPTION_BATCH", "5"))
 radar = StealthRadar()
-validator = GhostValidator()
+browser_pool = BrowserPool(
+    max_concurrency=int(os.getenv("VALIDATOR_MAX_CONCURRENCY", "4")),
+    max_uses=int(os.getenv("VALIDATOR_CONTEXT_MAX_USES", "50"))
+)
+validator = GhostValidator(pool=browser_pool)
 notifier = ShadowNotifier()
 value_gen = ValueGenerator(api_key=GEMINI_API_KEY)
 seo_aggregator = EntityAggregator(api_key=GEMINI_API_KEY)
 seo_metadata = MetadataGenerator(api_key=GEMINI_API_KEY)
 seo_schema = SchemaFactory()
+enrichment_cache = EnrichmentCache(max_entries=int(os.getenv("ENRICHMENT_CACHE_MAX_ENTRIES", "200000")))
+sitemap_builder = SitemapBuilder()  # SITEMAP_DIR / SITE_BASE_URL
+slug_registry = SlugRegistry(storage)  # Slugs únicos e estáveis + índice slug -> imóvel
+dossier_cache = DossierCache(
+    directory=os.getenv("DOSSIER_CACHE_DIR", os.path.join(".cache", "dossiers")),
+    max_bytes=int(float(os.getenv("DOSSIER_CACHE_MAX_MB", "200")) * 1024 * 1024)
+)
 
 # Modelos Pydantic
 class LeadUnlockRequest(BaseModel):
@@ -73,53 +150,369 @@ class DossierRequest(BaseModel):
     user_phone: str
     property_data: Optional[dict] = None # Opcional: passar dados se não tiver ID no banco
 
+# Cache de Inventário
+
+def enrich_seo(prop: dict) -> dict:
+    """
+    Metadados, slug e Schema JSON-LD de um imóvel (local, microssegundos por imóvel).
+    """
+    try:
+        # 1. Gerar Metadados e Slug
+        seo_data = seo_metadata.generate_seo_data(prop)
+        prop.update(seo_data)
+        if prop.get('link'):
+            # Slug semântico -> slug único e definitivo (sufixo estável em caso de colisão)
+            prop['seo_slug'] = slug_registry.assign(prop['link'], seo_data['seo_slug'])
+        
+        # 2. Gerar Schema JSON-LD
+        prop['schema_json'] = seo_schema.build_json_ld(prop)
+    except Exception as e:
+        logger.warning(f"Erro no SEO: {e}")
+    return prop
+
+async def refine_and_enrich(properties: List[dict]) -> Tuple[int, int]:
+    """
+    Refinamento com IA em lotes + enriquecimento SEO, reaproveitando o enriquecimento de imóveis
+    cujo conteúdo não mudou (impressão digital). Usado pelo snapshot e pelo stream.
+    Retorna (imóveis recalculados, imóveis enviados ao refinamento).
+    """
+    stale = [prop for prop in properties if enrichment_cache.apply(prop) is None]
+    unrefined = [prop for prop in properties if not prop.get('refined')] if refiner else []
+    
+    # Refinamento Opcional (se API Key estiver configurada)
+    if unrefined:
+        try:
+            # Vários anúncios por prompt: ~N vezes menos requisições
+            await refiner.refine_batch_async(unrefined, batch_size=REFINER_BATCH_SIZE)
+        except Exception as e:
+            logger.warning(f"Erro no refinamento: {e}")
+    
+    # Enriquecimento SEO (templates locais, sem chamadas de rede)
+    for prop in stale:
+        enrich_seo(prop)
+    for prop in {id(p): p for p in stale + unrefined}.values():
+        enrichment_cache.store(prop)
+    return len(stale), len(unrefined)
+
+async def load_inventory(pages: int) -> List[dict]:
+    """
+    Coleta + refinamento + enriquecimento SEO. Executado pelo cache de inventário.
+    """
+    logger.info(f"Coletando imóveis da Lopes (páginas: {pages})")
+    
+    # Coleta assíncrona (páginas em paralelo, limitada pelo token bucket por host)
+    properties = await collector.scrape_inventory_async(max_pages=pages)
+    
+    logger.info(f"✅ {len(properties)} imóveis coletados com sucesso")
+    
+    stale, unrefined = await refine_and_enrich(properties)
+    logger.info(
+        f"Enriquecimento: {len(properties) - stale} reaproveitados, {stale} recalculados, "
+        f"{unrefined} enviados ao refinamento"
+    )
+    if SEO_LLM_UPGRADE_TOP_N > 0:
+        # Upgrade com IA fora da requisição: não atrasa a entrega do snapshot
+        schedule_background(upgrade_meta_descriptions(properties))
+
+    slug_registry.track(properties)
+
+    # Persistir snapshot enriquecido (slugs emitidos antes dos imóveis que os usam)
+    try:
+        await executor.run_io(slug_registry.flush)
+        await executor.run_io(storage.upsert_properties, properties)
+        # Imóveis deslistados pelo scheduler saem dos índices servidos
+        await remove_delisted()
+        # Edifícios, sitemaps e descrições fora da requisição
+        schedule_background(publish_site(properties))
+    except Exception as e:
+        logger.error(f"Erro ao persistir imóveis: {e}")
+
+    # Índices de filtro/ordenação do novo snapshot (prontos antes de o cache passar a servi-lo)
+    inventory_indexes[pages] = await executor.run_io(InventoryIndex, properties)
+    # Busca textual: atualização incremental (só imóveis com texto alterado são reindexados)
+    await executor.run_io(search_index.upsert_many, properties)
+
+    return properties
+
+async def remove_delisted():
+    """
+    Remove da busca e dos edifícios os imóveis que o scheduler marcou como DELISTED.
+    Uma coleta parcial da API não prova que um imóvel saiu do ar; só a varredura completa do scheduler.
+    """
+    delisted = await executor.run_io(storage.load_delisted_links)
+    if delisted:
+        removed = await executor.run_io(search_index.remove_many, delisted)
+        await executor.run_io(building_index.remove_many, delisted)
+        if removed:
+            logger.info(f"{removed} imóveis deslistados removidos da busca")
+
+# Índices por snapshot do cache (chave: número de páginas)
+inventory_indexes: Dict[int, InventoryIndex] = {}
+
+async def get_inventory_index(pages: int, properties: List[dict]) -> InventoryIndex:
+    index = inventory_indexes.get(pages)
+    if index is None or index.source is not properties:
+        index = inventory_indexes[pages] = await executor.run_io(InventoryIndex, properties)
+    return index
+
+BUILDING_LISTING_FIELDS = ('id', 'title', 'price', 'bedrooms', 'area', 'seo_slug', 'link')
+
+async def sync_buildings(properties: List[dict]):
+    """
+    Atualiza o índice de edifícios (regex só para títulos alterados) e persiste apenas os
+    edifícios que mudaram, com as características citadas nos anúncios.
+    """
+    await executor.run_io(building_index.upsert_many, properties)
+    records = []
+    for key in building_index.drain_changes():
+        group = building_index.group(key)
+        if group is None:
+            continue
+        record = seo_aggregator.building_record(group)
+        record['features'] = seo_aggregator.extract_building_features(group['properties'])
+        for prop in group['properties']:
+            prop['building_slug'] = record['slug']
+        records.append(record)
+    if records:
+        await executor.run_io(storage.upsert_buildings, records)
+        logger.info(f"Edifícios atualizados: {len(records)}")
+
+async def generate_building_descriptions():
+    """
+    Gera com IA a descrição dos edifícios que ainda não têm (até BUILDING_DESCRIPTION_BATCH por execução).
+    """
+    if seo_aggregator.model is None:
+        return
+    pending = await executor.run_io(storage.load_buildings_without_description, BUILDING_DESCRIPTION_BATCH)
+    for building in pending:
+        description = await seo_aggregator.generate_building_description_async(
+            building['name'], building.get('neighborhood') or "Salvador"
+        )
+        if description:
+            await executor.run_io(storage.upsert_buildings, [dict(building, description=description)])
+    if pending:
+        logger.info(f"Descrições de edifícios geradas: {len(pending)}")
+
+async def publish_site(properties: List[dict]):
+    """
+    Job de background após cada snapshot: edifícios -> sitemaps -> descrições com IA (a parte lenta por último).
+    """
+    await sync_buildings(properties)
+    await executor.run_io(sitemap_builder.build, storage, building_index)
+    await generate_building_descriptions()
+
+UPGRADED_SEO_FIELDS = ('meta_description', 'meta_description_source', 'schema_json')
+
+def build_upgraded_seo(properties: List[dict]) -> List[dict]:
+    """
+    Cópias com meta description reescrita pela IA e JSON-LD refeito (roda no thread pool).
+    """
+    upgraded = seo_metadata.upgrade_meta_descriptions(properties, SEO_LLM_UPGRADE_TOP_N)
+    for prop in upgraded:
+        prop['schema_json'] = seo_schema.build_json_ld(prop)
+    return upgraded
+
+async def upgrade_meta_descriptions(properties: List[dict]):
+    """
+    Reescreve com o Gemini as meta descriptions dos imóveis mais valiosos e atualiza o JSON-LD.
+    O trabalho é feito em cópias; o snapshot servido só muda no event loop, depois de persistido.
+    """
+    upgraded = await executor.run_io(build_upgraded_seo, properties)
+    if not upgraded:
+        return
+    try:
+        await executor.run_io(storage.upsert_properties, upgraded)
+    except Exception as e:
+        logger.error(f"Erro ao persistir meta descriptions: {e}")
+    by_link = {prop['link']: prop for prop in upgraded if prop.get('link')}
+    for prop in properties:
+        new = by_link.get(prop.get('link'))
+        if new is not None:
+            prop.update({field: new[field] for field in UPGRADED_SEO_FIELDS})
+            enrichment_cache.store(prop)
+
+background_jobs: set = set()
+
+def schedule_background(coro):
+    """
+    Dispara uma tarefa sem aguardar (mantendo a referência até terminar).
+    """
+    task = asyncio.ensure_future(coro)
+    background_jobs.add(task)
+    task.add_done_callback(_background_done)
+    return task
+
+def _background_done(task: asyncio.Task):
+    background_jobs.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Erro em tarefa de background: {task.exception()}")
+
+inventory_cache = InventoryCache(
+    loader=load_inventory,
+    ttl_seconds=float(os.getenv("INVENTORY_CACHE_TTL", "900"))
+)
+
+async def stream_inventory(pages: int):
+    """
+    Coleta ao vivo emitindo um imóvel enriquecido por linha (NDJSON) assim que cada página é parseada.
+    Com o refinador, os imóveis saem em lotes de REFINER_BATCH_SIZE, refinados como no modo snapshot.
+    """
+    batch_size = REFINER_BATCH_SIZE if refiner else 1
+    batch: List[dict] = []
+    async for prop in collector.iter_inventory(max_pages=pages):
+        batch.append(prop)
+        if len(batch) < batch_size:
+            continue
+        await refine_and_enrich(batch)
+        for item in batch:
+            yield json.dumps(item, ensure_ascii=False) + "\n"
+        batch = []
+    if batch:
+        await refine_and_enrich(batch)
+        for item in batch:
+            yield json.dumps(item, ensure_ascii=False) + "\n"
+
 # Rotas
 
 @app.get("/")
 async def root():
     return {"status": "online", "system": "Bahia Satellite Stealth Engine"}
 
+def with_price_history(properties: List[dict]) -> List[dict]:
+    """
+    Cópias dos imóveis com um histórico de preços resumido (apenas com ?include_history=true).
+    """
+    return [
+        dict(prop, price_history=collector.price_history.get_history(prop.get('link', ''), max_points=ITEM_HISTORY_POINTS))
+        for prop in properties
+    ]
+
 @app.get("/properties")
-async def get_properties(pages: int = 1):
+async def get_properties(
+    pages: int = Query(1, ge=1, le=MAX_PAGES),
+    stream: Optional[str] = None,
+    include_history: bool = False,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    neighborhoods: List[str] = Query([]),
+    profile: str = "all",
+    bedrooms: Optional[int] = Query(None, ge=0),
+    sort: str = "relevance",
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None
+):
     """
-    Vitrine: Coleta imóveis em tempo real da Lopes.com.br
+    Vitrine: Serve o snapshot do inventário da Lopes.com.br (stale-while-revalidate)
+    ou, com ?stream=ndjson, transmite a coleta ao vivo item a item.
+    Filtros do frontend (FilterState), ordenação e paginação por cursor são resolvidos
+    nos índices do snapshot; a resposta traz uma página por vez.
+    O histórico de preços fica fora do payload; use /properties/{id}/price-history.
     """
+    if stream == "ndjson":
+        return StreamingResponse(stream_inventory(pages), media_type="application/x-ndjson")
+    if stream is not None:
+        raise HTTPException(status_code=400, detail="Modo de stream não suportado. Use stream=ndjson.")
+    if profile != "all" and profile not in PRICE_PROFILES:
+        raise HTTPException(status_code=400, detail=f"Perfil inválido. Use: all, {', '.join(PRICE_PROFILES)}.")
+    if sort not in SORT_OPTIONS:
+        raise HTTPException(status_code=400, detail=f"Ordenação inválida. Use: {', '.join(SORT_OPTIONS)}.")
     try:
-        logger.info(f"Coletando imóveis da Lopes (páginas: {pages})")
-        
-        # Usar o scraper síncrono (requests + BeautifulSoup)
-        properties = collector.scrape_inventory(max_pages=pages)
-        
-        logger.info(f"✅ {len(properties)} imóveis coletados com sucesso")
-        
-        # Refinamento Opcional (se API Key estiver configurada)
-        if refiner and len(properties) > 0:
-            logger.info("Aplicando refinamento com IA...")
-            for prop in properties[:5]:  # Refinar apenas os primeiros 5 para economizar tokens
-                try:
-                    refiner.refine_property(prop)
-                except Exception as e:
-                    logger.warning(f"Erro no refinamento: {e}")
-        
-        # Enriquecimento SEO
-        for prop in properties:
-            try:
-                # 1. Gerar Metadados e Slug
-                seo_data = seo_metadata.generate_seo_data(prop)
-                prop.update(seo_data)
-                
-                # 2. Gerar Schema JSON-LD
-                prop['schema_json'] = seo_schema.build_json_ld(prop)
-            except Exception as e:
-                logger.warning(f"Erro no SEO: {e}")
-
-        return {"count": len(properties), "data": properties}
+        offset = decode_cursor(cursor) if cursor else 0
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido.")
+
+    # Aceita ?neighborhoods=A&neighborhoods=B e ?neighborhoods=A,B
+    neighborhoods = [n.strip() for value in neighborhoods for n in value.split(",") if n.strip()]
+
+    try:
+        properties, cache_info = await inventory_cache.get(pages)
+        index = await get_inventory_index(pages, properties)
+        page, total = index.query(
+            min_price=min_price,
+            max_price=max_price,
+            neighborhoods=neighborhoods,
+            profile=profile,
+            bedrooms=bedrooms,
+            sort=sort,
+            limit=limit,
+            offset=offset
+        )
+        if include_history:
+            page = with_price_history(page)
+        next_offset = offset + len(page)
+        return JSONResponse(
+            content={
+                "count": len(page),
+                "total": total,
+                "next_cursor": encode_cursor(next_offset) if next_offset < total else None,
+                "data": page
+            },
+            headers=inventory_cache.headers(cache_info)
+        )
     
     except Exception as e:
         logger.error(f"Erro ao coletar imóveis: {e}")
         # Retornar erro em vez de mock data
         raise HTTPException(status_code=500, detail=f"Erro ao coletar imóveis: {str(e)}")
 
+@app.get("/properties/{property_id}/price-history")
+async def get_price_history(
+    property_id: str,
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    max_points: int = Query(200, ge=1, le=5000),
+    method: str = "lttb"
+):
+    """
+    Série de preços de um imóvel, recortada por período e reduzida no servidor
+    (LTTB ou min/max por balde) para o número de pontos que o gráfico exibe.
+    """
+    if method not in DOWNSAMPLING_METHODS:
+        raise HTTPException(status_code=400, detail=f"Método inválido. Use: {', '.join(DOWNSAMPLING_METHODS)}.")
+
+    history = collector.price_history
+    link = history.link_for(property_id)
+    if link is None:
+        raise HTTPException(status_code=404, detail="Imóvel sem histórico de preços.")
+
+    points = history.get_history(link, start=start, end=end, max_points=max_points, method=method)
+    return {
+        "id": property_id,
+        "link": link,
+        "method": method,
+        "count": len(points),
+        "data": points
+    }
+
+@app.get("/search")
+async def search_properties(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None
+):
+    """
+    Busca textual (BM25, sem acentos) em título, descrição, textos da IA e bairro.
+    O último termo é completado por prefixo ("vista mar hor" encontra "Horto").
+    """
+    try:
+        offset = decode_cursor(cursor) if cursor else 0
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor inválido.")
+
+    # Fora do event loop: uma reindexação em andamento segura o lock do índice
+    hits, total = await executor.run_io(search_index.search, q, limit=limit, offset=offset)
+    last_word = prefix_token(q)
+    suggestions = await executor.run_io(search_index.complete, last_word, limit=5) if last_word else []
+    next_offset = offset + len(hits)
+    return {
+        "query": q,
+        "count": len(hits),
+        "total": total,
+        "next_cursor": encode_cursor(next_offset) if next_offset < total else None,
+        "suggestions": suggestions,
+        "data": [dict(prop, score=round(score, 4)) for prop, score in hits]
+    }
+
 @app.post("/leads/unlock")
 async def unlock_lead(request: LeadUnlockRequest, background_tasks: BackgroundTasks):
     """
@@ -152,12 +545,71 @@ async def run_radar(request: RadarRequest):
     Gatilho manual para o Stealth Radar (OSINT).
     """
     try:
-        results = radar.run_radar(max_results_per_dork=request.max_results)
+        results = await radar.run_radar_async(max_results_per_dork=request.max_results)
         return {"status": "completed", "leads_found": len(results), "data": results}
     except Exception as e:
         logger.error(f"Erro no Radar: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/properties/{property_id}/schema")
+async def get_property_schema(property_id: str):
+    """
+    JSON-LD (schema.org RealEstateListing) do imóvel, servido já serializado do cache de enriquecimento.
+    """
+    content = enrichment_cache.schema_bytes(property_id)
+    if content is None:
+        raise HTTPException(status_code=404, detail="Schema não encontrado para este imóvel.")
+    return Response(content=content, media_type="application/ld+json")
+
+@app.get("/imoveis/{slug}")
+async def get_property_page(slug: str):
+    """
+    Página do imóvel pelo slug (lookup O(1) no registro de slugs).
+    Slugs aposentados redirecionam (301) para o slug atual; imóveis deslistados retornam 410.
+    """
+    prop, active = slug_registry.lookup(slug)
+    if active is None:
+        raise HTTPException(status_code=404, detail="Imóvel não encontrado")
+    if active != slug:
+        return RedirectResponse(url=f"/imoveis/{active}", status_code=301)
+    if prop is None or prop.get('status') == 'DELISTED':
+        raise HTTPException(status_code=410, detail="Imóvel não está mais disponível")
+    return prop
+
+@app.get("/admin/enrichment-cache")
+async def enrichment_cache_stats():
+    """
+    Estatísticas do cache de enriquecimento (reaproveitamento entre coletas).
+    """
+    return enrichment_cache.stats()
+
+@app.get("/admin/llm-cache")
+async def llm_cache_stats():
+    """
+    Estatísticas do cache de respostas do Gemini (hits/misses/tamanho).
+    """
+    return get_llm_cache().stats()
+
+# Gerações de dossiê em andamento (impressão digital do imóvel -> tarefa)
+dossier_jobs: Dict[str, asyncio.Future] = {}
+
+async def build_dossier(listing: str, prop_data: dict) -> Tuple[str, dict]:
+    """
+    Tese (Gemini) + PDF renderizado e registrado no cache. Retorna (id do dossiê, tese).
+    """
+    # 4. Gerar Tese de Investimento (Gemini)
+    thesis = await value_gen.generate_renovation_vision_async(prop_data)
+    if "error" in thesis:
+        raise HTTPException(status_code=500, detail=f"Erro na IA: {thesis['error']}")
+
+    # 5. Gerar PDF (arquivo temporário único -> cache endereçado pelo conteúdo)
+    dossier_id = dossier_cache.dossier_id(listing, thesis)
+    rendered = await value_gen.create_dossier_pdf_async(prop_data, thesis, dossier_cache.tmp_path(dossier_id))
+    if not rendered:
+        raise HTTPException(status_code=500, detail="Erro ao gerar PDF.")
+    await executor.run_io(dossier_cache.commit, listing, thesis, dossier_id, rendered)
+    return dossier_id, thesis
+
 @app.post("/api/generate-dossier")
 async def generate_dossier(request: DossierRequest):
     """
@@ -178,100 +630,110 @@ async def generate_dossier(request: DossierRequest):
         "area": 120
     }
 
-    # 3. Gerar Tese de Investimento (Gemini)
-    thesis = value_gen.generate_renovation_vision(prop_data)
-    if "error" in thesis:
-        raise HTTPException(status_code=500, detail=f"Erro na IA: {thesis['error']}")
-
-    # 4. Gerar PDF
-    filename = f"dossier_{request.property_id}_{datetime.now().timestamp()}.pdf"
-    pdf_path = value_gen.create_dossier_pdf(prop_data, thesis, filename)
-
-    if not pdf_path:
-        raise HTTPException(status_code=500, detail="Erro ao gerar PDF.")
+    # 3. Dossiê já gerado para este imóvel (mesmo conteúdo): sem Gemini e sem renderização
+    listing = listing_key(request.property_id, prop_data)
+    cached = dossier_cache.lookup(listing)
+    if cached is not None:
+        dossier_id, thesis = cached
+    else:
+        # Requisições simultâneas do mesmo imóvel aguardam uma única geração
+        job = dossier_jobs.get(listing)
+        if job is None:
+            job = dossier_jobs[listing] = asyncio.ensure_future(build_dossier(listing, prop_data))
+            job.add_done_callback(lambda _: dossier_jobs.pop(listing, None))
+        dossier_id, thesis = await asyncio.shield(job)
 
-    # 5. Retornar link (simulado) ou enviar via WhatsApp
-    # Aqui retornamos o caminho local para teste
     return {
         "status": "success",
         "message": "Dossiê gerado com sucesso.",
-        "download_url": f"/downloads/{filename}", # Rota fictícia de download
+        "download_url": f"/downloads/{dossier_id}",
+        "cached": cached is not None,
         "thesis_preview": thesis
     }
 
+@app.get("/downloads/{dossier_id}")
+async def download_dossier(
+    dossier_id: str,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_range: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None)
+):
+    """
+    Download do dossiê em streaming, com ETag (304) e HTTP Range (206/416).
+    """
+    opened = dossier_cache.open(dossier_id)
+    if opened is None:
+        raise HTTPException(status_code=404, detail="Dossiê não encontrado")
+    path, size = opened
+    headers = {
+        "Cache-Control": "private, max-age=31536000, immutable",
+        "Content-Disposition": f'inline; filename="dossie-{dossier_id[:8]}.pdf"',
+    }
+    return file_response(path, size, f'"{dossier_id}"', "application/pdf", headers,
+                         range_header=range_header, if_range=if_range, if_none_match=if_none_match)
+
+@app.get("/admin/dossier-cache")
+async def dossier_cache_stats():
+    """
+    Estatísticas do cache de dossiês PDF.
+    """
+    return dossier_cache.stats()
+
 @app.get("/buildings/{slug}")
 async def get_building_page(slug: str):
     """
     Módulo 1: Página de Condomínio (Landing Page SEO).
+    Leitura do banco pelo slug; descrição e características são geradas em background (sync_buildings).
     """
-    # Em produção, buscaria do banco de dados pelo slug
-    # Aqui simulamos a extração e geração on-the-fly
-    
-    # Mock de dados do edifício
-    building_name = slug.replace("-", " ").title()
-    neighborhood = "Horto Florestal" # Mock
-    
-    description = seo_aggregator.generate_building_description(building_name, neighborhood)
-    
+    # Edifício com menos de MIN_BUILDING_PROPERTIES imóveis no ar não tem página
+    key = building_index.live_key_for_slug(slug)
+    building = await executor.run_io(storage.get_building, slug) if key else None
+    if building is None:
+        raise HTTPException(status_code=404, detail="Edifício não encontrado")
+
+    listings = sorted(
+        (p for p in building_index.properties_of(key) if p.get('status') != 'DELISTED'),
+        key=lambda p: p.get('price') or 0
+    )
+    neighborhood = building.get('neighborhood') or "Salvador"
     return {
-        "name": building_name,
+        "name": building['name'],
         "slug": slug,
-        "description": description,
-        "properties_available": [] # Listaria imóveis do banco
+        "neighborhood": building.get('neighborhood'),
+        "description": building.get('description')
+        or f"{building['name']}: condomínio em {neighborhood}, Salvador, com {len(listings)} imóveis à venda.",
+        "features": building.get('features') or [],
+        "updated_at": building['updated_at'].isoformat() if building.get('updated_at') else None,
+        "properties_available": [
+            {field: prop.get(field) for field in BUILDING_LISTING_FIELDS} for prop in listings
+        ]
     }
 
 @app.get("/sitemap.xml")
-async def get_sitemap():
+async def get_sitemap(if_none_match: Optional[str] = Header(None)):
     """
     Módulo 4: Sitemap Dinâmico.
+    Índice de sitemaps gerado em background a partir do banco; a requisição só lê o arquivo.
     """
-    # Em produção, iterar sobre todos os imóveis e edifícios do banco
-    base_url = "https://bahiasatellite.com"
-    
-    urls = []
-    
-    # 1. Home
-    urls.append(f"""
-    <url>
-        <loc>{base_url}/</loc>
-        <changefreq>daily</changefreq>
-        <priority>1.0</priority>
-    </url>
-    """)
-    
-    # 2. Edifícios (Exemplo)
-    buildings = ["mansao-wildberger", "edf-costa-pinto"]
-    for b in buildings:
-        urls.append(f"""
-        <url>
-            <loc>{base_url}/buildings/{b}</loc>
-            <changefreq>weekly</changefreq>
-            <priority>1.0</priority>
-        </url>
-        """)
-        
-    # 3. Imóveis (Exemplo)
-    # Aqui chamaria o collector ou banco
-    properties = [
-        {"slug": "apartamento-4-quartos-horto-florestal-vista-mar"},
-        {"slug": "cobertura-ondina-alto-padrao"}
-    ]
-    for p in properties:
-        urls.append(f"""
-        <url>
-            <loc>{base_url}/imoveis/{p['slug']}</loc>
-            <changefreq>daily</changefreq>
-            <priority>0.8</priority>
-        </url>
-        """)
-        
-    sitemap_content = f"""<?xml version="1.0" encoding="UTF-8"?>
-    <urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
-        {"".join(urls)}
-    </urlset>
+    if not sitemap_builder.ready:
+        # Primeira geração (banco vazio ou diretório novo)
+        await executor.run_io(sitemap_builder.build, storage)
+    cached = await executor.run_io(sitemap_builder.read, SITEMAP_INDEX)
+    if cached is None:
+        raise HTTPException(status_code=503, detail="Sitemap ainda não gerado")
+    content, etag = cached
+    return etag_response(content, etag, "application/xml", if_none_match)
+
+@app.get("/sitemaps/{name}")
+async def get_sitemap_shard(name: str, if_none_match: Optional[str] = Header(None)):
     """
-    
-    return Response(content=sitemap_content, media_type="application/xml")
+    Sitemap filho (até 50k URLs), pré-comprimido em gzip.
+    """
+    cached = await executor.run_io(sitemap_builder.read, name)
+    if cached is None:
+        raise HTTPException(status_code=404, detail="Sitemap não encontrado")
+    content, etag = cached
+    return etag_response(content, etag, "application/gzip", if_none_match)
 
 if __name__ == "__main__":
     import uvicorn
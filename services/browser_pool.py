@@ -0,0 +1,133 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+from playwright.async_api import Browser, BrowserContext, Page, Playwright, async_playwright
+
+# Configuração de Logs
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("BrowserPool")
+
+
+class _Slot:
+    """
+    Contexto + página reutilizáveis do pool.
+    """
+
+    def __init__(self, context: BrowserContext, page: Page):
+        self.context = context
+        self.page = page
+        self.uses = 0
+
+    async def close(self):
+        try:
+            await self.context.close()
+        except Exception:
+            pass  # Contexto já morto (crash da página/navegador)
+
+
+class BrowserPool:
+    """
+    Chromium headless de longa duração com um pool limitado de contextos reutilizáveis.
+
+    - Um único navegador por processo (iniciado no lifespan da aplicação).
+    - No máximo `max_concurrency` páginas em uso; os demais chamadores aguardam na fila.
+    - Páginas que falham ou fecham são descartadas e recriadas; contextos são
+      reciclados após `max_uses` navegações para manter a memória estável.
+    """
+
+    def __init__(self, max_concurrency: int = 4, max_uses: int = 50, acquire_timeout: float = 30,
+                 headless: bool = True):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_uses = max_uses
+        self.acquire_timeout = acquire_timeout
+        self.headless = headless
+
+        self._playwright: Optional[Playwright] = None
+        self._browser: Optional[Browser] = None
+        self._idle: list = []
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._start_lock = asyncio.Lock()
+        self._launch_lock = asyncio.Lock()
+
+    @property
+    def started(self) -> bool:
+        return self._playwright is not None
+
+    async def start(self):
+        async with self._start_lock:
+            if self.started:
+                return
+            self._playwright = await async_playwright().start()
+            try:
+                await self._ensure_browser()
+            except Exception:
+                # Estado limpo: o próximo `page()` tenta iniciar de novo
+                await self._playwright.stop()
+                self._playwright = None
+                raise
+        logger.info(f"Pool de navegador iniciado (concorrência máxima: {self.max_concurrency})")
+
+    async def stop(self):
+        if not self.started:
+            return
+        for slot in self._idle:
+            await slot.close()
+        self._idle.clear()
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        await self._playwright.stop()
+        self._playwright = None
+        logger.info("Pool de navegador encerrado")
+
+    async def _ensure_browser(self) -> Browser:
+        async with self._launch_lock:
+            if self._browser is None or not self._browser.is_connected():
+                if self._browser is not None:
+                    logger.warning("Navegador desconectado; relançando Chromium")
+                    # Contextos ociosos pertenciam ao navegador morto
+                    self._idle.clear()
+                self._browser = await self._playwright.chromium.launch(headless=self.headless)
+            return self._browser
+
+    async def _new_slot(self) -> _Slot:
+        browser = await self._ensure_browser()
+        context = await browser.new_context()
+        page = await context.new_page()
+        return _Slot(context, page)
+
+    @asynccontextmanager
+    async def page(self) -> AsyncIterator[Page]:
+        """
+        Empresta uma página do pool. Em caso de erro, a página é descartada (reciclada).
+        """
+        if not self.started:
+            await self.start()
+
+        await asyncio.wait_for(self._semaphore.acquire(), timeout=self.acquire_timeout)
+        slot = None
+        healthy = False
+        try:
+            slot = self._idle.pop() if self._idle else await self._new_slot()
+            if slot.page.is_closed():
+                await slot.close()
+                slot = await self._new_slot()
+            slot.uses += 1
+            yield slot.page
+            healthy = True
+        finally:
+            if slot is not None:
+                if healthy and not slot.page.is_closed() and slot.uses < self.max_uses:
+                    try:
+                        await slot.context.clear_cookies()
+                        self._idle.append(slot)
+                    except Exception:
+                        await slot.close()
+                else:
+                    await slot.close()
+            self._semaphore.release()
@@ -0,0 +1,258 @@
+import logging
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Set
+
+from services.text import fold_accents, slugify
+
+# Configuração de Logs
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("BuildingIndex")
+
+# Um único padrão (alternação pré-compilada) para "Edf. X", "Edifício X", "Mansão X", "Condomínio X"...
+# O nome termina em pontuação, fim do título ou num conector comum ("com", "em", "de 3 quartos").
+BUILDING_NAME_RE = re.compile(
+    r"\b(?:edf|edif|edif[ií]cio|mans[aã]o|condom[ií]nio|cond|residencial|res(?=\.))\b\.?\s+"
+    r"(?P<name>[^\W_][\w'&. ]*?)"
+    r"(?=\s*(?:[-,–|(/]|$)|\s+(?:com|em|no|na|nos|nas|para|perto|pr[oó]ximo|de\s+\d)\b)",
+    re.IGNORECASE
+)
+
+# Abreviações expandidas na chave ("Res. Sta Maria" == "Residencial Santa Maria")
+ABBREVIATIONS = {
+    'edf': 'edificio', 'edif': 'edificio', 'cond': 'condominio', 'res': 'residencial',
+    'sta': 'santa', 'sto': 'santo', 's': 'sao', 'jd': 'jardim', 'jdm': 'jardim', 'pq': 'parque',
+    'alm': 'almirante', 'dr': 'doutor', 'prof': 'professor', 'gen': 'general', 'cel': 'coronel',
+    'av': 'avenida', 'pca': 'praca', 'n': 'nossa', 'sra': 'senhora',
+}
+# Palavras de tipo removidas do início da chave ("Edf Mar Azul" == "Residencial Mar Azul")
+TYPE_WORDS = frozenset({'edificio', 'condominio', 'residencial', 'mansao'})
+# Capturas genéricas que não identificam um edifício ("Casa em Condomínio Fechado")
+GENERIC_NAMES = frozenset({'fechado', 'clube', 'horizontal', 'vertical', 'suspensa', 'alto padrao', 'de luxo'})
+
+# Regra de negócio: página de edifício só com mais de 2 imóveis
+MIN_BUILDING_PROPERTIES = 3
+
+
+def building_key(name: str) -> str:
+    """
+    Chave canônica do edifício: sem acento, minúscula, abreviações expandidas e sem palavra de tipo.
+    """
+    words = [ABBREVIATIONS.get(word, word) for word in re.findall(r'[a-z0-9]+', fold_accents(name).lower())]
+    while words and words[0] in TYPE_WORDS:
+        words.pop(0)
+    return ' '.join(words)
+
+
+def building_slug(key: str) -> str:
+    """
+    Slug público do edifício (rota /buildings/{slug}), derivado da chave canônica.
+    """
+    return slugify(key)
+
+
+def extract_building_name(title: str) -> Optional[str]:
+    """
+    Nome do edifício citado no título (como escrito), ou None.
+    """
+    match = BUILDING_NAME_RE.search(title or '')
+    if not match:
+        return None
+    name = match.group('name').strip(' .')
+    key = building_key(name)
+    return name if key and key not in GENERIC_NAMES else None
+
+
+class BuildingIndex:
+    """
+    Agrupamento persistente de imóveis por edifício, atualizado imóvel a imóvel.
+
+    - Cada imóvel é reavaliado (regex) só quando o título muda; imóvel igual custa um lookup.
+    - Contagem por edifício mantida a cada alteração: a regra "> 2 imóveis" é O(1).
+    - Edifícios alterados desde a última sincronização ficam em `changed` (ver `drain_changes`).
+    """
+
+    def __init__(self, min_properties: int = MIN_BUILDING_PROPERTIES):
+        self.min_properties = min_properties
+        self.members: Dict[str, Dict[str, Dict]] = {}  # chave -> link -> imóvel
+        self.names: Dict[str, str] = {}  # chave -> nome de exibição (primeiro visto)
+        self._slugs: Dict[str, str] = {}  # slug -> chave
+        self._key_of: Dict[str, Optional[str]] = {}  # link -> chave (None: sem edifício)
+        self._titles: Dict[str, str] = {}  # link -> título usado na extração
+        self.changed: Set[str] = set()
+        self._lock = threading.RLock()
+
+    def __contains__(self, link: str) -> bool:
+        return link in self._key_of
+
+    def __len__(self) -> int:
+        return sum(1 for key in self.members if self.is_building(key))
+
+    def is_building(self, key: str) -> bool:
+        return len(self.members.get(key, ())) >= self.min_properties
+
+    # --- Atualização ---
+
+    def upsert_many(self, properties: Iterable[Dict]) -> int:
+        """
+        Adiciona/atualiza imóveis pelo link. Retorna quantos mudaram de edifício.
+        """
+        moved = 0
+        with self._lock:
+            for prop in properties:
+                moved += self._upsert(prop)
+        return moved
+
+    def _upsert(self, prop: Dict) -> bool:
+        link = prop.get('link')
+        if not link:
+            return False
+        title = prop.get('title') or ''
+        if link in self._key_of and self._titles[link] == title:
+            key = self._key_of[link]
+            if key is not None:
+                self._replace(key, link, prop)  # Mesmo edifício: só troca a referência
+            return False
+
+        name = extract_building_name(title)
+        key = building_key(name) if name else None
+        old_key = self._key_of.get(link)
+        self._titles[link] = title
+        if link in self._key_of and old_key == key:
+            if key is not None:
+                self._replace(key, link, prop)
+            return False
+
+        self._detach(link)
+        self._key_of[link] = key
+        if key is not None:
+            self.members.setdefault(key, {})[link] = prop
+            if key not in self.names:
+                self.names[key] = name
+                self._slugs[building_slug(key)] = key
+            self.changed.add(key)
+        return True
+
+    def _replace(self, key: str, link: str, prop: Dict):
+        members = self.members[key]
+        if members[link].get('fingerprint') != prop.get('fingerprint') or 'fingerprint' not in prop:
+            self.changed.add(key)
+        members[link] = prop
+
+    def remove_many(self, links: Iterable[str]) -> int:
+        removed = 0
+        with self._lock:
+            for link in links:
+                if link in self._key_of:
+                    self._detach(link)
+                    del self._key_of[link]
+                    del self._titles[link]
+                    removed += 1
+        return removed
+
+    def _detach(self, link: str):
+        key = self._key_of.get(link)
+        if key is None:
+            return
+        members = self.members[key]
+        members.pop(link, None)
+        self.changed.add(key)
+        if not members:
+            del self.members[key]
+            del self.names[key]
+            self._slugs.pop(building_slug(key), None)
+
+    # --- Consulta ---
+
+    def drain_changes(self) -> List[str]:
+        """
+        Chaves de edifícios alterados desde a última chamada (e zera a lista).
+        """
+        with self._lock:
+            changed, self.changed = self.changed, set()
+        return list(changed)
+
+    def group(self, key: str) -> Optional[Dict]:
+        """
+        {'key', 'name', 'properties'} do edifício, ou None se ele não passa na regra de mínimo.
+        """
+        with self._lock:
+            if not self.is_building(key):
+                return None
+            return {'key': key, 'name': self.names[key], 'properties': list(self.members[key].values())}
+
+    def key_of(self, link: str) -> Optional[str]:
+        """
+        Chave do edifício do imóvel, se ele pertence a um edifício que passa na regra de mínimo.
+        """
+        with self._lock:
+            key = self._key_of.get(link)
+            return key if key is not None and self.is_building(key) else None
+
+    def key_for_slug(self, slug: str) -> Optional[str]:
+        """
+        Chave do edifício com o slug público `slug` (slugs não são reversíveis: acentos e pontuação).
+        """
+        with self._lock:
+            return self._slugs.get(slug)
+
+    def live_key_for_slug(self, slug: str) -> Optional[str]:
+        """
+        Chave do edifício com o slug público `slug`, só se ele ainda passa na regra de mínimo
+        (mesma regra da rota /buildings/{slug}, do sitemap e da exportação estática).
+        """
+        with self._lock:
+            key = self._slugs.get(slug)
+            return key if key is not None and self.is_building(key) else None
+
+    def properties_of(self, key: str) -> List[Dict]:
+        with self._lock:
+            return list(self.members.get(key, {}).values())
+
+    def groups(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {key: self.group(key) for key in self.members if self.is_building(key)}
+
+
+# Índice compartilhado pela API e pelo scheduler
+building_index = BuildingIndex()
+
+
+if __name__ == "__main__":
+    # Benchmark: 100k imóveis, reagrupamento completo vs atualização incremental
+    import random
+    import time
+
+    random.seed(5)
+    names = [f"Mar Azul {i}" for i in range(3000)]
+    prefixes = ["Edf.", "Edifício", "Edf", "Residencial", "Condomínio", "Res."]
+    inventory = []
+    for i in range(100_000):
+        if i % 3:
+            title = f"Apartamento 3 quartos {random.choice(prefixes)} {random.choice(names)} - Pituba"
+        else:
+            title = f"Casa em Condomínio Fechado com {random.randint(2, 5)} suítes"
+        inventory.append({'link': f"https://www.lopes.com.br/imovel/{i}", 'title': title, 'fingerprint': str(i)})
+
+    index = BuildingIndex()
+    start = time.perf_counter()
+    index.upsert_many(inventory)
+    full = time.perf_counter() - start
+    print(f"Indexação completa (100k): {full * 1000:.0f} ms, {len(index)} edifícios")
+    index.drain_changes()
+
+    changed = [dict(inventory[i], title=f"Cobertura Edf. {random.choice(names)}") for i in range(0, 100_000, 1000)]
+    start = time.perf_counter()
+    index.upsert_many(changed)
+    print(f"Atualização incremental (100 imóveis): {(time.perf_counter() - start) * 1000:.2f} ms, "
+          f"{len(index.drain_changes())} edifícios alterados")
+
+    start = time.perf_counter()
+    index.upsert_many(inventory[1:])
+    print(f"Re-upsert sem mudanças (99,999): {(time.perf_counter() - start) * 1000:.0f} ms, "
+          f"{len(index.drain_changes())} edifícios alterados")
+
+    for title in ["Apartamento Edifício Mar Azul com 3 quartos", "Apto Edf Mar Azul - Pituba",
+                  "Casa em Condomínio Fechado", "Res. Sta Maria de 2 quartos", "Mansão Wildberger"]:
+        name = extract_building_name(title)
+        print(f"{title!r:<48} -> {name!r} ({building_key(name) if name else None!r})")
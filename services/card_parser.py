@@ -0,0 +1,252 @@
+import logging
+from typing import Dict, List, Tuple
+
+from bs4 import BeautifulSoup
+from bs4.dammit import UnicodeDammit
+
+try:
+    from lxml import etree, html as lxml_html
+except ImportError:  # lxml é opcional; sem ele, usa-se o BeautifulSoup
+    etree = None
+    lxml_html = None
+
+# Configuração de Logs
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("CardParser")
+
+LOPES_HOST = "https://www.lopes.com.br"
+
+
+def _absolute(url: str) -> str:
+    if url and not url.startswith('http'):
+        return f"{LOPES_HOST}{url}"
+    return url
+
+
+class SoupCardParser:
+    """
+    Backend BeautifulSoup (referência). Mais lento, mas sem dependências nativas.
+    """
+    name = "html.parser"
+
+    def __init__(self, features: str = 'html.parser'):
+        self.features = features
+
+    def find_cards(self, content: bytes) -> Tuple[List, bool]:
+        """
+        Retorna (cards, usou_seletor_alternativo).
+        """
+        soup = BeautifulSoup(content, self.features)
+
+        # Encontrar todos os cards de imóveis
+        property_cards = soup.find_all('a', class_='lead-button')
+        if property_cards:
+            return property_cards, False
+
+        # Tentar outros seletores possíveis
+        return soup.find_all('div', class_='property-card') or soup.find_all('article'), True
+
+    def extract(self, card) -> Dict:
+        """
+        Extrai dados de um card de imóvel.
+        """
+        data = {}
+
+        # Link
+        data['link'] = _absolute(card.get('href', ''))
+
+        # Título (h2 ou h3)
+        title_elem = card.find('h2') or card.find('h3')
+        data['title'] = title_elem.get_text(strip=True) if title_elem else 'Sem Título'
+
+        # Preço
+        price_text = '0'
+        price_elems = card.find_all('p')
+        for p in price_elems:
+            text = p.get_text(strip=True)
+            if 'R$' in text:
+                price_text = text
+                break
+        data['priceText'] = price_text
+
+        # Fotos
+        photos = []
+        img_tags = card.find_all('img')
+        for img in img_tags:
+            src = img.get('src', '') or img.get('data-src', '')
+            if src and 'data:image' not in src:
+                photos.append(_absolute(src))
+        data['photos'] = photos
+
+        # Detalhes (área, quartos, etc.)
+        details = []
+        detail_items = card.find_all('li')
+        for li in detail_items:
+            detail_text = li.get_text(strip=True)
+            if detail_text:
+                details.append(detail_text)
+        data['details'] = details
+
+        # Localização e Descrição
+        all_text = card.get_text('\n', strip=True)
+        lines = [line.strip() for line in all_text.split('\n') if line.strip()]
+        _locate_text_fields(data, lines, price_text)
+
+        return data
+
+
+class LxmlCardParser:
+    """
+    Backend lxml: percorre cada card uma única vez (iterwalk start/end),
+    acumulando textos de títulos, parágrafos e itens de lista na mesma passada.
+    Produz o mesmo dicionário que o SoupCardParser.
+    """
+    name = "lxml"
+
+    CARD_XPATH = "//a[contains(concat(' ', normalize-space(@class), ' '), ' lead-button ')]"
+    FALLBACK_XPATH = "//div[contains(concat(' ', normalize-space(@class), ' '), ' property-card ')]"
+
+    # Elementos cujo texto é acumulado para get_text(strip=True)
+    TRACKED = ('h2', 'h3', 'p', 'li')
+    # Strings dentro destes elementos não entram no texto (mesmo comportamento do BeautifulSoup)
+    SKIP_TEXT = ('script', 'style', 'template')
+
+    def __init__(self):
+        if lxml_html is None:
+            raise ImportError("lxml não está instalado.")
+
+    def find_cards(self, content: bytes) -> Tuple[List, bool]:
+        # Mesma detecção de encoding do BeautifulSoup (o libxml2 assume latin-1 sem charset)
+        markup = UnicodeDammit(content, is_html=True).unicode_markup
+        root = lxml_html.document_fromstring(markup)
+
+        property_cards = root.xpath(self.CARD_XPATH)
+        if property_cards:
+            return property_cards, False
+
+        return root.xpath(self.FALLBACK_XPATH) or root.xpath("//article"), True
+
+    def extract(self, card) -> Dict:
+        data = {'link': _absolute(card.get('href', ''))}
+
+        lines: List[str] = []
+        photos: List[str] = []
+        # Textos por tag, na ordem de abertura (mesma ordem do find_all)
+        texts: Dict[str, List[str]] = {tag: [] for tag in self.TRACKED}
+        open_elements: List[Tuple[List[str], str, int]] = []
+        skip_depth = 0
+
+        def add_text(text: str):
+            stripped = text.strip()
+            if not stripped:
+                return
+            for parts, _, _ in open_elements:
+                parts.append(stripped)
+            lines.extend(line.strip() for line in stripped.split('\n') if line.strip())
+
+        for event, el in etree.iterwalk(card, events=('start', 'end')):
+            tag = el.tag
+            if not isinstance(tag, str):
+                # Comentários / instruções de processamento: só o tail é texto
+                if event == 'end' and el.tail and not skip_depth:
+                    add_text(el.tail)
+                continue
+
+            if event == 'start':
+                if tag in self.SKIP_TEXT:
+                    skip_depth += 1
+                if tag in self.TRACKED:
+                    texts[tag].append('')
+                    open_elements.append(([], tag, len(texts[tag]) - 1))
+                elif tag == 'img':
+                    src = el.get('src', '') or el.get('data-src', '')
+                    if src and 'data:image' not in src:
+                        photos.append(_absolute(src))
+                if el.text and not skip_depth:
+                    add_text(el.text)
+            else:
+                if tag in self.TRACKED:
+                    parts, _, slot = open_elements.pop()
+                    texts[tag][slot] = ''.join(parts)
+                if tag in self.SKIP_TEXT:
+                    skip_depth -= 1
+                if el is not card and el.tail and not skip_depth:
+                    add_text(el.tail)
+
+        # Título (h2 ou h3)
+        if texts['h2']:
+            data['title'] = texts['h2'][0]
+        elif texts['h3']:
+            data['title'] = texts['h3'][0]
+        else:
+            data['title'] = 'Sem Título'
+
+        price_text = next((text for text in texts['p'] if 'R$' in text), '0')
+        data['priceText'] = price_text
+        data['photos'] = photos
+        data['details'] = [text for text in texts['li'] if text]
+
+        _locate_text_fields(data, lines, price_text)
+        return data
+
+
+def _locate_text_fields(data: Dict, lines: List[str], price_text: str):
+    # Localização (linha com vírgula e sem R$, comprimento médio)
+    location = ''
+    for line in lines:
+        if ',' in line and 'R$' not in line and 10 < len(line) < 100:
+            location = line
+            break
+    data['location'] = location
+
+    # Descrição (linha mais longa, excluindo título, preço e localização)
+    description = ''
+    for line in lines:
+        if (len(line) > 50 and
+            line != data['title'] and
+            line != price_text and
+            line != location and
+            'R$' not in line):
+            description = line
+            break
+    data['description'] = description
+
+
+def get_card_parser(backend: str = 'auto'):
+    """
+    Seleciona o backend de parsing: 'auto' (lxml se disponível), 'lxml' ou 'html.parser'.
+    """
+    if backend == 'auto':
+        backend = 'lxml' if lxml_html is not None else 'html.parser'
+    if backend == 'lxml':
+        return LxmlCardParser()
+    if backend == 'html.parser':
+        return SoupCardParser()
+    raise ValueError(f"Backend de parsing desconhecido: {backend}")
+
+
+if __name__ == "__main__":
+    # Benchmark: python -m services.card_parser pagina1.html [pagina2.html ...]
+    import sys
+    import time
+
+    logger.setLevel(logging.WARNING)
+    pages = [open(path, 'rb').read() for path in sys.argv[1:]]
+    if not pages:
+        print("Uso: python -m services.card_parser <pagina_salva.html> [...]")
+        sys.exit(1)
+
+    def run(parser, rounds: int = 5):
+        start = time.perf_counter()
+        for _ in range(rounds):
+            output = [[parser.extract(card) for card in parser.find_cards(content)[0]] for content in pages]
+        return output, (time.perf_counter() - start) / rounds
+
+    reference, soup_time = run(SoupCardParser())
+    fast, lxml_time = run(LxmlCardParser())
+    cards = sum(len(items) for items in reference)
+
+    print(f"Cards: {cards}")
+    print(f"html.parser: {soup_time * 1000:.1f} ms/rodada")
+    print(f"lxml:        {lxml_time * 1000:.1f} ms/rodada ({soup_time / lxml_time:.1f}x)")
+    print(f"Saída idêntica: {reference == fast}")
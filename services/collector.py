@@ -1,12 +1,16 @@
 import sys
 import asyncio
-import json
 import random
 import logging
-from typing import List, Dict, Optional
+from typing import AsyncIterator, List, Dict, Optional
 from playwright.async_api import async_playwright
 from datetime import datetime
 
+from services.executor import executor
+from services.listing import content_fingerprint, listing_id
+from services.price_history import PriceHistoryStore
+from services.storage import Storage
+
 if sys.platform == 'win32':
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
@@ -30,8 +34,13 @@ class MassCollector:
         "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:109.0) Gecko/20100101 Firefox/121.0"
     ]
 
-    def __init__(self):
-        self.price_history_db = {} # Simulação de persistência simples (em memória por enquanto)
+    def __init__(self, storage: Optional[Storage] = None):
+        """
+        Args:
+            storage: Persistência dos imóveis e do histórico de preços (opcional)
+        """
+        self.storage = storage
+        self.price_history = storage.load_price_history() if storage else PriceHistoryStore()
 
     def _get_random_user_agent(self):
         return random.choice(self.USER_AGENTS)
@@ -40,8 +49,16 @@ class MassCollector:
         """
         Coleta o inventário de imóveis da Lopes.
         """
+        return [item async for item in self.iter_inventory(max_pages)]
+
+    async def iter_inventory(self, max_pages: int = 1) -> AsyncIterator[Dict]:
+        """
+        Gera os imóveis processados à medida que cada página é extraída.
+        """
         logger.info(f"Iniciando coleta massiva. Max Pages: {max_pages}")
-        results = []
+        # Imóveis e pontos de preço desta coleta, gravados em lote no fim
+        collected: List[Dict] = []
+        price_points: List[Dict] = []
 
         async with async_playwright() as p:
             browser = await p.chromium.launch(headless=True)
@@ -134,8 +151,9 @@ class MassCollector:
                     logger.info(f"Encontrados {len(listings)} imóveis na página {current_page}")
 
                     for item in listings:
-                        processed_item = self._process_item(item)
-                        results.append(processed_item)
+                        processed = self._process_item(item, price_points)
+                        collected.append(processed)
+                        yield processed
                     
                     # Random delay para stealth
                     await asyncio.sleep(random.uniform(3, 6))
@@ -146,10 +164,11 @@ class MassCollector:
 
             await browser.close()
         
-        logger.info(f"Coleta finalizada. {len(results)} imóveis encontrados.")
-        return results
+        # Escrita no banco fora do event loop
+        await executor.run_io(self._persist_run, collected, price_points)
+        logger.info(f"Coleta finalizada. {len(collected)} imóveis encontrados.")
 
-    def _process_item(self, item: Dict) -> Dict:
+    def _process_item(self, item: Dict, price_points: Optional[List[Dict]] = None) -> Dict:
         """
         Processa dados brutos, extrai informações estruturadas e gerencia histórico de preços.
         """
@@ -232,6 +251,7 @@ class MassCollector:
             'type': 'Apartamento',  # Pode ser extraído do título se necessário
             'photos': item.get('photos', []),
             'description': item.get('description', ''),
+            'id': listing_id(item['link']) if item.get('link') else None,
             'link': item.get('link', ''),
             'collected_at': datetime.now().isoformat(),
             'source': 'Lopes'
@@ -239,20 +259,43 @@ class MassCollector:
         
         # Price Watchdog Logic
         item_id = processed['link']
-        if item_id in self.price_history_db:
-            last_price = self.price_history_db[item_id][-1]['price']
-            if price_clean != last_price:
+        if item_id and item_id in self.price_history:
+            # Só mudanças reais de preço viram ponto no histórico
+            if self._record_price(item_id, price_clean, processed['collected_at'], price_points):
                 processed['status'] = 'PRICE_CHANGED'
-                self.price_history_db[item_id].append({'price': price_clean, 'date': processed['collected_at']})
             else:
                 processed['status'] = 'UNCHANGED'
         else:
             processed['status'] = 'NEW'
-            self.price_history_db[item_id] = [{'price': price_clean, 'date': processed['collected_at']}]
+            if item_id:
+                self._record_price(item_id, price_clean, processed['collected_at'], price_points)
         
-        processed['price_history'] = self.price_history_db[item_id]
+        # Histórico de preços não vai no item: consulta sob demanda em /properties/{id}/price-history
+        # Impressão digital do conteúdo: enriquecimento só é refeito quando ela muda
+        processed['fingerprint'] = content_fingerprint(processed)
         return processed
 
+    def _record_price(self, item_id: str, price: float, date: str,
+                      price_points: Optional[List[Dict]] = None) -> bool:
+        recorded = self.price_history.record(item_id, price, date)
+        if recorded and self.storage and price_points is not None:
+            price_points.append({'link': item_id, 'price': price, 'date': date})
+        return recorded
+
+    def _persist_run(self, properties: List[Dict], price_points: List[Dict]):
+        """
+        Persiste em lote os imóveis e os pontos de preço registrados durante a coleta.
+        """
+        if not self.storage:
+            return
+        try:
+            if properties:
+                self.storage.upsert_properties(properties)
+            if price_points:
+                self.storage.append_price_points(price_points)
+        except Exception as e:
+            logger.error(f"Erro ao persistir coleta: {e}")
+
 if __name__ == "__main__":
     # Teste rápido
     collector = MassCollector()
@@ -0,0 +1,75 @@
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+# Configuração de Logs
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("CrawlFrontier")
+
+DEFAULT_FRONTIER_PATH = os.getenv("CRAWL_FRONTIER_PATH", os.path.join(".cache", "crawl_frontier.json"))
+
+
+class CrawlFrontier:
+    """
+    Fronteira persistida da coleta incremental: links conhecidos e o último preço visto.
+    Usada para decidir se uma página de resultados ainda traz novidades (NEW / PRICE_CHANGED).
+    """
+
+    def __init__(self, path: str = DEFAULT_FRONTIER_PATH):
+        self.path = path
+        self.links: Dict[str, Dict] = {}
+        self.last_full_sweep: Optional[datetime] = None
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.links = data.get('links', {})
+            if data.get('last_full_sweep'):
+                self.last_full_sweep = datetime.fromisoformat(data['last_full_sweep'])
+            logger.info(f"Fronteira carregada: {len(self.links)} links conhecidos")
+        except (OSError, ValueError) as e:
+            logger.error(f"Erro ao carregar fronteira ({self.path}): {e}")
+
+    def save(self):
+        """
+        Grava a fronteira de forma atômica (arquivo temporário + rename).
+        """
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'links': self.links,
+                'last_full_sweep': self.last_full_sweep.isoformat() if self.last_full_sweep else None
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def classify(self, link: str, price: float) -> str:
+        known = self.links.get(link)
+        if known is None:
+            return 'NEW'
+        if known['price'] != price:
+            return 'PRICE_CHANGED'
+        return 'UNCHANGED'
+
+    def observe(self, link: str, price: float, seen_at: Optional[str] = None):
+        if link:
+            self.links[link] = {'price': price, 'last_seen': seen_at or datetime.now().isoformat()}
+
+    def needs_full_sweep(self, interval_hours: float) -> bool:
+        if self.last_full_sweep is None:
+            return True
+        return datetime.now() - self.last_full_sweep >= timedelta(hours=interval_hours)
+
+    def mark_full_sweep(self):
+        self.last_full_sweep = datetime.now()
+
+    def __len__(self) -> int:
+        return len(self.links)
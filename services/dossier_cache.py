@@ -0,0 +1,175 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+from services.listing import content_fingerprint
+
+# Configuração de Logs
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("DossierCache")
+
+DEFAULT_DOSSIER_DIR = os.path.join(".cache", "dossiers")
+
+# Versão do layout do PDF: incrementar invalida os dossiês em cache
+DOSSIER_VERSION = 1
+
+# Dossiê devolvido por lookup/commit fica protegido da remoção por esse tempo
+# (o cliente ainda vai baixar /downloads/{id})
+DEFAULT_PIN_SECONDS = 600
+
+DOSSIER_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+
+def listing_key(property_id: str, property_data: Dict) -> str:
+    """
+    Impressão digital do imóvel do dossiê (o id da requisição substitui o link quando ele falta).
+    """
+    return content_fingerprint(dict(property_data, link=property_data.get('link') or property_id))
+
+
+class DossierCache:
+    """
+    Dossiês PDF endereçados pelo conteúdo: o id é o hash de (impressão digital do imóvel, tese).
+
+    - Imóvel já atendido: tese e PDF servidos do disco, sem Gemini e sem renderização.
+    - Arquivos imutáveis (`{id}.pdf`): o id serve como ETag.
+    - Acima de `max_bytes`, os dossiês acessados há mais tempo são removidos (LRU), exceto os
+      entregues há menos de `pin_seconds` (o download ainda não aconteceu).
+    """
+
+    def __init__(self, directory: str = DEFAULT_DOSSIER_DIR, max_bytes: int = 200 * 1024 * 1024,
+                 pin_seconds: float = DEFAULT_PIN_SECONDS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.pin_seconds = pin_seconds
+        self.index_path = os.path.join(directory, "index.json")
+        self.listings: Dict[str, Dict[str, Any]] = {}  # impressão digital -> {'id', 'thesis'}
+        self.files: Dict[str, Dict[str, float]] = {}  # id -> {'size', 'accessed_at'}
+        self._pinned: Dict[str, float] = {}  # id -> protegido da remoção até (monotonic)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Erro ao carregar índice de dossiês ({self.index_path}): {e}")
+            return
+        if data.get('version') != DOSSIER_VERSION:
+            return
+        # Só entram arquivos que ainda existem no disco
+        self.files = {
+            dossier: meta for dossier, meta in data.get('files', {}).items() if os.path.exists(self.path(dossier))
+        }
+        self.listings = {key: entry for key, entry in data.get('listings', {}).items() if entry['id'] in self.files}
+
+    def _save(self):
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': DOSSIER_VERSION, 'listings': self.listings, 'files': self.files},
+                      f, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+
+    @staticmethod
+    def dossier_id(listing: str, thesis: Dict) -> str:
+        payload = json.dumps([DOSSIER_VERSION, listing, thesis], sort_keys=True, ensure_ascii=False)
+        return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+    def path(self, dossier: str) -> str:
+        if not DOSSIER_ID_RE.match(dossier):
+            raise ValueError("id de dossiê inválido")
+        return os.path.join(self.directory, f"{dossier}.pdf")
+
+    def tmp_path(self, dossier: str) -> str:
+        # Único por chamada: renderizações simultâneas do mesmo id não compartilham o arquivo
+        return f"{self.path(dossier)}.{uuid.uuid4().hex}.tmp"
+
+    def _pin(self, dossier: str):
+        self._pinned[dossier] = time.monotonic() + self.pin_seconds
+
+    def lookup(self, listing: str) -> Optional[Tuple[str, Dict]]:
+        """
+        (id, tese) do dossiê já gerado para o imóvel, ou None.
+        """
+        with self._lock:
+            entry = self.listings.get(listing)
+            if entry is None or entry['id'] not in self.files:
+                self.misses += 1
+                return None
+            self.files[entry['id']]['accessed_at'] = time.time()
+            self._pin(entry['id'])
+            self.hits += 1
+            return entry['id'], entry['thesis']
+
+    def commit(self, listing: str, thesis: Dict, dossier: str, rendered_path: str):
+        """
+        Move o PDF renderizado para o cache, registra o imóvel e aplica o limite de tamanho.
+        """
+        final_path = self.path(dossier)
+        os.replace(rendered_path, final_path)
+        with self._lock:
+            self.files[dossier] = {'size': os.path.getsize(final_path), 'accessed_at': time.time()}
+            self.listings[listing] = {'id': dossier, 'thesis': thesis}
+            self._pin(dossier)
+            self._evict()
+            self._save()
+
+    def _evict(self):
+        now = time.monotonic()
+        self._pinned = {dossier: until for dossier, until in self._pinned.items()
+                        if until > now and dossier in self.files}
+        total = sum(meta['size'] for meta in self.files.values())
+        if total <= self.max_bytes:
+            return
+        evicted = set()
+        for dossier, meta in sorted(self.files.items(), key=lambda item: item[1]['accessed_at']):
+            if total <= self.max_bytes:
+                break
+            if dossier in self._pinned:
+                continue
+            try:
+                os.remove(self.path(dossier))
+            except OSError:
+                pass
+            total -= meta['size']
+            evicted.add(dossier)
+        for dossier in evicted:
+            del self.files[dossier]
+        self.listings = {key: entry for key, entry in self.listings.items() if entry['id'] not in evicted}
+        logger.info(f"{len(evicted)} dossiês removidos do cache (limite de {self.max_bytes} bytes)")
+
+    def open(self, dossier: str) -> Optional[Tuple[str, int]]:
+        """
+        (caminho, tamanho) de um dossiê em cache, ou None (id inválido ou removido).
+        """
+        with self._lock:
+            meta = self.files.get(dossier)
+            if meta is None or not DOSSIER_ID_RE.match(dossier):
+                return None
+            meta['accessed_at'] = time.time()
+            return self.path(dossier), int(meta['size'])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            size = sum(meta['size'] for meta in self.files.values())
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.files),
+                "size_bytes": size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
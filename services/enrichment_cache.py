@@ -0,0 +1,104 @@
+import json
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+from services.listing import content_fingerprint, listing_id
+
+# Configuração de Logs
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("EnrichmentCache")
+
+# Campos produzidos pelo enriquecimento SEO
+SEO_FIELDS = ('seo_title', 'seo_slug', 'meta_description', 'meta_description_source', 'schema_json')
+# Campos produzidos pelo refinador (só guardados quando o refinamento deu certo)
+REFINER_FIELDS = ('ai_title', 'ai_description', 'refined')
+
+
+class EnrichmentCache:
+    """
+    Resultados de enriquecimento (SEO, refinamento e JSON-LD pré-serializado) indexados pela
+    impressão digital do conteúdo do imóvel. Imóvel inalterado entre coletas = zero retrabalho.
+    LRU limitado a `max_entries` impressões digitais.
+    """
+
+    def __init__(self, max_entries: int = 200_000):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._by_listing: Dict[str, str] = {}  # listing_id -> fingerprint atual
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def fingerprint(prop: Dict[str, Any]) -> str:
+        fingerprint = prop.get('fingerprint')
+        if not fingerprint:
+            fingerprint = prop['fingerprint'] = content_fingerprint(prop)
+        return fingerprint
+
+    def apply(self, prop: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Copia para o imóvel os resultados em cache da sua impressão digital.
+        Retorna a entrada (hit) ou None (o imóvel precisa ser enriquecido).
+        """
+        fingerprint = self.fingerprint(prop)
+        entry = self.entries.get(fingerprint)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(fingerprint)
+        self.hits += 1
+        prop.update(entry['fields'])
+        return entry
+
+    def store(self, prop: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Guarda o enriquecimento atual do imóvel (e o JSON-LD já serializado).
+        """
+        fingerprint = self.fingerprint(prop)
+        fields = {field: prop[field] for field in SEO_FIELDS if field in prop}
+        if prop.get('refined'):
+            fields.update({field: prop[field] for field in REFINER_FIELDS if field in prop})
+        schema = fields.get('schema_json')
+        entry = {
+            'fields': fields,
+            'schema_bytes': json.dumps(schema, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            if schema is not None else None
+        }
+        self.entries[fingerprint] = entry
+        self.entries.move_to_end(fingerprint)
+        if prop.get('link'):
+            self._by_listing[prop.get('id') or listing_id(prop['link'])] = fingerprint
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return entry
+
+    def seed(self, properties: Iterable[Dict[str, Any]]) -> int:
+        """
+        Reaproveita o enriquecimento de imóveis persistidos (ex: após restart).
+        Só entram imóveis cuja impressão digital gravada ainda confere com o conteúdo.
+        """
+        seeded = 0
+        for prop in properties:
+            stored = prop.get('fingerprint')
+            if stored and stored == content_fingerprint(prop) and 'seo_slug' in prop:
+                self.store(prop)
+                seeded += 1
+        return seeded
+
+    def schema_bytes(self, listing: str) -> Optional[bytes]:
+        """
+        JSON-LD serializado do imóvel (pelo id público), se houver.
+        """
+        fingerprint = self._by_listing.get(listing)
+        entry = self.entries.get(fingerprint) if fingerprint else None
+        return entry['schema_bytes'] if entry else None
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
@@ -0,0 +1,62 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Optional
+
+# Configuração de Logs
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("ExecutionLayer")
+
+
+class ExecutionLayer:
+    """
+    Camada de execução para trabalho bloqueante chamado a partir das rotas async:
+    - Thread pool limitado para I/O bloqueante (requests, Gemini, googlesearch, banco).
+    - Process pool para trabalho de CPU (renderização de PDF).
+    Configurado no startup da aplicação; inicia sob demanda se usado antes disso.
+    """
+
+    def __init__(self):
+        self.io_pool: Optional[ThreadPoolExecutor] = None
+        self.cpu_pool: Optional[ProcessPoolExecutor] = None
+
+    def start(self, io_workers: int = 16, cpu_workers: Optional[int] = None):
+        if self.io_pool is None:
+            self.io_pool = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="io")
+        if self.cpu_pool is None:
+            self.cpu_pool = ProcessPoolExecutor(max_workers=cpu_workers or max(1, (os.cpu_count() or 2) // 2))
+        logger.info(
+            f"Execution layer iniciado (I/O: {self.io_pool._max_workers} threads, "
+            f"CPU: {self.cpu_pool._max_workers} processos)"
+        )
+
+    def shutdown(self):
+        if self.io_pool is not None:
+            self.io_pool.shutdown(wait=False, cancel_futures=True)
+            self.io_pool = None
+        if self.cpu_pool is not None:
+            self.cpu_pool.shutdown(wait=False, cancel_futures=True)
+            self.cpu_pool = None
+
+    async def run_io(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Executa uma chamada de I/O bloqueante no thread pool sem travar o event loop.
+        """
+        if self.io_pool is None:
+            self.start()
+        return await asyncio.get_running_loop().run_in_executor(self.io_pool, partial(fn, *args, **kwargs))
+
+    async def run_cpu(self, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Executa trabalho de CPU no process pool. `fn` e argumentos precisam ser picklable
+        (funções de módulo, não métodos de objetos com clientes/conexões).
+        """
+        if self.cpu_pool is None:
+            self.start()
+        return await asyncio.get_running_loop().run_in_executor(self.cpu_pool, partial(fn, *args, **kwargs))
+
+
+# Instância compartilhada (configurada pelo lifespan do main.py)
+executor = ExecutionLayer()
@@ -0,0 +1,91 @@
+from typing import Dict, Iterator, Optional, Tuple
+
+from fastapi.responses import Response, StreamingResponse
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    If-None-Match casa com a ETag (comparação fraca: `W/"x"` == `"x"`; `*` casa com tudo).
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def etag_response(content: bytes, etag: str, media_type: str, if_none_match: Optional[str],
+                  max_age: int = 3600) -> Response:
+    """
+    Resposta com ETag; 304 sem corpo quando o cliente já tem a mesma versão.
+    """
+    quoted = f'"{etag}"'
+    headers = {"ETag": quoted, "Cache-Control": f"public, max-age={max_age}"}
+    if etag_matches(if_none_match, quoted):
+        return Response(status_code=304, headers=headers)
+    return Response(content=content, media_type=media_type, headers=headers)
+
+
+def parse_byte_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Cabeçalho Range -> (início, fim) inclusivos. None para múltiplos intervalos ou formato não
+    suportado (resposta completa); ValueError para intervalo fora do arquivo (416).
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start_text, separator, end_text = (part.strip() for part in spec.partition("-"))
+    if not separator or not (start_text or end_text) or not all(t.isdigit() for t in (start_text, end_text) if t):
+        return None  # Formato inválido: o cabeçalho é ignorado
+    if not start_text:
+        # Sufixo: os últimos N bytes
+        suffix = int(end_text)
+        if suffix == 0 or size == 0:
+            raise ValueError("intervalo vazio")
+        return max(0, size - suffix), size - 1
+    start = int(start_text)
+    if end_text and int(end_text) < start:
+        return None
+    if start >= size:
+        raise ValueError("intervalo fora do arquivo")
+    return start, min(int(end_text), size - 1) if end_text else size - 1
+
+
+def iter_file(path: str, start: int, length: int, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def file_response(path: str, size: int, etag: str, media_type: str, headers: Dict[str, str],
+                  range_header: Optional[str] = None, if_range: Optional[str] = None,
+                  if_none_match: Optional[str] = None) -> Response:
+    """
+    Arquivo imutável em streaming com ETag (304) e HTTP Range (206/416). `etag` já entre aspas.
+    """
+    headers = dict(headers, **{"ETag": etag, "Accept-Ranges": "bytes"})
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    # If-Range com outra versão: ignora o Range e devolve o arquivo inteiro
+    if range_header and (not if_range or if_range.strip() == etag):
+        try:
+            byte_range = parse_byte_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers=dict(headers, **{"Content-Range": f"bytes */{size}"}))
+
+    if byte_range is None:
+        return StreamingResponse(iter_file(path, 0, size), media_type=media_type,
+                                 headers=dict(headers, **{"Content-Length": str(size)}))
+    start, end = byte_range
+    length = end - start + 1
+    return StreamingResponse(
+        iter_file(path, start, length), status_code=206, media_type=media_type,
+        headers=dict(headers, **{"Content-Length": str(length), "Content-Range": f"bytes {start}-{end}/{size}"})
+    )
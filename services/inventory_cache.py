@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+# Configuração de Logs
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("InventoryCache")
+
+
+class InventoryCache:
+    """
+    Cache em processo do inventário com stale-while-revalidate.
+
+    - Dentro do TTL: serve o snapshot em memória (HIT).
+    - TTL expirado: serve o snapshot antigo (STALE) e dispara UMA atualização em background.
+    - Sem snapshot: todos os chamadores concorrentes aguardam a mesma coleta (MISS, single-flight).
+    """
+
+    def __init__(self, loader: Callable[[Hashable], Awaitable[List[Dict]]], ttl_seconds: float = 900):
+        """
+        Args:
+            loader: Corrotina que produz o inventário completo para uma chave (ex: número de páginas)
+            ttl_seconds: Tempo em segundos até o snapshot ser considerado obsoleto
+        """
+        self.loader = loader
+        self.ttl_seconds = ttl_seconds
+        self.entries: Dict[Hashable, Dict[str, Any]] = {}
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+
+    def _refresh(self, key: Hashable) -> asyncio.Task:
+        """
+        Retorna a atualização em andamento para a chave, ou inicia uma nova (single-flight).
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._inflight.pop(key, None))
+        return task
+
+    async def _load(self, key: Hashable) -> Dict[str, Any]:
+        logger.info(f"Atualizando snapshot do inventário (chave: {key})")
+        data = await self.loader(key)
+        entry = {'data': data, 'loaded_at': time.monotonic()}
+        self.entries[key] = entry
+        return entry
+
+    def _log_refresh_error(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            # Mantém o snapshot antigo; a próxima requisição tenta novamente
+            logger.error(f"Erro ao atualizar snapshot em background: {task.exception()}")
+
+    async def get(self, key: Hashable) -> Tuple[List[Dict], Dict[str, Any]]:
+        """
+        Retorna (inventário, metadados do cache).
+        """
+        entry = self.entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            state = "MISS"
+            entry = await asyncio.shield(self._refresh(key))
+        elif time.monotonic() - entry['loaded_at'] < self.ttl_seconds:
+            self.hits += 1
+            state = "HIT"
+        else:
+            self.stale_hits += 1
+            state = "STALE"
+            if key not in self._inflight:
+                self._refresh(key).add_done_callback(self._log_refresh_error)
+
+        return entry['data'], self._info(entry, state)
+
+    def seed(self, key: Hashable, data: List[Dict]):
+        """
+        Pré-carrega um snapshot já obsoleto (ex: lido do banco após restart).
+        É servido imediatamente como STALE enquanto a primeira coleta roda.
+        """
+        self.entries[key] = {'data': data, 'loaded_at': time.monotonic() - self.ttl_seconds}
+
+    def peek(self, key: Hashable) -> Optional[List[Dict]]:
+        """
+        Retorna o snapshot atual sem disparar coleta (ou None se não existir).
+        """
+        entry = self.entries.get(key)
+        return entry['data'] if entry else None
+
+    def _info(self, entry: Dict[str, Any], state: str) -> Dict[str, Any]:
+        return {
+            "state": state,
+            "age": time.monotonic() - entry['loaded_at'],
+            "hits": self.hits + self.stale_hits,
+            "misses": self.misses
+        }
+
+    def headers(self, info: Dict[str, Any]) -> Dict[str, str]:
+        """
+        Cabeçalhos HTTP que expõem o estado do cache.
+        """
+        return {
+            "X-Cache": info['state'],
+            "X-Cache-Age": str(int(info['age'])),
+            "X-Cache-Hits": str(info['hits']),
+            "X-Cache-Misses": str(info['misses'])
+        }
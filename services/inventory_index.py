@@ -0,0 +1,199 @@
+import base64
+import logging
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import chain, islice
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from services.text import fold_accents
+
+# Configuração de Logs
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("InventoryIndex")
+
+# Faixas de preço dos perfis do frontend (components/Filters.tsx)
+PRICE_PROFILES: Dict[str, Tuple[float, float]] = {
+    'economic': (0, 350_000),
+    'standard': (350_000, 900_000),
+    'luxury': (900_000, 2_500_000),
+    'ultra-luxury': (2_500_000, 15_000_000),
+}
+
+SORT_OPTIONS = ('relevance', 'price_asc', 'price_desc')
+
+# Filtro de quartos do frontend: 5 significa "5 ou mais"
+MAX_BEDROOMS_BUCKET = 5
+
+
+def _neighborhood_key(name: str) -> str:
+    return ' '.join(fold_accents(name).casefold().split())
+
+
+def encode_cursor(offset: int) -> str:
+    return base64.urlsafe_b64encode(str(offset).encode('ascii')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> int:
+    """
+    Cursor opaco -> deslocamento. Levanta ValueError se o cursor for inválido.
+    """
+    padded = cursor + '=' * (-len(cursor) % 4)
+    offset = int(base64.urlsafe_b64decode(padded.encode('ascii')).decode('ascii'))
+    if offset < 0:
+        raise ValueError("cursor negativo")
+    return offset
+
+
+class InventoryIndex:
+    """
+    Índices imutáveis sobre um snapshot do inventário (reconstruídos a cada atualização do cache).
+
+    - Preços ordenados + bisect para faixas de preço e perfis (cada perfil é uma fatia pré-calculada).
+    - Índices invertidos por bairro e número de quartos, guardando o rank de preço de cada
+      imóvel em ordem crescente: a faixa de preço vira um bisect dentro de cada lista.
+    - Consultas paginadas: só a página pedida é materializada.
+    """
+
+    def __init__(self, properties: List[Dict]):
+        self.source = properties
+        n = len(properties)
+
+        prices = [float(p.get('price') or 0.0) for p in properties]
+        # rank -> posição no snapshot (estável: empate mantém a ordem original)
+        self.price_order = array('i', sorted(range(n), key=prices.__getitem__))
+        self.sorted_prices = array('d', (prices[pos] for pos in self.price_order))
+        # posição -> rank
+        self.rank = array('i', bytes(4 * n))
+        for rank, pos in enumerate(self.price_order):
+            self.rank[pos] = rank
+
+        by_neighborhood: Dict[str, List[int]] = {}
+        by_bedrooms: Dict[int, List[int]] = {}
+        # Percorrer em ordem de preço gera listas de ranks já ordenadas
+        for rank, pos in enumerate(self.price_order):
+            prop = properties[pos]
+            location = prop.get('location') or {}
+            neighborhood = location.get('neighborhood', '') if isinstance(location, dict) else ''
+            by_neighborhood.setdefault(_neighborhood_key(neighborhood), []).append(rank)
+            bedrooms = prop.get('bedrooms')
+            if isinstance(bedrooms, int):
+                by_bedrooms.setdefault(min(bedrooms, MAX_BEDROOMS_BUCKET), []).append(rank)
+
+        self.by_neighborhood = {key: array('i', ranks) for key, ranks in by_neighborhood.items()}
+        self.by_bedrooms = {key: array('i', ranks) for key, ranks in by_bedrooms.items()}
+        self._bedroom_sets = {key: set(ranks) for key, ranks in by_bedrooms.items()}
+
+        self.profile_slices = {
+            profile: self._price_slice(low, high) for profile, (low, high) in PRICE_PROFILES.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.source)
+
+    def _price_slice(self, min_price: Optional[float], max_price: Optional[float]) -> Tuple[int, int]:
+        lo = bisect_left(self.sorted_prices, min_price) if min_price is not None else 0
+        hi = bisect_right(self.sorted_prices, max_price) if max_price is not None else len(self.sorted_prices)
+        return lo, max(lo, hi)
+
+    @staticmethod
+    def _rank_slice(ranks: array, lo: int, hi: int) -> array:
+        return ranks[bisect_left(ranks, lo):bisect_left(ranks, hi)]
+
+    def _matching_ranks(self, lo: int, hi: int, neighborhoods: Iterable[str],
+                        bedrooms: Optional[int]) -> Optional[List[int]]:
+        """
+        Ranks (ordem crescente de preço) que passam nos filtros invertidos dentro de [lo, hi).
+        None quando só há filtro de preço.
+        """
+        keys = {_neighborhood_key(n) for n in neighborhoods if n}
+        bucket = min(bedrooms, MAX_BEDROOMS_BUCKET) if bedrooms is not None else None
+
+        if not keys:
+            if bucket is None:
+                return None
+            return self._rank_slice(self.by_bedrooms.get(bucket, array('i')), lo, hi)
+
+        slices = [self._rank_slice(self.by_neighborhood[key], lo, hi) for key in keys if key in self.by_neighborhood]
+        if len(slices) == 1:
+            ranks = slices[0]
+        else:
+            ranks = sorted(chain.from_iterable(slices))  # Timsort intercala as fatias já ordenadas
+
+        if bucket is not None:
+            allowed = self._bedroom_sets.get(bucket, set())
+            ranks = [rank for rank in ranks if rank in allowed]
+        return ranks
+
+    def query(self, min_price: Optional[float] = None, max_price: Optional[float] = None,
+              neighborhoods: Iterable[str] = (), profile: Optional[str] = None,
+              bedrooms: Optional[int] = None, sort: str = 'relevance',
+              limit: int = 50, offset: int = 0) -> Tuple[List[Dict], int]:
+        """
+        Retorna (página de imóveis, total de resultados).
+        """
+        lo, hi = self._price_slice(min_price, max_price)
+        if profile and profile != 'all':
+            profile_lo, profile_hi = self.profile_slices[profile]
+            lo, hi = max(lo, profile_lo), min(hi, profile_hi)
+        hi = max(lo, hi)
+
+        ranks = self._matching_ranks(lo, hi, neighborhoods, bedrooms)
+        if ranks is None:
+            ranks = range(lo, hi)
+        total = len(ranks)
+
+        if sort == 'price_asc':
+            page = ranks[offset:offset + limit]
+        elif sort == 'price_desc':
+            page = ranks[max(0, total - offset - limit):max(0, total - offset)][::-1]
+        else:
+            # Ordem original do snapshot
+            if total == len(self):
+                positions = range(offset, min(total, offset + limit))
+            elif isinstance(ranks, range) and total * 8 >= len(self):
+                # Faixa de preço ampla: varrer na ordem original até encher a página
+                rank_of = self.rank
+                matches = (pos for pos in range(len(self)) if lo <= rank_of[pos] < hi)
+                positions = list(islice(matches, offset, offset + limit))
+            else:
+                positions = sorted(self.price_order[rank] for rank in ranks)[offset:offset + limit]
+            return [self.source[pos] for pos in positions], total
+
+        return [self.source[self.price_order[rank]] for rank in page], total
+
+
+if __name__ == "__main__":
+    # Benchmark: consultas filtradas sobre 100k imóveis
+    import random
+    import time
+
+    random.seed(7)
+    neighborhoods = ["Pituba", "Barra", "Horto Florestal", "Graça", "Ondina", "Vitória", "Caminho das Árvores"]
+    inventory = [{
+        'link': f"https://www.lopes.com.br/imovel/{i}",
+        'price': float(random.randint(150, 6000) * 1000),
+        'bedrooms': random.randint(1, 6),
+        'location': {'neighborhood': random.choice(neighborhoods)}
+    } for i in range(100_000)]
+
+    start = time.perf_counter()
+    index = InventoryIndex(inventory)
+    print(f"Construção do índice (100k imóveis): {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    queries = {
+        "sem filtros": {},
+        "faixa de preço, price_asc": {'min_price': 800_000, 'max_price': 1_200_000, 'sort': 'price_asc'},
+        "perfil luxury": {'profile': 'luxury'},
+        "bairro + quartos": {'neighborhoods': ['Pituba'], 'bedrooms': 3},
+        "2 bairros + faixa + price_desc": {
+            'neighborhoods': ['Barra', 'graca'], 'min_price': 500_000, 'max_price': 3_000_000, 'sort': 'price_desc'
+        },
+        "perfil + 5+ quartos, página 3": {'profile': 'standard', 'bedrooms': 5, 'offset': 100},
+    }
+    for label, params in queries.items():
+        runs = 50
+        start = time.perf_counter()
+        for _ in range(runs):
+            page, total = index.query(**params)
+        elapsed = (time.perf_counter() - start) / runs
+        print(f"{label:<34} {elapsed * 1000:6.2f} ms  ({total} resultados, página com {len(page)})")
@@ -0,0 +1,29 @@
+import hashlib
+import json
+from typing import Any, Dict
+
+# Versão da lógica de enriquecimento (SEO, refinamento, JSON-LD).
+# Incrementar invalida todos os resultados em cache.
+ENRICHMENT_VERSION = 1
+
+# Campos que alimentam o enriquecimento: mudou algum deles, o imóvel é reprocessado
+FINGERPRINT_FIELDS = ('link', 'title', 'description', 'type', 'price', 'bedrooms', 'bathrooms', 'area', 'parking')
+
+
+def listing_id(link: str) -> str:
+    """
+    Identificador público e estável de um imóvel (hash curto do link), seguro para URLs.
+    """
+    return hashlib.blake2b(link.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def content_fingerprint(prop: Dict[str, Any]) -> str:
+    """
+    Hash do conteúdo relevante para o enriquecimento (inclui a versão da lógica).
+    """
+    location = prop.get('location') or {}
+    payload = {field: prop.get(field) for field in FINGERPRINT_FIELDS}
+    payload['neighborhood'] = location.get('neighborhood') if isinstance(location, dict) else location
+    payload['v'] = ENRICHMENT_VERSION
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
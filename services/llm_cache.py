@@ -0,0 +1,204 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+# Configuração de Logs
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("LLMCache")
+
+DEFAULT_CACHE_PATH = os.path.join(".cache", "llm_cache.sqlite3")
+
+
+class LLMCache:
+    """
+    Cache em disco (SQLite) das respostas do Gemini, endereçado pelo conteúdo:
+    a chave é o hash de modelo + prompt + opções da chamada (generation_config, safety_settings...).
+    Entradas expiram por TTL e, acima de `max_bytes`, as menos usadas recentemente são removidas (LRU).
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl_seconds: float = 7 * 86400,
+                 max_bytes: int = 50 * 1024 * 1024):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model: str, prompt: str, options: Optional[Dict[str, Any]] = None) -> str:
+        payload = f"{model}\x00{prompt}"
+        if options:
+            payload += "\x00" + json.dumps(options, sort_keys=True, default=_jsonable)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, model: str, prompt: str, options: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        key = self.make_key(model, prompt, options)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, model: str, prompt: str, response: str, options: Optional[Dict[str, Any]] = None):
+        key = self.make_key(model, prompt, options)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, len(response.encode('utf-8')), now, now)
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def delete(self, model: str, prompt: str, options: Optional[Dict[str, Any]] = None) -> bool:
+        key = self.make_key(model, prompt, options)
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM responses WHERE key = ?", (key,)).rowcount
+            self._conn.commit()
+        return deleted > 0
+
+    def _evict(self, now: float):
+        self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # LRU: remover as entradas acessadas há mais tempo até caber no limite
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at ASC"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "entries": entries,
+            "size_bytes": size
+        }
+
+
+def _jsonable(value: Any) -> Any:
+    """
+    Forma serializável (e estável) das opções da chamada para compor a chave.
+    """
+    if hasattr(value, 'to_dict'):
+        return value.to_dict()
+    if hasattr(value, '__dict__'):
+        return vars(value)
+    return str(value)
+
+
+class CachedResponse:
+    """
+    Resposta servida do cache (mesma interface usada de `GenerateContentResponse`).
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class CachedModel:
+    """
+    Envolve um `genai.GenerativeModel`: prompts repetidos não geram chamada de rede nem tokens.
+
+    - `validate(text)`: só respostas aprovadas entram no cache; uma entrada em cache reprovada
+      é descartada e o modelo é chamado de novo.
+    - `invalidate(prompt)`: descarta a entrada de um prompt cuja resposta o chamador rejeitou.
+    """
+
+    def __init__(self, model, cache: LLMCache):
+        self.model = model
+        self.cache = cache
+        self.model_name = getattr(model, 'model_name', str(model))
+
+    def generate_content(self, prompt: str, validate: Optional[Callable[[str], Any]] = None, **kwargs):
+        cached = self.cache.get(self.model_name, prompt, kwargs)
+        if cached is not None:
+            if _accepts(validate, cached):
+                return CachedResponse(cached)
+            self.cache.delete(self.model_name, prompt, kwargs)
+
+        response = self.model.generate_content(prompt, **kwargs)
+        # `response.text` levanta exceção em respostas bloqueadas: nada é gravado nesse caso
+        text = response.text
+        if text and text.strip() and _accepts(validate, text):
+            self.cache.set(self.model_name, prompt, text, kwargs)
+        return response
+
+    def invalidate(self, prompt: str, **kwargs) -> bool:
+        return self.cache.delete(self.model_name, prompt, kwargs)
+
+
+def _accepts(validate: Optional[Callable[[str], Any]], text: str) -> bool:
+    if validate is None:
+        return True
+    try:
+        return bool(validate(text))
+    except Exception:
+        return False
+
+
+_shared_cache: Optional[LLMCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache:
+    """
+    Cache compartilhado por todos os serviços (configurável via LLM_CACHE_PATH / LLM_CACHE_TTL / LLM_CACHE_MAX_MB).
+    """
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = LLMCache(
+                path=os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH),
+                ttl_seconds=float(os.getenv("LLM_CACHE_TTL", str(7 * 86400))),
+                max_bytes=int(float(os.getenv("LLM_CACHE_MAX_MB", "50")) * 1024 * 1024)
+            )
+        return _shared_cache
+
+
+def cached_model(model) -> CachedModel:
+    return CachedModel(model, get_llm_cache())
@@ -1,11 +1,21 @@
+import asyncio
+import hashlib
 import logging
 import random
 import time
 import re
-from typing import List, Dict
+from typing import AsyncIterator, Any, List, Dict, Optional, Tuple
 from datetime import datetime
+import httpx
 import requests
-from bs4 import BeautifulSoup
+
+from services.card_parser import get_card_parser
+from services.crawl_frontier import CrawlFrontier
+from services.executor import executor
+from services.listing import content_fingerprint, listing_id
+from services.price_history import PriceHistoryStore
+from services.rate_limiter import HostRateLimiter
+from services.storage import Storage
 
 # Configuração de Logs
 logging.basicConfig(level=logging.INFO)
@@ -14,7 +24,7 @@ logger = logging.getLogger("LopesScraper")
 
 class LopesScraper:
     """
-    Scraper otimizado para Windows usando requests + BeautifulSoup.
+    Scraper otimizado para Windows usando requests/httpx + lxml (fallback: BeautifulSoup).
     Coleta lançamentos imobiliários da Lopes.com.br
     """
     
@@ -27,7 +37,20 @@ class LopesScraper:
         "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
     ]
 
-    def __init__(self):
+    # Marcas de uma página de resultados legítima sem cards (links de paginação ou aviso de busca
+    # vazia). Captcha e páginas de bloqueio não trazem nenhuma delas: página vazia sem marca != fim.
+    END_OF_RESULTS_MARKERS = ('pagina=', 'nenhum imóvel', 'nenhum resultado', 'não encontramos')
+
+    def __init__(self, requests_per_second: float = 0.5, burst: int = 2, concurrency: int = 4,
+                 storage: Optional[Storage] = None, parser: str = 'auto'):
+        """
+        Args:
+            requests_per_second: Taxa sustentada de requisições por host (modo assíncrono)
+            burst: Rajada máxima de requisições permitida pelo token bucket
+            concurrency: Número máximo de páginas buscadas simultaneamente
+            storage: Persistência do histórico de preços (opcional)
+            parser: Backend de parsing HTML ('auto', 'lxml' ou 'html.parser')
+        """
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': random.choice(self.USER_AGENTS),
@@ -37,48 +60,91 @@ class LopesScraper:
             'Connection': 'keep-alive',
             'Upgrade-Insecure-Requests': '1'
         })
-        self.price_history_db = {}
+        self.card_parser = get_card_parser(parser)
+        self.storage = storage
+        self.price_history = storage.load_price_history() if storage else PriceHistoryStore()
+
+        # Modo assíncrono: cliente keep-alive compartilhado + rate limit por host
+        self.concurrency = max(1, concurrency)
+        self.rate_limiter = HostRateLimiter(rate=requests_per_second, burst=burst)
+        self._client: Optional[httpx.AsyncClient] = None
+
+        # Revalidação condicional: URL -> {etag, last_modified, body_hash, items}
+        self.page_validators: Dict[str, Dict[str, Any]] = {}
+        # Estatísticas da última coleta concluída (cada coleta acumula as suas em um dict próprio)
+        self.last_run_stats: Dict[str, int] = {}
+
+    def _build_page_url(self, page: int) -> str:
+        if page == 1:
+            return f"{self.BASE_URL}{self.FILTERS}"
+        return f"{self.BASE_URL}{self.FILTERS}&pagina={page}"
+
+    @staticmethod
+    def _new_run(stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Estado de uma coleta: estatísticas e pontos de preço a persistir no fim.
+        Coletas simultâneas (API e scheduler) não compartilham esse estado; quem precisa das
+        estatísticas da própria coleta passa o dict `stats` a ser preenchido.
+        """
+        stats = stats if stats is not None else {}
+        stats.update({'pages_parsed': 0, 'pages_skipped': 0, 'pages_failed': 0, 'bytes_downloaded': 0})
+        return {'stats': stats, 'price_points': []}
+
+    def _parse_page(self, content: bytes, page: int, price_points: Optional[List[Dict]] = None) -> List[Dict]:
+        """
+        Extrai e processa todos os cards de uma página de resultados.
+        """
+        return self._parse_cards(content, page, price_points)[0]
+
+    def _parse_cards(self, content: bytes, page: int,
+                     price_points: Optional[List[Dict]] = None) -> Tuple[List[Dict], bool]:
+        """
+        (itens, fim_dos_resultados). Só é fim dos resultados uma página após a primeira em que
+        nenhum seletor (nem os alternativos) encontrou cards e que traz as marcas de uma página
+        de resultados legítima.
+        """
+        results = []
+        property_cards, used_fallback = self.card_parser.find_cards(content)
+        end_of_results = not property_cards and page > 1 and self._has_end_markers(content)
+        
+        if used_fallback:
+            logger.warning(f"Nenhum card encontrado na página {page}")
+        
+        logger.info(f"Encontrados {len(property_cards)} imóveis na página {page}")
+        
+        for card in property_cards:
+            try:
+                item_data = self.card_parser.extract(card)
+                if item_data:
+                    processed = self._process_item(item_data, price_points)
+                    results.append(processed)
+            except Exception as e:
+                logger.error(f"Erro ao extrair dados do card: {e}")
+                continue
+        
+        return results, end_of_results
+
+    def _has_end_markers(self, content: bytes) -> bool:
+        text = content.decode('utf-8', errors='ignore').lower()
+        return any(marker in text for marker in self.END_OF_RESULTS_MARKERS)
 
     def scrape_inventory(self, max_pages: int = 1) -> List[Dict]:
         """
-        Coleta inventário de imóveis.
+        Coleta inventário de imóveis (modo síncrono, sequencial).
         """
         logger.info(f"Iniciando coleta de imóveis. Max Pages: {max_pages}")
         results = []
+        price_points: List[Dict] = []
 
         for current_page in range(1, max_pages + 1):
-            if current_page == 1:
-                url = f"{self.BASE_URL}{self.FILTERS}"
-            else:
-                url = f"{self.BASE_URL}{self.FILTERS}&pagina={current_page}"
-            
+            url = self._build_page_url(current_page)
             logger.info(f"Acessando: {url}")
             
             try:
                 response = self.session.get(url, timeout=30)
                 response.raise_for_status()
                 
-                soup = BeautifulSoup(response.content, 'html.parser')
-                
-                # Encontrar todos os cards de imóveis
-                property_cards = soup.find_all('a', class_='lead-button')
-                
-                if not property_cards:
-                    logger.warning(f"Nenhum card encontrado na página {current_page}")
-                    # Tentar outros seletores possíveis
-                    property_cards = soup.find_all('div', class_='property-card') or soup.find_all('article')
-                
-                logger.info(f"Encontrados {len(property_cards)} imóveis na página {current_page}")
-                
-                for card in property_cards:
-                    try:
-                        item_data = self._extract_property_data(card)
-                        if item_data:
-                            processed = self._process_item(item_data)
-                            results.append(processed)
-                    except Exception as e:
-                        logger.error(f"Erro ao extrair dados do card: {e}")
-                        continue
+                results.extend(self._parse_page(response.content, current_page, price_points))
                 
                 # Delay aleatório para evitar bloqueio
                 time.sleep(random.uniform(2, 4))
@@ -87,81 +153,222 @@ class LopesScraper:
                 logger.error(f"Erro ao acessar página {current_page}: {e}")
                 continue
         
+        self._flush_price_points(price_points)
         logger.info(f"Coleta finalizada. {len(results)} imóveis encontrados.")
         return results
 
-    def _extract_property_data(self, card) -> Dict:
+    def _get_client(self) -> httpx.AsyncClient:
         """
-        Extrai dados de um card de imóvel.
+        Retorna o cliente HTTP assíncrono (pool keep-alive reaproveitado entre coletas).
         """
-        data = {}
-        
-        # Link
-        data['link'] = card.get('href', '')
-        if data['link'] and not data['link'].startswith('http'):
-            data['link'] = f"https://www.lopes.com.br{data['link']}"
-        
-        # Título (h2 ou h3)
-        title_elem = card.find('h2') or card.find('h3')
-        data['title'] = title_elem.get_text(strip=True) if title_elem else 'Sem Título'
-        
-        # Preço
-        price_text = '0'
-        price_elems = card.find_all('p')
-        for p in price_elems:
-            text = p.get_text(strip=True)
-            if 'R$' in text:
-                price_text = text
-                break
-        data['priceText'] = price_text
-        
-        # Fotos
-        photos = []
-        img_tags = card.find_all('img')
-        for img in img_tags:
-            src = img.get('src', '') or img.get('data-src', '')
-            if src and 'data:image' not in src:
-                if not src.startswith('http'):
-                    src = f"https://www.lopes.com.br{src}"
-                photos.append(src)
-        data['photos'] = photos
-        
-        # Detalhes (área, quartos, etc.)
-        details = []
-        detail_items = card.find_all('li')
-        for li in detail_items:
-            detail_text = li.get_text(strip=True)
-            if detail_text:
-                details.append(detail_text)
-        data['details'] = details
-        
-        # Localização e Descrição
-        all_text = card.get_text('\n', strip=True)
-        lines = [line.strip() for line in all_text.split('\n') if line.strip()]
-        
-        # Localização (linha com vírgula e sem R$, comprimento médio)
-        location = ''
-        for line in lines:
-            if ',' in line and 'R$' not in line and 10 < len(line) < 100:
-                location = line
-                break
-        data['location'] = location
-        
-        # Descrição (linha mais longa, excluindo título, preço e localização)
-        description = ''
-        for line in lines:
-            if (len(line) > 50 and 
-                line != data['title'] and 
-                line != price_text and 
-                line != location and
-                'R$' not in line):
-                description = line
-                break
-        data['description'] = description
-        
-        return data
+        if self._client is None or self._client.is_closed:
+            headers = dict(self.session.headers)
+            headers['Accept-Encoding'] = 'gzip, deflate'
+            self._client = httpx.AsyncClient(
+                headers=headers,
+                timeout=30,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=self.concurrency,
+                    max_keepalive_connections=self.concurrency
+                )
+            )
+        return self._client
+
+    async def _fetch_page(self, page: int, semaphore: asyncio.Semaphore,
+                          stats: Dict[str, int]) -> Optional[Dict[str, Any]]:
+        """
+        Busca uma página com revalidação condicional (If-None-Match / If-Modified-Since).
+        Retorna None em caso de erro; 'unchanged' = True se a resposta foi 304 ou o corpo tem o mesmo hash.
+        """
+        url = self._build_page_url(page)
+        cached = self.page_validators.get(url)
+        headers = {}
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        async with semaphore:
+            await self.rate_limiter.acquire(url)
+            logger.info(f"Acessando: {url}")
+            try:
+                response = await self._get_client().get(url, headers=headers)
+                if response.status_code == 304 and cached:
+                    return {'url': url, 'unchanged': True}
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                logger.error(f"Erro ao acessar página {page}: {e}")
+                return None
+
+        content = response.content
+        stats['bytes_downloaded'] += len(content)
+        body_hash = hashlib.sha256(content).hexdigest()
+        validators = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'body_hash': body_hash
+        }
+        if cached and cached['body_hash'] == body_hash:
+            cached.update(validators)
+            return {'url': url, 'unchanged': True}
+        return {'url': url, 'unchanged': False, 'content': content, 'validators': validators}
+
+    async def iter_inventory(self, max_pages: int = 1,
+                             stats: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict]:
+        """
+        Gera os imóveis processados à medida que cada página é baixada e parseada.
+        Até `concurrency` páginas são buscadas em paralelo (token bucket por host),
+        mas os itens saem na ordem das páginas. Páginas inalteradas desde a última
+        coleta reaproveitam os itens já processados (sem parsing nem _process_item).
+        `stats` (opcional) recebe as estatísticas desta coleta.
+        """
+        logger.info(f"Iniciando coleta assíncrona. Max Pages: {max_pages}, Concorrência: {self.concurrency}")
+        run = self._new_run(stats)
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = [asyncio.ensure_future(self._fetch_page(page, semaphore, run['stats']))
+                 for page in range(1, max_pages + 1)]
+        count = 0
+
+        try:
+            for page, task in enumerate(tasks, start=1):
+                for item in self._page_items(await task, page, run)[0]:
+                    count += 1
+                    yield item
+        finally:
+            # Consumidor desistiu antes do fim: não deixar downloads órfãos
+            for task in tasks:
+                task.cancel()
+            await self._finish_run(run, count)
+
+    async def iter_incremental(self, frontier: CrawlFrontier, stop_after: int = 2, max_pages: int = 100,
+                               full_sweep: bool = False,
+                               stats: Optional[Dict[str, Any]] = None) -> AsyncIterator[Dict]:
+        """
+        Coleta incremental: continua paginando enquanto as páginas trazem itens NEW ou
+        PRICE_CHANGED (segundo a fronteira) e para após `stop_after` páginas seguidas só
+        com itens UNCHANGED. Com `full_sweep`, percorre até o fim (ou `max_pages`).
+        `stats` (opcional) recebe as estatísticas desta coleta, incluindo `full_sweep`.
+        """
+        logger.info(
+            f"Iniciando coleta incremental. Parada após {stop_after} páginas conhecidas, "
+            f"limite: {max_pages} páginas, varredura completa: {full_sweep}"
+        )
+        run = self._new_run(stats)
+        stats = run['stats']
+        semaphore = asyncio.Semaphore(self.concurrency)
+        # Prefetch limitado à concorrência: no pior caso, concurrency - 1 páginas a mais que o necessário
+        tasks = {
+            page: asyncio.ensure_future(self._fetch_page(page, semaphore, stats))
+            for page in range(1, min(self.concurrency, max_pages) + 1)
+        }
+        known_streak = 0
+        count = 0
+        page = 0
+        reached_end = False
+
+        try:
+            for page in range(1, max_pages + 1):
+                fetched = await tasks.pop(page)
+                next_page = page + self.concurrency
+                if next_page <= max_pages:
+                    tasks[next_page] = asyncio.ensure_future(self._fetch_page(next_page, semaphore, stats))
+
+                items, end_of_results = self._page_items(fetched, page, run)
+                if fetched is not None and not items:
+                    if end_of_results:
+                        logger.info(f"Página {page} vazia: fim do inventário")
+                        reached_end = True
+                    else:
+                        # Captcha/bloqueio/layout novo: não dá para concluir que o inventário acabou
+                        logger.warning(f"Página {page} sem imóveis e sem marcas de fim dos resultados; "
+                                       f"coleta encerrada como incompleta")
+                        stats['pages_failed'] += 1
+                    break
 
-    def _process_item(self, item: Dict) -> Dict:
+                has_news = False
+                for item in items:
+                    if frontier.classify(item['link'], item['price']) != 'UNCHANGED':
+                        has_news = True
+                    frontier.observe(item['link'], item['price'], item['collected_at'])
+                    count += 1
+                    yield item
+
+                known_streak = 0 if has_news or fetched is None else known_streak + 1
+                if known_streak >= stop_after and not full_sweep:
+                    logger.info(f"{known_streak} páginas seguidas sem novidades; parando na página {page}")
+                    break
+            else:
+                reached_end = True
+        finally:
+            for task in tasks.values():
+                task.cancel()
+            if full_sweep and reached_end:
+                frontier.mark_full_sweep()
+            # Gravação da fronteira (JSON) fora do event loop, como os demais flushes
+            await executor.run_io(frontier.save)
+            stats['pages_visited'] = page
+            # Só uma varredura completa sem falhas permite concluir que um imóvel saiu do ar
+            stats['full_sweep'] = full_sweep and reached_end and not stats['pages_failed']
+            await self._finish_run(run, count)
+
+    def _page_items(self, fetched: Optional[Dict[str, Any]], page: int,
+                    run: Dict[str, Any]) -> Tuple[List[Dict], bool]:
+        """
+        (itens, fim_dos_resultados) de uma página buscada: itens reaproveitados se a página não
+        mudou, senão parseados.
+        """
+        stats = run['stats']
+        if fetched is None:
+            stats['pages_failed'] += 1
+            return [], False
+
+        if fetched['unchanged']:
+            stats['pages_skipped'] += 1
+            logger.info(f"Página {page} inalterada; reaproveitando itens processados")
+            collected_at = datetime.now().isoformat()
+            cached = self.page_validators[fetched['url']]
+            return [
+                dict(item, status='UNCHANGED', collected_at=collected_at)
+                for item in cached['items']
+            ], cached.get('end_of_results', False)
+
+        stats['pages_parsed'] += 1
+        items, end_of_results = self._parse_cards(fetched['content'], page, run['price_points'])
+        self.page_validators[fetched['url']] = dict(
+            fetched['validators'], items=[dict(item) for item in items], end_of_results=end_of_results
+        )
+        return items, end_of_results
+
+    async def _finish_run(self, run: Dict[str, Any], count: int):
+        stats = run['stats']
+        self.last_run_stats = stats
+        # Escrita no banco fora do event loop
+        await executor.run_io(self._flush_price_points, run['price_points'])
+        logger.info(
+            f"Coleta finalizada. {count} imóveis encontrados. "
+            f"Páginas: {stats['pages_parsed']} processadas, "
+            f"{stats['pages_skipped']} inalteradas (puladas), "
+            f"{stats['pages_failed']} com erro."
+        )
+
+    async def scrape_inventory_async(self, max_pages: int = 1) -> List[Dict]:
+        """
+        Coleta inventário buscando até `concurrency` páginas simultaneamente.
+        A politeness vem do token bucket por host; resultados mantêm a ordem das páginas.
+        """
+        return [item async for item in self.iter_inventory(max_pages)]
+
+    async def aclose(self):
+        """
+        Fecha o pool de conexões do modo assíncrono.
+        """
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _process_item(self, item: Dict, price_points: Optional[List[Dict]] = None) -> Dict:
         """
         Processa e estrutura os dados brutos do imóvel.
         """
@@ -251,6 +458,7 @@ class LopesScraper:
             'type': 'Apartamento',
             'photos': item.get('photos', []),
             'description': item.get('description', ''),
+            'id': listing_id(item['link']) if item.get('link') else None,
             'link': item.get('link', ''),
             'collected_at': datetime.now().isoformat(),
             'source': 'Lopes'
@@ -258,27 +466,40 @@ class LopesScraper:
         
         # Price tracking
         item_id = processed['link']
-        if item_id and item_id in self.price_history_db:
-            last_price = self.price_history_db[item_id][-1]['price']
-            if price_clean != last_price:
+        if item_id and item_id in self.price_history:
+            # Só mudanças reais de preço viram ponto no histórico
+            if self._record_price(item_id, price_clean, processed['collected_at'], price_points):
                 processed['status'] = 'PRICE_CHANGED'
-                self.price_history_db[item_id].append({
-                    'price': price_clean,
-                    'date': processed['collected_at']
-                })
             else:
                 processed['status'] = 'UNCHANGED'
         else:
             processed['status'] = 'NEW'
             if item_id:
-                self.price_history_db[item_id] = [{
-                    'price': price_clean,
-                    'date': processed['collected_at']
-                }]
+                self._record_price(item_id, price_clean, processed['collected_at'], price_points)
         
-        processed['price_history'] = self.price_history_db.get(item_id, [])
+        # Histórico de preços não vai no item: consulta sob demanda em /properties/{id}/price-history
+        # Impressão digital do conteúdo: enriquecimento só é refeito quando ela muda
+        processed['fingerprint'] = content_fingerprint(processed)
         return processed
 
+    def _record_price(self, item_id: str, price: float, date: str,
+                      price_points: Optional[List[Dict]] = None) -> bool:
+        recorded = self.price_history.record(item_id, price, date)
+        if recorded and self.storage and price_points is not None:
+            price_points.append({'link': item_id, 'price': price, 'date': date})
+        return recorded
+
+    def _flush_price_points(self, points: List[Dict]):
+        """
+        Persiste em lote os pontos de preço registrados durante a coleta.
+        """
+        if not self.storage or not points:
+            return
+        try:
+            self.storage.append_price_points(points)
+        except Exception as e:
+            logger.error(f"Erro ao persistir histórico de preços: {e}")
+
 
 if __name__ == "__main__":
     # Teste
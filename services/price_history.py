@@ -0,0 +1,223 @@
+import logging
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from services.listing import listing_id
+
+# Configuração de Logs
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("PriceHistoryStore")
+
+Timestamp = Union[str, datetime, float, int, None]
+
+# Pontos de histórico embutidos por imóvel quando a listagem pede o histórico (?include_history)
+ITEM_HISTORY_POINTS = 12
+
+DOWNSAMPLING_METHODS = ('lttb', 'minmax', 'uniform')
+
+
+def _to_epoch(when: Timestamp) -> int:
+    if when is None:
+        return int(datetime.now().timestamp())
+    if isinstance(when, (int, float)):
+        return int(when)
+    if isinstance(when, str):
+        when = datetime.fromisoformat(when)
+    return int(when.timestamp())
+
+
+def uniform_indices(times: Sequence[int], values: Sequence[float], max_points: int) -> List[int]:
+    """
+    Amostragem uniforme que sempre preserva o primeiro e o último ponto.
+    """
+    n = len(times)
+    if max_points == 1:
+        return [n - 1]
+    step = (n - 1) / (max_points - 1)
+    return [round(i * step) for i in range(max_points)]
+
+
+def minmax_indices(times: Sequence[int], values: Sequence[float], max_points: int) -> List[int]:
+    """
+    Divide a série em baldes e mantém o mínimo e o máximo de cada um (picos preservados).
+    """
+    n = len(times)
+    if max_points < 4:
+        return uniform_indices(times, values, max_points)
+    buckets = (max_points - 2) // 2
+    size = (n - 2) / buckets
+    indices = [0]
+    for b in range(buckets):
+        lo, hi = 1 + int(b * size), 1 + int((b + 1) * size)
+        if lo >= hi:
+            continue
+        low = min(range(lo, hi), key=values.__getitem__)
+        high = max(range(lo, hi), key=values.__getitem__)
+        indices.extend(sorted({low, high}))
+    indices.append(n - 1)
+    return indices
+
+
+def lttb_indices(times: Sequence[int], values: Sequence[float], max_points: int) -> List[int]:
+    """
+    Largest-Triangle-Three-Buckets: em cada balde, o ponto que forma o maior triângulo
+    com o ponto escolhido no balde anterior e a média do próximo balde.
+    """
+    n = len(times)
+    if max_points < 3:
+        return uniform_indices(times, values, max_points)
+    size = (n - 2) / (max_points - 2)
+    indices = [0]
+    a = 0
+    for b in range(max_points - 2):
+        lo, hi = 1 + int(b * size), 1 + int((b + 1) * size)
+        next_lo, next_hi = hi, min(1 + int((b + 2) * size), n)
+        avg_t = sum(times[next_lo:next_hi]) / (next_hi - next_lo)
+        avg_v = sum(values[next_lo:next_hi]) / (next_hi - next_lo)
+        ax, ay = times[a], values[a]
+        a = max(
+            range(lo, hi),
+            key=lambda i: abs((ax - avg_t) * (values[i] - ay) - (ax - times[i]) * (avg_v - ay))
+        )
+        indices.append(a)
+    indices.append(n - 1)
+    return indices
+
+
+_DOWNSAMPLERS = {'lttb': lttb_indices, 'minmax': minmax_indices, 'uniform': uniform_indices}
+
+
+class PriceHistoryStore:
+    """
+    Histórico de preços compacto e colunar.
+
+    - Links internados em ids inteiros (o link é guardado uma única vez).
+    - Por imóvel, duas colunas tipadas: preços (`array('d')`) e timestamps epoch (`array('q')`).
+    - Só mudanças reais de preço são gravadas; preço repetido não gera ponto.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._public_ids: Dict[str, int] = {}  # listing_id(link) -> id interno
+        self._links: List[str] = []
+        self._prices: List[array] = []
+        self._times: List[array] = []
+        self.point_count = 0
+
+    @classmethod
+    def from_points(cls, points: Iterable[Tuple[str, float, Timestamp]]) -> "PriceHistoryStore":
+        """
+        Monta o store a partir de pontos (link, preço, data) em ordem cronológica por link.
+        """
+        store = cls()
+        for link, price, when in points:
+            store.record(link, price, when)
+        return store
+
+    def _intern(self, link: str) -> int:
+        internal = self._ids.get(link)
+        if internal is None:
+            internal = len(self._links)
+            self._ids[link] = internal
+            self._public_ids[listing_id(link)] = internal
+            self._links.append(link)
+            self._prices.append(array('d'))
+            self._times.append(array('q'))
+        return internal
+
+    def link_for(self, public: str) -> Optional[str]:
+        """
+        Resolve o id público do imóvel (ver services.listing) para o link.
+        """
+        internal = self._public_ids.get(public)
+        return self._links[internal] if internal is not None else None
+
+    def last_price(self, link: str) -> Optional[float]:
+        internal = self._ids.get(link)
+        if internal is None or not self._prices[internal]:
+            return None
+        return self._prices[internal][-1]
+
+    def record(self, link: str, price: float, when: Timestamp = None) -> bool:
+        """
+        Registra um preço. Retorna True se virou um novo ponto (primeiro preço ou mudança).
+        """
+        price = float(price or 0.0)
+        internal = self._intern(link)
+        prices = self._prices[internal]
+        if prices and prices[-1] == price:
+            return False
+        prices.append(price)
+        self._times[internal].append(_to_epoch(when))
+        self.point_count += 1
+        return True
+
+    def columns(self, link: str, start: Timestamp = None, end: Timestamp = None) -> Tuple[array, array]:
+        """
+        Colunas (timestamps, preços) de um imóvel, opcionalmente recortadas por período.
+        """
+        internal = self._ids.get(link)
+        if internal is None:
+            return array('q'), array('d')
+        times, prices = self._times[internal], self._prices[internal]
+        lo = bisect_left(times, _to_epoch(start)) if start is not None else 0
+        hi = bisect_right(times, _to_epoch(end)) if end is not None else len(times)
+        return times[lo:hi], prices[lo:hi]
+
+    def get_history(self, link: str, start: Timestamp = None, end: Timestamp = None,
+                    max_points: Optional[int] = None, method: str = 'uniform') -> List[Dict]:
+        """
+        Histórico no formato [{'price', 'date'}], reduzido no servidor para no máximo
+        `max_points` pontos ('lttb', 'minmax' ou 'uniform').
+        """
+        times, prices = self.columns(link, start, end)
+        indices = range(len(times))
+        if max_points is not None and 0 < max_points < len(times):
+            indices = _DOWNSAMPLERS[method](times, prices, max_points)
+        return [
+            {'price': prices[i], 'date': datetime.fromtimestamp(times[i]).isoformat()}
+            for i in indices
+        ]
+
+    def __contains__(self, link: str) -> bool:
+        return link in self._ids
+
+    def __len__(self) -> int:
+        return len(self._links)
+
+
+if __name__ == "__main__":
+    # Benchmark de memória: 1M pontos de preço (100k imóveis x 10 mudanças)
+    import gc
+    import tracemalloc
+
+    listings, changes = 100_000, 10
+    base_ts = int(datetime(2024, 1, 1).timestamp())
+
+    def points():
+        for i in range(listings):
+            link = f"https://www.lopes.com.br/imovel/REO{i:07d}"
+            for j in range(changes):
+                yield link, 500_000.0 + i + j * 1_000, base_ts + j * 86_400
+
+    gc.collect()
+    tracemalloc.start()
+    legacy: Dict[str, List[Dict]] = {}
+    for link, price, ts in points():
+        legacy.setdefault(link, []).append({'price': price, 'date': datetime.fromtimestamp(ts).isoformat()})
+    legacy_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del legacy
+    gc.collect()
+
+    tracemalloc.start()
+    store = PriceHistoryStore.from_points(points())
+    store_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    print(f"Pontos: {store.point_count:,} em {len(store):,} imóveis")
+    print(f"dict-of-lists: {legacy_bytes / 1024 ** 2:.1f} MiB ({legacy_bytes / store.point_count:.0f} B/ponto)")
+    print(f"PriceHistoryStore: {store_bytes / 1024 ** 2:.1f} MiB ({store_bytes / store.point_count:.0f} B/ponto)")
+    print(f"Redução: {legacy_bytes / store_bytes:.1f}x")
@@ -0,0 +1,127 @@
+import logging
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+# Configuração de Logs
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("PropertyStore")
+
+
+class PropertyStore:
+    """
+    Armazenamento em memória indexado pelo link do imóvel.
+    Mantém índices secundários por bairro e status para consultas sem varredura.
+    """
+
+    def __init__(self):
+        self.by_link: Dict[str, Dict] = {}
+        self.by_neighborhood: Dict[str, Set[str]] = {}
+        self.by_status: Dict[str, Set[str]] = {}
+
+    @staticmethod
+    def _neighborhood_of(prop: Dict) -> str:
+        location = prop.get('location') or {}
+        if isinstance(location, dict):
+            return location.get('neighborhood', '') or ''
+        return ''
+
+    def _index(self, link: str, prop: Dict):
+        self.by_neighborhood.setdefault(self._neighborhood_of(prop), set()).add(link)
+        self.by_status.setdefault(prop.get('status', ''), set()).add(link)
+
+    def _unindex(self, link: str, prop: Dict):
+        for index, key in ((self.by_neighborhood, self._neighborhood_of(prop)),
+                           (self.by_status, prop.get('status', ''))):
+            links = index.get(key)
+            if links is not None:
+                links.discard(link)
+                if not links:
+                    del index[key]
+
+    def upsert_many(self, properties: List[Dict], timestamp: Optional[str] = None) -> Dict[str, int]:
+        """
+        Insere ou atualiza imóveis em uma única passada (O(n) no tamanho do lote).
+        """
+        timestamp = timestamp or datetime.now().isoformat()
+        inserted = 0
+        updated = 0
+
+        for prop in properties:
+            link = prop.get('link')
+            if not link:
+                continue
+
+            existing = self.by_link.get(link)
+            if existing:
+                # Atualizar propriedade existente
+                self._unindex(link, existing)
+                existing.update(prop)
+                existing['updated_at'] = timestamp
+                self._index(link, existing)
+                updated += 1
+                logger.debug(f"Atualizado: {prop.get('title')}")
+            else:
+                # Adicionar nova propriedade (preserva datas vindas do banco)
+                prop.setdefault('created_at', timestamp)
+                prop.setdefault('updated_at', timestamp)
+                self.by_link[link] = prop
+                self._index(link, prop)
+                inserted += 1
+                logger.debug(f"Novo imóvel adicionado: {prop.get('title')}")
+
+        return {"inserted": inserted, "updated": updated}
+
+    def remove(self, link: str) -> Optional[Dict]:
+        prop = self.by_link.pop(link, None)
+        if prop is not None:
+            self._unindex(link, prop)
+        return prop
+
+    def get(self, link: str) -> Optional[Dict]:
+        return self.by_link.get(link)
+
+    def find(self, neighborhood: Optional[str] = None, status: Optional[str] = None) -> List[Dict]:
+        """
+        Consulta pelos índices secundários (interseção quando ambos são informados).
+        """
+        candidates = None
+        if neighborhood is not None:
+            candidates = set(self.by_neighborhood.get(neighborhood, ()))
+        if status is not None:
+            links = self.by_status.get(status, set())
+            candidates = links.copy() if candidates is None else candidates & links
+        if candidates is None:
+            return self.all()
+        return [self.by_link[link] for link in candidates]
+
+    def all(self) -> List[Dict]:
+        return list(self.by_link.values())
+
+    def __len__(self) -> int:
+        return len(self.by_link)
+
+
+if __name__ == "__main__":
+    # Benchmark: duas execuções (inserção + atualização) para tamanhos crescentes de inventário
+    import time
+
+    logger.setLevel(logging.WARNING)
+    neighborhoods = ["Pituba", "Barra", "Horto Florestal", "Graça", "Ondina", "Vitória"]
+
+    def make_batch(n: int, run: int) -> List[Dict]:
+        return [{
+            'link': f"https://www.lopes.com.br/imovel/{i}",
+            'title': f"Imóvel {i}",
+            'price': 500000.0 + (i % 97) * 1000 + run,
+            'location': {'neighborhood': neighborhoods[i % len(neighborhoods)]},
+            'status': 'NEW' if run == 0 else 'PRICE_CHANGED'
+        } for i in range(n)]
+
+    for n in (12500, 25000, 50000, 100000):
+        store = PropertyStore()
+        first, second = make_batch(n, 0), make_batch(n, 1)
+        start = time.perf_counter()
+        store.upsert_many(first)
+        store.upsert_many(second)
+        elapsed = time.perf_counter() - start
+        print(f"{n:>7} imóveis x 2 execuções: {elapsed:.3f}s ({elapsed / (2 * n) * 1e6:.2f} µs/imóvel)")
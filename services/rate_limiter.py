@@ -0,0 +1,63 @@
+import asyncio
+import logging
+import time
+from typing import Dict
+from urllib.parse import urlparse
+
+# Configuração de Logs
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("RateLimiter")
+
+
+class TokenBucket:
+    """
+    Token bucket assíncrono: libera até `rate` requisições por segundo,
+    permitindo rajadas de até `burst` requisições.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError("rate deve ser maior que zero.")
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self):
+        """
+        Aguarda até que um token esteja disponível e o consome.
+        """
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                wait = (1 - self.tokens) / self.rate
+                await asyncio.sleep(wait)
+                self._refill()
+            self.tokens -= 1
+
+
+class HostRateLimiter:
+    """
+    Mantém um TokenBucket por host, para que a politeness seja aplicada
+    por domínio e não globalmente.
+    """
+
+    def __init__(self, rate: float = 0.5, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.buckets: Dict[str, TokenBucket] = {}
+
+    def bucket_for(self, url: str) -> TokenBucket:
+        host = urlparse(url).netloc
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(self.rate, self.burst)
+        return self.buckets[host]
+
+    async def acquire(self, url: str):
+        await self.bucket_for(url).acquire()
@@ -2,7 +2,11 @@ import google.generativeai as genai
 import os
 import json
 import logging
-from typing import Dict
+from typing import Dict, List, Tuple
+
+from services.llm_cache import cached_model
+from services.executor import executor
+from services.listing import listing_id
 
 # Configuração de Logs
 logging.basicConfig(level=logging.INFO)
@@ -16,7 +20,13 @@ class ChameleonRefiner:
         if not api_key:
             raise ValueError("API Key do Gemini é obrigatória.")
         genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-pro')
+        self.model = cached_model(genai.GenerativeModel('gemini-pro'))
+
+    async def refine_property_async(self, property_data: Dict) -> Dict:
+        return await executor.run_io(self.refine_property, property_data)
+
+    async def refine_batch_async(self, properties: List[Dict], batch_size: int = 10, max_retries: int = 1) -> List[Dict]:
+        return await executor.run_io(self.refine_batch, properties, batch_size, max_retries)
 
     def refine_property(self, property_data: Dict) -> Dict:
         """
@@ -26,13 +36,7 @@ class ChameleonRefiner:
         original_title = property_data.get('title', '')
         location = property_data.get('location', '')
 
-        # Lógica Condicional de Tom
-        if price > 1500000:
-            tone = "Luxo, Exclusividade, Private, Sofisticação"
-            target_audience = "Alto Padrão"
-        else:
-            tone = "Oportunidade, Investimento, Custo-Benefício, Smart Choice"
-            target_audience = "Investidores/Primeiro Imóvel"
+        tone, target_audience = self._tone_for(price)
 
         prompt = f"""
         Atue como um Copywriter Imobiliário de Elite.
@@ -56,13 +60,8 @@ class ChameleonRefiner:
         """
 
         try:
-            response = self.model.generate_content(prompt)
-            # Tentativa de extrair JSON da resposta (pode vir com markdown ```json ... ```)
-            text_response = response.text.strip()
-            if text_response.startswith("```json"):
-                text_response = text_response.replace("```json", "").replace("```", "")
-            
-            ai_data = json.loads(text_response)
+            response = self.model.generate_content(prompt, validate=self._is_json_object)
+            ai_data = self._parse_json(response.text)
             
             property_data['ai_title'] = ai_data.get('ai_title', original_title)
             property_data['ai_description'] = ai_data.get('ai_description', '')
@@ -76,3 +75,127 @@ class ChameleonRefiner:
             property_data['ai_error'] = str(e)
 
         return property_data
+
+    def refine_batch(self, properties: List[Dict], batch_size: int = 10, max_retries: int = 1) -> List[Dict]:
+        """
+        Refina vários imóveis por requisição: cada prompt leva até `batch_size` anúncios
+        e o Gemini devolve um array JSON indexado pelo id público de cada anúncio.
+        Itens ausentes ou inválidos na resposta são reenviados (apenas eles) até `max_retries` vezes.
+        """
+        for start in range(0, len(properties), batch_size):
+            batch = properties[start:start + batch_size]
+            pending: Dict[str, Dict] = {}
+            for i, prop in enumerate(batch):
+                batch_id = self._batch_id(prop, start + i)
+                pending[batch_id if batch_id not in pending else f"{batch_id}-{start + i}"] = prop
+            last_error = "Item ausente na resposta do lote"
+
+            for _ in range(max_retries + 1):
+                if not pending:
+                    break
+                prompt = self._build_batch_prompt(pending)
+                try:
+                    response = self.model.generate_content(prompt, validate=self._is_json_array)
+                    items = self._parse_json(response.text)
+                    if not isinstance(items, list):
+                        raise ValueError("Resposta do lote não é um array JSON")
+                except Exception as e:
+                    logger.error(f"Erro ao refinar lote com Gemini: {e}")
+                    last_error = str(e)
+                    continue
+
+                resolved = 0
+                for item in items:
+                    if not self._is_valid_batch_item(item) or str(item['id']) not in pending:
+                        continue
+                    property_data = pending.pop(str(item['id']))
+                    property_data['ai_title'] = item['ai_title']
+                    property_data['ai_description'] = item['ai_description']
+                    property_data['refined'] = True
+                    property_data.pop('ai_error', None)
+                    resolved += 1
+                if not resolved:
+                    # Resposta inútil: o mesmo prompt não pode voltar do cache na próxima tentativa
+                    self.model.invalidate(prompt)
+
+            for property_data in pending.values():
+                property_data['refined'] = False
+                property_data['ai_error'] = last_error
+
+            logger.info(f"Lote refinado: {len(batch) - len(pending)} imóveis")
+
+        return properties
+
+    @staticmethod
+    def _batch_id(property_data: Dict, position: int) -> str:
+        """
+        Id do anúncio no prompt: o id público (derivado do link), estável entre tentativas.
+        """
+        if property_data.get('id'):
+            return str(property_data['id'])
+        if property_data.get('link'):
+            return listing_id(property_data['link'])
+        return f"item-{position}"
+
+    def _build_batch_prompt(self, pending: Dict[str, Dict]) -> str:
+        listings = []
+        for batch_id, property_data in pending.items():
+            price = property_data.get('price', 0)
+            tone, target_audience = self._tone_for(price)
+            listings.append(
+                f"- id: {batch_id} | Título Original: {property_data.get('title', '')} | "
+                f"Localização: {property_data.get('location', '')} | Preço: R$ {price:,.2f} | "
+                f"Tom de Voz: {tone} | Público Alvo: {target_audience}"
+            )
+        listings_text = "\n        ".join(listings)
+
+        return f"""
+        Atue como um Copywriter Imobiliário de Elite.
+        Para CADA imóvel abaixo, reescreva o título e crie uma breve descrição persuasiva:
+        
+        {listings_text}
+        
+        Diretrizes:
+        - Use o Tom de Voz e o Público Alvo indicados em cada imóvel.
+        - O texto deve ser curto, direto e focado em conversão.
+        - NÃO invente características que não estão explícitas, mas valorize a localização e o valor.
+        
+        Retorne APENAS um array JSON, com um objeto por imóvel, no seguinte formato:
+        [
+            {{"id": "<id do imóvel>", "ai_title": "Novo Título Atraente", "ai_description": "Descrição persuasiva..."}}
+        ]
+        """
+
+    @staticmethod
+    def _is_valid_batch_item(item) -> bool:
+        return (
+            isinstance(item, dict) and
+            'id' in item and
+            isinstance(item.get('ai_title'), str) and item['ai_title'].strip() != '' and
+            isinstance(item.get('ai_description'), str)
+        )
+
+    @staticmethod
+    def _tone_for(price: float) -> Tuple[str, str]:
+        """
+        Lógica Condicional de Tom (tom de voz, público alvo) baseada no preço.
+        """
+        if price > 1500000:
+            return "Luxo, Exclusividade, Private, Sofisticação", "Alto Padrão"
+        return "Oportunidade, Investimento, Custo-Benefício, Smart Choice", "Investidores/Primeiro Imóvel"
+
+    @classmethod
+    def _is_json_object(cls, text: str) -> bool:
+        return isinstance(cls._parse_json(text), dict)
+
+    @classmethod
+    def _is_json_array(cls, text: str) -> bool:
+        return isinstance(cls._parse_json(text), list)
+
+    @staticmethod
+    def _parse_json(text: str):
+        # Tentativa de extrair JSON da resposta (pode vir com markdown ```json ... ```)
+        text_response = text.strip()
+        if text_response.startswith("```json"):
+            text_response = text_response.replace("```json", "").replace("```", "")
+        return json.loads(text_response)
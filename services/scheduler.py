@@ -8,7 +8,14 @@ import json
 if sys.platform == 'win32':
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
-from services.collector import MassCollector
+from services.crawl_frontier import CrawlFrontier
+from services.lopes_scraper import LopesScraper
+from services.property_store import PropertyStore
+from services.building_index import BuildingIndex, building_index
+from services.search_index import SearchIndex, search_index
+from services.executor import executor
+from services.snapshot_diff import DEFAULT_DELISTING_PATH, DelistingTracker, Snapshot, diff_snapshots
+from services.storage import Storage
 
 # Configuração de Logs
 logging.basicConfig(level=logging.INFO)
@@ -20,16 +27,52 @@ class PropertyScheduler:
     Scheduler para executar scraping automático de imóveis periodicamente.
     """
     
-    def __init__(self, interval_hours: int = 6):
+    def __init__(self, interval_hours: int = 6, storage: Optional[Storage] = None,
+                 stop_after_known_pages: int = 2, max_pages: int = 100, full_sweep_hours: int = 7 * 24,
+                 delisted_after_runs: int = 2, search_index: Optional[SearchIndex] = None,
+                 building_index: Optional[BuildingIndex] = None,
+                 delisting_path: Optional[str] = DEFAULT_DELISTING_PATH):
         """
         Args:
             interval_hours: Intervalo em horas para executar o scraping
+            storage: Persistência (SQLAlchemy); sem ela, os dados vivem apenas em memória
+            stop_after_known_pages: Páginas seguidas sem novidades para encerrar a coleta incremental
+            max_pages: Limite de segurança de páginas por execução
+            full_sweep_hours: Intervalo entre varreduras completas (todas as páginas)
+            delisted_after_runs: Varreduras completas seguidas sem o imóvel para marcá-lo como deslistado
+            search_index: Índice de busca textual atualizado a cada coleta (opcional)
+            building_index: Agrupamento por edifício atualizado a cada coleta (opcional)
+            delisting_path: Arquivo dos contadores de ausência (sobrevivem a restarts)
         """
         self.interval_hours = interval_hours
-        self.collector = MassCollector()
+        self.stop_after_known_pages = stop_after_known_pages
+        self.max_pages = max_pages
+        self.full_sweep_hours = full_sweep_hours
+        self.frontier = CrawlFrontier()
+        self.storage = storage
+        self.collector = LopesScraper(storage=storage)
         self.is_running = False
         self.last_run: Optional[datetime] = None
-        self.properties_db = []  # Simulação de banco (em produção, usar SQLAlchemy)
+        self.store = PropertyStore()  # Índice em memória por link (write-through para o Storage)
+        self.delisting = DelistingTracker(missing_runs=delisted_after_runs, path=delisting_path)
+        self.search_index = search_index
+        self.building_index = building_index
+        self.last_changes: Optional[dict] = None
+        
+        if storage:
+            persisted = storage.load_properties()
+            self.store.upsert_many(persisted)
+            logger.info(f"{len(persisted)} imóveis carregados do banco de dados")
+            listed = [p for p in persisted if p.get('status') != 'DELISTED']
+            if search_index is not None:
+                search_index.upsert_many(listed)
+            if building_index is not None:
+                building_index.upsert_many(listed)
+        
+        # Snapshot link -> preço da última coleta (base para o diff)
+        self.snapshot = Snapshot.from_properties(
+            p for p in self.store.all() if p.get('status') != 'DELISTED'
+        )
         
     async def start(self):
         """
@@ -60,16 +103,32 @@ class PropertyScheduler:
         logger.info("=== Iniciando execução do scraper ===")
         
         try:
-            # Coletar imóveis (2 páginas para ter um bom volume)
-            properties = await self.collector.scrape_inventory(max_pages=2)
+            # Coleta incremental: pagina enquanto houver novidades (varredura completa periódica)
+            full_sweep = self.frontier.needs_full_sweep(self.full_sweep_hours)
+            stats = {}
+            properties = [
+                item async for item in self.collector.iter_incremental(
+                    self.frontier,
+                    stop_after=self.stop_after_known_pages,
+                    max_pages=self.max_pages,
+                    full_sweep=full_sweep,
+                    stats=stats
+                )
+            ]
             
-            logger.info(f"Scraping concluído: {len(properties)} imóveis coletados")
+            logger.info(
+                f"Scraping concluído: {len(properties)} imóveis coletados em {stats['pages_visited']} páginas "
+                f"({stats['pages_skipped']} páginas inalteradas puladas)"
+            )
             
-            # Salvar em "banco de dados" (simulado)
-            self._save_to_database(properties)
+            # Detectar mudanças importantes (antes de salvar: o diff compara com a coleta anterior)
+            self.last_changes = self._detect_changes(properties, complete=bool(stats.get('full_sweep')))
+            if stats.get('full_sweep'):
+                await executor.run_io(self.delisting.save)
             
-            # Detectar mudanças importantes
-            self._detect_changes(properties)
+            # Salvar em "banco de dados" (simulado)
+            await self._save_to_database(properties)
+            await self._mark_delisted(self.last_changes['delisted'])
             
             logger.info("=== Execução concluída com sucesso ===")
             
@@ -77,49 +136,81 @@ class PropertyScheduler:
             logger.error(f"Erro durante scraping: {e}")
             raise
     
-    def _save_to_database(self, properties: list):
+    async def _save_to_database(self, properties: list):
         """
-        Salva propriedades no banco de dados (simulado).
-        Em produção, usar SQLAlchemy para persistência real.
+        Salva propriedades no índice em memória e, se configurado, no banco (SQLAlchemy).
+        Banco e índices são atualizados fora do event loop.
         """
-        timestamp = datetime.now().isoformat()
+        result = self.store.upsert_many(properties)
         
-        for prop in properties:
-            # Verificar se já existe
-            existing = next((p for p in self.properties_db if p['link'] == prop['link']), None)
-            
-            if existing:
-                # Atualizar propriedade existente
-                existing.update(prop)
-                existing['updated_at'] = timestamp
-                logger.debug(f"Atualizado: {prop['title']}")
-            else:
-                # Adicionar nova propriedade
-                prop['created_at'] = timestamp
-                prop['updated_at'] = timestamp
-                self.properties_db.append(prop)
-                logger.info(f"Novo imóvel adicionado: {prop['title']}")
+        if self.storage:
+            await executor.run_io(self.storage.upsert_properties, properties)
+        
+        if self.search_index is not None:
+            reindexed = await executor.run_io(self.search_index.upsert_many, properties)
+            logger.info(f"Índice de busca: {reindexed} imóveis reindexados")
+        if self.building_index is not None:
+            moved = await executor.run_io(self.building_index.upsert_many, properties)
+            logger.info(f"Índice de edifícios: {moved} imóveis reagrupados")
         
-        logger.info(f"Banco de dados atualizado. Total: {len(self.properties_db)} imóveis")
+        logger.info(
+            f"Banco de dados atualizado. {result['inserted']} novos, {result['updated']} atualizados. "
+            f"Total: {len(self.store)} imóveis"
+        )
     
-    def _detect_changes(self, properties: list):
+    def _detect_changes(self, properties: list, complete: bool = False) -> dict:
         """
-        Detecta mudanças importantes (novos imóveis, mudanças de preço).
+        Detecta mudanças importantes (novos imóveis, mudanças de preço, deslistados)
+        comparando o snapshot da coleta com o anterior.
+        
+        Args:
+            properties: Imóveis coletados nesta execução
+            complete: Se a coleta foi uma varredura completa; só então ausência conta como remoção
         """
-        new_count = 0
-        price_changed_count = 0
+        current = Snapshot.from_properties(properties)
+        report = diff_snapshots(self.snapshot, current, detect_removed=complete)
+        
+        if complete:
+            report['delisted'] = self.delisting.update(self.snapshot, current)
+            self.snapshot = current
+        else:
+            # Coleta parcial: páginas não visitadas mantêm o último preço conhecido
+            self.snapshot = self.snapshot.merge(current)
         
-        for prop in properties:
-            if prop.get('status') == 'NEW':
-                new_count += 1
-                logger.info(f"🆕 Novo imóvel: {prop['title']} - {prop['priceText']}")
-            elif prop.get('status') == 'PRICE_CHANGED':
-                price_changed_count += 1
-                logger.warning(f"💰 Mudança de preço: {prop['title']}")
-                # Aqui poderia disparar notificação
+        by_link = {p['link']: p for p in properties if p.get('link')}
+        for link in report['added']:
+            prop = by_link[link]
+            logger.info(f"🆕 Novo imóvel: {prop.get('title')} - {prop.get('priceText')}")
+        for change in report['price_up'] + report['price_down']:
+            logger.warning(
+                f"💰 Mudança de preço: {change['link']} "
+                f"({change['old_price']:,.0f} -> {change['new_price']:,.0f})"
+            )
+            # Aqui poderia disparar notificação
         
-        if new_count > 0 or price_changed_count > 0:
-            logger.info(f"Resumo: {new_count} novos, {price_changed_count} com mudança de preço")
+        price_changed_count = len(report['price_up']) + len(report['price_down'])
+        if report['added'] or price_changed_count or report['removed']:
+            logger.info(
+                f"Resumo: {len(report['added'])} novos, {price_changed_count} com mudança de preço, "
+                f"{len(report['removed'])} ausentes, {len(report['delisted'])} deslistados"
+            )
+        return report
+    
+    async def _mark_delisted(self, links: list):
+        """
+        Marca como DELISTED os imóveis ausentes por várias varreduras completas seguidas.
+        """
+        delisted = [dict(link=link, status='DELISTED') for link in links if self.store.get(link)]
+        if not delisted:
+            return
+        self.store.upsert_many(delisted)
+        if self.search_index is not None:
+            await executor.run_io(self.search_index.remove_many, links)
+        if self.building_index is not None:
+            await executor.run_io(self.building_index.remove_many, links)
+        if self.storage:
+            await executor.run_io(self.storage.upsert_properties, [self.store.get(p['link']) for p in delisted])
+        logger.info(f"{len(delisted)} imóveis marcados como deslistados")
     
     def stop(self):
         """
@@ -132,7 +223,7 @@ class PropertyScheduler:
         """
         Retorna todas as propriedades do banco.
         """
-        return self.properties_db
+        return self.store.all()
     
     def get_status(self) -> dict:
         """
@@ -142,24 +233,33 @@ class PropertyScheduler:
             "is_running": self.is_running,
             "last_run": self.last_run.isoformat() if self.last_run else None,
             "interval_hours": self.interval_hours,
-            "total_properties": len(self.properties_db),
+            "total_properties": len(self.store),
             "next_run": (self.last_run + timedelta(hours=self.interval_hours)).isoformat() if self.last_run else "Aguardando primeira execução"
         }
 
 
-# Instância global do scheduler (será usada pelo main.py)
-scheduler = PropertyScheduler(interval_hours=6)
+# Instância global do scheduler (será usada pelo main.py), criada no primeiro uso:
+# importar o módulo não abre o banco nem carrega o inventário
+scheduler: Optional[PropertyScheduler] = None
+
+
+def get_scheduler() -> PropertyScheduler:
+    global scheduler
+    if scheduler is None:
+        scheduler = PropertyScheduler(interval_hours=6, storage=Storage(), search_index=search_index,
+                                      building_index=building_index)
+    return scheduler
 
 
 async def run_scheduler_forever():
     """
     Função auxiliar para rodar o scheduler.
     """
-    await scheduler.start()
+    await get_scheduler().start()
 
 
 if __name__ == "__main__":
     # Teste - rodar uma única vez
     logger.info("Modo teste - executando scraping único")
-    asyncio.run(scheduler._run_scraping())
-    print(json.dumps(scheduler.get_properties(), indent=2, ensure_ascii=False))
+    asyncio.run(get_scheduler()._run_scraping())
+    print(json.dumps(get_scheduler().get_properties(), indent=2, ensure_ascii=False))
@@ -0,0 +1,321 @@
+import logging
+import math
+import re
+import threading
+from bisect import bisect_left, insort
+from collections import Counter
+from heapq import nlargest
+from operator import add
+from typing import Dict, Iterable, List, Tuple
+
+from services.text import fold_accents
+
+# Configuração de Logs
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("SearchIndex")
+
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+# Token ainda sendo digitado: encosta no fim da consulta (sem espaço/pontuação depois)
+TRAILING_TOKEN_RE = re.compile(r'[a-z0-9]+$')
+
+STOPWORDS = frozenset(
+    "a o e as os de da do das dos em no na nos nas ao aos um uma com para por que se ou".split()
+)
+
+# Peso de cada campo (repetição do termo na contagem, estilo BM25F simplificado)
+FIELD_WEIGHTS = (
+    ('title', 2),
+    ('ai_title', 2),
+    ('neighborhood', 3),
+    ('description', 1),
+    ('ai_description', 1),
+)
+
+# Termos do vocabulário considerados na expansão do último token (prefixo)
+PREFIX_EXPANSIONS = 10
+PREFIX_SCAN_LIMIT = 500
+
+# Imóveis indexados por aquisição do lock: uma reindexação grande não segura as buscas até o fim
+UPSERT_CHUNK = 500
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Tokens sem acento e em minúsculas (mesma dobra NFKD do slug), sem stopwords.
+    """
+    return [token for token in TOKEN_RE.findall(fold_accents(text).lower()) if token not in STOPWORDS]
+
+
+def prefix_token(query: str) -> str:
+    """
+    Token que o usuário ainda está digitando (completado por prefixo), ou "".
+    Só conta se encosta no fim da consulta e sobrevive à normalização: em "apartamento em",
+    o último token é a stopword e "apartamento" já foi digitado por inteiro.
+    """
+    trailing = TRAILING_TOKEN_RE.search(fold_accents(query).lower())
+    return trailing.group() if trailing and trailing.group() not in STOPWORDS else ""
+
+
+def _field_value(prop: Dict, field: str) -> str:
+    if field == 'neighborhood':
+        location = prop.get('location') or {}
+        return location.get('neighborhood', '') if isinstance(location, dict) else str(location)
+    value = prop.get(field)
+    return value if isinstance(value, str) else ''
+
+
+def document_terms(prop: Dict) -> Counter:
+    counts: Counter = Counter()
+    for field, weight in FIELD_WEIGHTS:
+        counts.update(tokenize(_field_value(prop, field)) * weight)
+    return counts
+
+
+class SearchIndex:
+    """
+    Índice invertido em processo sobre os imóveis, com ranking BM25 e completação por prefixo.
+
+    - Atualização incremental por link (upsert/remove), sem reconstruir o índice.
+    - Vocabulário ordenado: o último token da consulta é expandido por bisect.
+    - Os scores por termo são calculados sob demanda e reaproveitados até o termo mudar.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.vocabulary: List[str] = []
+        self.docs: Dict[int, Dict] = {}
+        self._doc_ids: Dict[str, int] = {}
+        self._doc_terms: Dict[int, Counter] = {}
+        self._doc_len: Dict[int, int] = {}
+        self._total_len = 0
+        self._next_id = 0
+
+        # Cache de scores por termo (invalidado quando o termo muda ou o tamanho médio deriva)
+        self._scores: Dict[str, Dict[int, float]] = {}
+        self._ranked: Dict[str, List[int]] = {}
+        self._scores_avgdl = 0.0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.docs)
+
+    # --- Atualização ---
+
+    def upsert_many(self, properties: Iterable[Dict]) -> int:
+        """
+        Indexa/atualiza imóveis pelo link. Retorna quantos tiveram o texto alterado.
+        O lock é liberado a cada `UPSERT_CHUNK` imóveis para as buscas intercalarem.
+        """
+        changed = 0
+        properties = list(properties)
+        for start in range(0, len(properties), UPSERT_CHUNK):
+            with self._lock:
+                for prop in properties[start:start + UPSERT_CHUNK]:
+                    changed += self._upsert(prop)
+        return changed
+
+    def _upsert(self, prop: Dict) -> bool:
+        link = prop.get('link')
+        if not link:
+            return False
+        terms = document_terms(prop)
+        doc = self._doc_ids.get(link)
+        if doc is not None:
+            self.docs[doc] = prop
+            if self._doc_terms[doc] == terms:
+                return False
+            self._remove_terms(doc)
+        else:
+            doc = self._next_id
+            self._next_id += 1
+            self._doc_ids[link] = doc
+            self.docs[doc] = prop
+        self._add_terms(doc, terms)
+        return True
+
+    def remove_many(self, links: Iterable[str]) -> int:
+        removed = 0
+        with self._lock:
+            for link in links:
+                doc = self._doc_ids.pop(link, None)
+                if doc is None:
+                    continue
+                self._remove_terms(doc)
+                del self.docs[doc]
+                removed += 1
+        return removed
+
+    def _add_terms(self, doc: int, terms: Counter):
+        for term, tf in terms.items():
+            postings = self.postings.get(term)
+            if postings is None:
+                postings = self.postings[term] = {}
+                insort(self.vocabulary, term)
+            postings[doc] = tf
+        self._invalidate(terms)
+        self._doc_terms[doc] = terms
+        length = sum(terms.values())
+        self._doc_len[doc] = length
+        self._total_len += length
+
+    def _remove_terms(self, doc: int):
+        terms = self._doc_terms.pop(doc)
+        for term in terms:
+            postings = self.postings[term]
+            del postings[doc]
+            if not postings:
+                del self.postings[term]
+                del self.vocabulary[bisect_left(self.vocabulary, term)]
+        self._invalidate(terms)
+        self._total_len -= self._doc_len.pop(doc)
+
+    def _invalidate(self, terms: Iterable[str]):
+        if not self._scores and not self._ranked:
+            return
+        for term in terms:
+            self._scores.pop(term, None)
+            self._ranked.pop(term, None)
+
+    # --- Consulta ---
+
+    def complete(self, prefix: str, limit: int = PREFIX_EXPANSIONS) -> List[str]:
+        """
+        Termos do vocabulário que começam com `prefix`, do mais ao menos frequente.
+        O próprio `prefix`, se for um termo indexado, está sempre entre eles.
+        """
+        prefix = fold_accents(prefix).lower()
+        if not prefix:
+            return []
+        with self._lock:
+            start = bisect_left(self.vocabulary, prefix)
+            matches = []
+            for term in self.vocabulary[start:start + PREFIX_SCAN_LIMIT]:
+                if not term.startswith(prefix):
+                    break
+                matches.append(term)
+            top = nlargest(limit, matches, key=lambda term: len(self.postings[term]))
+            if prefix in self.postings and prefix not in top and limit > 0:
+                top = [prefix] + top[:limit - 1]
+            return top
+
+    def _term_scores(self, term: str) -> Dict[int, float]:
+        avgdl = self._total_len / len(self.docs) if self.docs else 1.0
+        if abs(avgdl - self._scores_avgdl) > 0.05 * self._scores_avgdl:
+            self._scores.clear()
+            self._ranked.clear()
+            self._scores_avgdl = avgdl
+
+        scores = self._scores.get(term)
+        if scores is None:
+            postings = self.postings[term]
+            n, df = len(self.docs), len(postings)
+            idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+            k1, b, doc_len = self.k1, self.b, self._doc_len
+            norm = k1 * (1 - b)
+            slope = k1 * b / self._scores_avgdl
+            scores = {
+                doc: idf * tf * (k1 + 1) / (tf + norm + slope * doc_len[doc])
+                for doc, tf in postings.items()
+            }
+            self._scores[term] = scores
+        return scores
+
+    def search(self, query: str, limit: int = 20, offset: int = 0) -> Tuple[List[Tuple[Dict, float]], int]:
+        """
+        Retorna ([(imóvel, score)], total). Todos os termos precisam casar (AND); o último
+        token é tratado como prefixo enquanto o usuário ainda digita (ver `prefix_token`).
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return [], 0
+
+        with self._lock:
+            groups = [[token] if token in self.postings else [] for token in tokens]
+            if prefix_token(query):
+                groups[-1] = self.complete(tokens[-1])
+            if not all(groups):
+                return [], 0
+
+            # Consulta de um único termo: lista já ordenada por score
+            if len(groups) == 1 and len(groups[0]) == 1:
+                term = groups[0][0]
+                scores = self._term_scores(term)
+                ranked = self._ranked.get(term)
+                if ranked is None:
+                    ranked = self._ranked[term] = sorted(scores, key=scores.__getitem__, reverse=True)
+                page = ranked[offset:offset + limit]
+                return [(self.docs[doc], scores[doc]) for doc in page], len(ranked)
+
+            # Interseção dos grupos (em C, sobre as chaves das postings), do mais seletivo ao menos
+            groups.sort(key=lambda terms: sum(len(self.postings[term]) for term in terms))
+            candidates = None
+            for terms in groups:
+                docs = self.postings[terms[0]].keys() if len(terms) == 1 else \
+                    set().union(*(self.postings[term] for term in terms))
+                candidates = docs if candidates is None else candidates & docs
+                if not candidates:
+                    return [], 0
+
+            candidates = list(candidates)
+            totals = None
+            for terms in groups:
+                if len(terms) == 1:
+                    scores = self._term_scores(terms[0])
+                    group_scores = map(scores.__getitem__, candidates)
+                else:
+                    # Expansões de prefixo: o documento vale pelo melhor termo do grupo
+                    group = [self._term_scores(term) for term in terms]
+                    group_scores = (max(scores.get(doc, 0.0) for scores in group) for doc in candidates)
+                totals = list(group_scores) if totals is None else list(map(add, totals, group_scores))
+
+            top = nlargest(offset + limit, range(len(candidates)), key=totals.__getitem__)[offset:]
+            return [(self.docs[candidates[i]], totals[i]) for i in top], len(candidates)
+
+
+# Índice compartilhado pela API e pelo scheduler
+search_index = SearchIndex()
+
+
+if __name__ == "__main__":
+    # Benchmark: consultas sobre 100k imóveis sintéticos
+    import random
+    import time
+
+    random.seed(11)
+    neighborhoods = ["Pituba", "Barra", "Horto Florestal", "Graça", "Ondina", "Vitória",
+                     "Caminho das Árvores", "Rio Vermelho", "Itaigara", "Stella Maris"]
+    features = ["vista mar", "varanda gourmet", "piscina", "nascente", "andar alto", "reformado",
+                "mobiliado", "suíte master", "academia", "churrasqueira", "porteira fechada", "duplex"]
+    filler = [f"palavra{i}" for i in range(3000)]
+
+    inventory = []
+    for i in range(100_000):
+        neighborhood = random.choice(neighborhoods)
+        feats = random.sample(features, 3)
+        inventory.append({
+            'link': f"https://www.lopes.com.br/imovel/{i}",
+            'title': f"Apartamento {random.randint(1, 5)} quartos {feats[0]} em {neighborhood}",
+            'description': " ".join(feats + random.sample(filler, 25)),
+            'location': {'neighborhood': neighborhood}
+        })
+
+    index = SearchIndex()
+    start = time.perf_counter()
+    index.upsert_many(inventory)
+    print(f"Indexação (100k imóveis): {time.perf_counter() - start:.2f}s, {len(index.vocabulary)} termos")
+
+    for query in ["vista mar Horto", "piscina itaigara ", "graca", "apartamento", "varanda gourm",
+                  "caminho arvores suite", "rio vermelho nascente andar alto", "stel"]:
+        index.search(query)  # Aquecimento do cache de scores
+        runs = 20
+        start = time.perf_counter()
+        for _ in range(runs):
+            hits, total = index.search(query)
+        elapsed = (time.perf_counter() - start) / runs
+        print(f"{query!r:<38} {elapsed * 1000:6.2f} ms  ({total} resultados)")
+
+    start = time.perf_counter()
+    index.upsert_many([dict(inventory[0], title="Cobertura duplex vista mar")])
+    print(f"Atualização incremental de 1 imóvel: {(time.perf_counter() - start) * 1000:.2f} ms")
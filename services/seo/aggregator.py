@@ -1,11 +1,36 @@
-import re
 import google.generativeai as genai
 import logging
 import json
+from collections import Counter
 from typing import List, Dict, Optional
 
+from services.llm_cache import cached_model
+from services.executor import executor
+from services.building_index import BuildingIndex, building_slug, extract_building_name
+from services.text import fold_accents
+
 logger = logging.getLogger("SEOAggregator")
 
+# Itens de lazer/infraestrutura reconhecidos nos anúncios do condomínio (texto sem acento -> rótulo)
+BUILDING_FEATURES = (
+    ("piscina", "Piscina"),
+    ("academia", "Academia"),
+    ("fitness", "Academia"),
+    ("salao de festas", "Salão de Festas"),
+    ("espaco gourmet", "Espaço Gourmet"),
+    ("churrasqueira", "Churrasqueira"),
+    ("playground", "Playground"),
+    ("brinquedoteca", "Brinquedoteca"),
+    ("quadra", "Quadra Poliesportiva"),
+    ("sauna", "Sauna"),
+    ("portaria 24", "Portaria 24h"),
+    ("seguranca 24", "Segurança 24h"),
+    ("gerador", "Gerador"),
+    ("vista mar", "Vista Mar"),
+    ("pet place", "Pet Place"),
+    ("coworking", "Coworking"),
+)
+
 class EntityAggregator:
     """
     Módulo 1: Entity Aggregator
@@ -15,57 +40,62 @@ class EntityAggregator:
         self.api_key = api_key
         if api_key:
             genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel('gemini-pro')
+            self.model = cached_model(genai.GenerativeModel('gemini-pro'))
         else:
             self.model = None
 
     def extract_building_name(self, title: str) -> Optional[str]:
         """
-        Tenta extrair o nome do edifício do título usando Regex.
+        Extrai o nome do edifício do título (padrão único pré-compilado, ver services.building_index).
         Padrões comuns: "Edf. X", "Mansão Y", "Condomínio Z".
         """
-        patterns = [
-            r"(?i)(?:edf\.?|edifício|edificio)\s+([A-Za-z0-9\s]+?)(?:\s-|\s,|$)",
-            r"(?i)(?:mansão)\s+([A-Za-z0-9\s]+?)(?:\s-|\s,|$)",
-            r"(?i)(?:condomínio|condominio)\s+([A-Za-z0-9\s]+?)(?:\s-|\s,|$)"
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, title)
-            if match:
-                return match.group(1).strip()
-        
-        return None
+        return extract_building_name(title)
+
+    def group_properties(self, properties: List[Dict]) -> Dict[str, Dict]:
+        """
+        Agrupa imóveis por edifício (chave sem acento e com abreviações expandidas).
+        Para atualizações incrementais, usar um BuildingIndex persistente.
+        """
+        index = BuildingIndex()
+        index.upsert_many(properties)
+        return index.groups()
 
-    def group_properties(self, properties: List[Dict]) -> Dict[str, List[Dict]]:
+    def extract_building_features(self, properties: List[Dict]) -> List[str]:
         """
-        Agrupa imóveis por nome de edifício normalizado.
+        Características do condomínio citadas nos anúncios, da mais à menos frequente (local, sem IA).
         """
-        groups = {}
+        counts = Counter()
         for prop in properties:
-            title = prop.get('title', '')
-            building_name = self.extract_building_name(title)
-            
-            if building_name:
-                # Normalização simples
-                key = building_name.lower().strip()
-                if key not in groups:
-                    groups[key] = {
-                        'name': building_name,
-                        'properties': []
-                    }
-                groups[key]['properties'].append(prop)
-        
-        # Filtrar apenas grupos com mais de 2 imóveis (conforme regra)
-        valid_groups = {k: v for k, v in groups.items() if len(v['properties']) > 2}
-        return valid_groups
+            text = fold_accents(f"{prop.get('title', '')} {prop.get('description', '')}").lower()
+            counts.update({label for term, label in BUILDING_FEATURES if term in text})
+        return [label for label, _ in counts.most_common()]
+
+    def building_record(self, group: Dict) -> Dict:
+        """
+        Linha da tabela `buildings` para um grupo do BuildingIndex (sem a descrição).
+        O slug vem da chave canônica: variações de grafia do nome não mudam a URL.
+        """
+        neighborhoods = Counter(
+            (prop.get('location') or {}).get('neighborhood') for prop in group['properties']
+            if isinstance(prop.get('location'), dict)
+        )
+        neighborhoods.pop(None, None)
+        return {
+            'name': group['name'],
+            'slug': building_slug(group['key']),
+            'neighborhood': neighborhoods.most_common(1)[0][0] if neighborhoods else None,
+        }
+
+    async def generate_building_description_async(self, building_name: str, neighborhood: str) -> Optional[str]:
+        return await executor.run_io(self.generate_building_description, building_name, neighborhood)
 
-    def generate_building_description(self, building_name: str, neighborhood: str) -> str:
+    def generate_building_description(self, building_name: str, neighborhood: str) -> Optional[str]:
         """
         Gera um review técnico e histórico sobre o condomínio usando Gemini.
+        Retorna None se a IA não estiver configurada ou falhar (nada deve ser persistido).
         """
         if not self.model:
-            return "Descrição indisponível (AI não configurada)."
+            return None
 
         prompt = f"""
         Escreva um review técnico e histórico sobre o condomínio '{building_name}' localizado em {neighborhood}, Salvador, Bahia.
@@ -83,4 +113,4 @@ class EntityAggregator:
             return response.text.strip()
         except Exception as e:
             logger.error(f"Erro ao gerar descrição para {building_name}: {e}")
-            return "Descrição temporariamente indisponível."
+            return None
@@ -1,11 +1,69 @@
+import hashlib
 import re
-import unicodedata
 import google.generativeai as genai
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
+
+from services.llm_cache import cached_model
+from services.executor import executor
+from services.inventory_index import PRICE_PROFILES
+from services.text import fold_accents, slugify
 
 logger = logging.getLogger("SEOMetadata")
 
+# Limites da meta description: alvo do Google (155) e teto absoluto (160)
+META_TARGET_LENGTH = 155
+META_MAX_LENGTH = 160
+
+# Destaques reconhecidos no título/descrição (texto sem acento -> rótulo)
+HIGHLIGHTS = (
+    ("vista mar", "Vista Mar"),
+    ("frente mar", "Frente Mar"),
+    ("beira mar", "Beira Mar"),
+    ("luxo", "Alto Padrão"),
+    ("cobertura", "Cobertura"),
+    ("piscina", "Piscina"),
+    ("varanda gourmet", "Varanda Gourmet"),
+    ("suite", "Suíte"),
+    ("nascente", "Nascente"),
+    ("andar alto", "Andar Alto"),
+    ("mobiliado", "Mobiliado"),
+    ("reformado", "Reformado"),
+)
+
+PRICE_BANDS = {
+    'economic': "Ótima porta de entrada.",
+    'standard': "Imóvel de médio padrão.",
+    'luxury': "Imóvel de alto padrão.",
+    'ultra-luxury': "Imóvel ultra luxo.",
+}
+
+# Templates rotativos (escolhidos de forma determinística pelo hash do link)
+OPENINGS = (
+    "{Tipo}{specs} em {bairro}, Salvador.",
+    "Oportunidade no bairro {bairro}: {tipo}{specs}.",
+    "{Tipo} à venda em {bairro}{specs}.",
+    "Em {bairro}: {tipo}{specs} à sua espera.",
+)
+CALLS_TO_ACTION = (
+    "Agende sua visita.",
+    "Veja fotos e detalhes.",
+    "Fale com um especialista.",
+    "Consulte condições exclusivas.",
+)
+
+
+def _fit(text: str, target: int = META_TARGET_LENGTH, limit: int = META_MAX_LENGTH) -> str:
+    """
+    Garante o limite de caracteres cortando na última palavra inteira.
+    """
+    text = " ".join(text.split())
+    if len(text) <= target:
+        return text
+    cut = text[:limit - 3].rsplit(" ", 1)[0].rstrip(",.;:- ")
+    return cut + "..."
+
+
 class MetadataGenerator:
     """
     Módulo 2: Semantic Slug & Meta Generator
@@ -15,7 +73,7 @@ class MetadataGenerator:
         self.api_key = api_key
         if api_key:
             genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel('gemini-pro')
+            self.model = cached_model(genai.GenerativeModel('gemini-pro'))
         else:
             self.model = None
 
@@ -23,13 +81,18 @@ class MetadataGenerator:
         """
         Converte texto para slug URL-friendly.
         """
-        text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('utf-8')
-        text = re.sub(r'[^\w\s-]', '', text).lower()
-        return re.sub(r'[-\s]+', '-', text).strip('-')
+        return slugify(text)
+
+    async def generate_seo_data_async(self, property_data: Dict[str, Any]) -> Dict[str, str]:
+        return await executor.run_io(self.generate_seo_data, property_data)
+
+    def _highlights(self, property_data: Dict[str, Any]) -> List[str]:
+        text = fold_accents(f"{property_data.get('title', '')} {property_data.get('description', '')}").lower()
+        return [label for keyword, label in HIGHLIGHTS if keyword in text]
 
     def generate_seo_data(self, property_data: Dict[str, Any]) -> Dict[str, str]:
         """
-        Gera Title, Meta Description e Slug.
+        Gera Title, Meta Description e Slug (local, sem chamadas de rede).
         """
         # Dados básicos
         tipo = property_data.get('type', 'Imovel')
@@ -53,7 +116,7 @@ class MetadataGenerator:
         slug_base = f"{tipo}-{quartos}-quartos-{bairro}-{caracteristica}"
         slug = self._slugify(slug_base)
 
-        # 3. Meta Description (Gemini)
+        # 3. Meta Description (templates locais; Gemini só via upgrade_meta_descriptions)
         meta_description = self._generate_meta_description(property_data)
 
         return {
@@ -64,11 +127,79 @@ class MetadataGenerator:
 
     def _generate_meta_description(self, property_data: Dict) -> str:
         """
-        Usa Gemini para criar uma meta description persuasiva (max 160 chars).
+        Meta description a partir dos atributos do imóvel (tipo, bairro, quartos, área,
+        faixa de preço e destaques), com template rotativo e limite de 155/160 caracteres.
+        """
+        location = property_data.get('location') or {}
+        bairro = (location.get('neighborhood') if isinstance(location, dict) else None) or "Salvador"
+        tipo = (property_data.get('type') or "Imóvel").strip()
+        quartos = property_data.get('bedrooms')
+        area = property_data.get('area')
+
+        specs = []
+        if quartos:
+            specs.append(f"{quartos} quarto{'s' if quartos != 1 else ''}")
+        if area:
+            specs.append(f"{area:g} m²" if isinstance(area, (int, float)) else f"{area} m²")
+        specs_text = f" com {' e '.join(specs)}" if specs else ""
+
+        seed = int.from_bytes(
+            hashlib.blake2b((property_data.get('link') or property_data.get('title') or '').encode('utf-8'),
+                            digest_size=4).digest(), 'big'
+        )
+        opening = OPENINGS[seed % len(OPENINGS)].format(
+            Tipo=tipo[:1].upper() + tipo[1:], tipo=tipo.lower(), bairro=bairro, specs=specs_text
+        )
+        cta = CALLS_TO_ACTION[(seed // len(OPENINGS)) % len(CALLS_TO_ACTION)]
+
+        highlights = self._highlights(property_data)
+        band = self._price_band(property_data.get('price'))
+        extras = []
+        if highlights:
+            extras.append(f"Destaques: {', '.join(highlights[:3])}.")
+        if band:
+            extras.append(band)
+
+        # Remove os complementos menos importantes até caber no alvo
+        while extras:
+            text = " ".join([opening, *extras, cta])
+            if len(text) <= META_TARGET_LENGTH:
+                return text
+            extras.pop()
+        return _fit(f"{opening} {cta}")
+
+    @staticmethod
+    def _price_band(price: Optional[float]) -> Optional[str]:
+        if not price:
+            return None
+        for profile, (low, high) in PRICE_PROFILES.items():
+            if low <= price <= high:
+                return PRICE_BANDS[profile]
+        return None
+
+    def upgrade_meta_descriptions(self, properties: List[Dict[str, Any]], top_n: int = 20) -> List[Dict[str, Any]]:
+        """
+        Upgrade offline (opt-in): reescreve com o Gemini a meta description dos `top_n`
+        imóveis mais valiosos. Os imóveis recebidos não são alterados (podem estar sendo
+        servidos); retorna cópias dos que foram atualizados.
         """
-        if not self.model:
-            return f"Confira este {property_data.get('type')} em {property_data.get('location', {}).get('neighborhood')}. Oportunidade única."
+        if not self.model or top_n <= 0:
+            return []
+        upgraded = []
+        top = sorted(properties, key=lambda p: p.get('price') or 0, reverse=True)[:top_n]
+        for prop in top:
+            if prop.get('meta_description_source') == 'llm':
+                continue
+            text = self._generate_meta_description_llm(prop)
+            if text:
+                upgraded.append(dict(prop, meta_description=text, meta_description_source='llm'))
+        logger.info(f"Meta descriptions reescritas com IA: {len(upgraded)}/{len(top)}")
+        return upgraded
 
+    def _generate_meta_description_llm(self, property_data: Dict) -> Optional[str]:
+        """
+        Usa Gemini para criar uma meta description persuasiva (max 160 chars).
+        """
         prompt = f"""
         Escreva uma Meta Description para SEO (máximo 155 caracteres) para este imóvel:
         Tipo: {property_data.get('type')}
@@ -80,10 +211,31 @@ class MetadataGenerator:
 
         try:
             response = self.model.generate_content(prompt)
-            text = response.text.strip()
-            if len(text) > 160:
-                text = text[:157] + "..."
-            return text
+            return _fit(response.text.strip())
         except Exception as e:
             logger.error(f"Erro ao gerar meta description: {e}")
-            return f"Imóvel incrível em {property_data.get('location', {}).get('neighborhood')}. Saiba mais."
+            return None
+
+
+if __name__ == "__main__":
+    # Benchmark: enriquecimento SEO local de uma página de 100 imóveis
+    import time
+
+    generator = MetadataGenerator(api_key="")
+    page = [{
+        'title': f"Apartamento {i % 4 + 1} quartos com vista mar e piscina no Horto",
+        'type': 'Apartamento',
+        'location': {'neighborhood': ["Horto Florestal", "Pituba", "Caminho das Árvores"][i % 3]},
+        'bedrooms': i % 4 + 1,
+        'area': 60 + i,
+        'price': 300_000 + i * 40_000,
+        'link': f"https://www.lopes.com.br/imovel/{i}"
+    } for i in range(100)]
+
+    start = time.perf_counter()
+    results = [generator.generate_seo_data(prop) for prop in page]
+    elapsed = time.perf_counter() - start
+    print(f"100 imóveis: {elapsed * 1000:.2f} ms ({elapsed / 100 * 1e6:.1f} µs/imóvel)")
+    print(f"Maior meta description: {max(len(r['meta_description']) for r in results)} caracteres")
+    for r in results[:4]:
+        print(f"- {r['meta_description']}")
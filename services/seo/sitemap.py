@@ -0,0 +1,276 @@
+import gzip
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import threading
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+# Configuração de Logs
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("SitemapBuilder")
+
+DEFAULT_SITEMAP_DIR = os.getenv("SITEMAP_DIR", os.path.join(".cache", "sitemaps"))
+DEFAULT_BASE_URL = os.getenv("SITE_BASE_URL", "https://bahiasatellite.com")
+
+# Limite do protocolo (50k URLs por arquivo) e ocupação alvo de cada shard (folga para crescer
+# sem mudar o número de shards, o que redistribuiria todas as URLs)
+MAX_URLS_PER_SITEMAP = 50_000
+SHARD_TARGET_URLS = 40_000
+
+INDEX_NAME = "sitemap.xml"
+SHARD_NAME_RE = re.compile(r'^sitemap-[a-z]+-\d+\.xml\.gz$')
+
+# Seção -> (changefreq, priority)
+SECTIONS = {
+    'pages': ('daily', '1.0'),
+    'buildings': ('weekly', '1.0'),
+    'properties': ('daily', '0.8'),
+}
+
+Entry = Tuple[str, Optional[str], Optional[datetime]]  # (loc, fingerprint, updated_at)
+
+
+def _shard_of(loc: str, shards: int) -> int:
+    """
+    Shard estável da URL (hash do loc): a mesma URL cai sempre no mesmo arquivo.
+    """
+    return int.from_bytes(hashlib.blake2b(loc.encode('utf-8'), digest_size=8).digest(), 'big') % shards
+
+
+def _lastmod(value: Optional[datetime]) -> Optional[str]:
+    return value.date().isoformat() if isinstance(value, datetime) else None
+
+
+def _atomic_write(path: str, data: bytes):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class SitemapBuilder:
+    """
+    Sitemaps gerados a partir do banco (imóveis e edifícios), prontos para servir do disco.
+
+    - Índice `sitemap.xml` + sitemaps filhos gzip de no máximo 50k URLs, por seção.
+    - URL -> shard por hash estável: uma mudança só afeta o arquivo onde a URL mora.
+    - lastmod incremental: só avança quando a impressão digital do imóvel muda.
+    - Cada shard tem um digest do conteúdo; só shards com digest novo são regravados.
+    """
+
+    def __init__(self, output_dir: str = DEFAULT_SITEMAP_DIR, base_url: str = DEFAULT_BASE_URL,
+                 max_urls: int = MAX_URLS_PER_SITEMAP, target_urls: int = SHARD_TARGET_URLS):
+        self.output_dir = output_dir
+        self.base_url = base_url.rstrip('/')
+        self.max_urls = max_urls
+        self.target_urls = min(target_urls, max_urls)
+        self.manifest_path = os.path.join(output_dir, "manifest.json")
+        self.state_path = os.path.join(output_dir, "lastmod.json")
+        self.manifest: Dict = self._load_json(self.manifest_path)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _load_json(path: str) -> Dict:
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Erro ao carregar {path}: {e}")
+            return {}
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.manifest.get('index_etag'))
+
+    def _entries(self, storage, building_index=None) -> Dict[str, Iterable[Entry]]:
+        base = self.base_url
+        return {
+            'pages': [(f"{base}/", None, None)],
+            'buildings': ((f"{base}/buildings/{slug}", None, updated_at)
+                          for slug, updated_at in storage.iter_building_slugs()
+                          if building_index is None or building_index.live_key_for_slug(slug)),
+            'properties': ((f"{base}/imoveis/{slug}", fingerprint, updated_at)
+                           for slug, fingerprint, updated_at in storage.iter_sitemap_properties()),
+        }
+
+    def build(self, storage, building_index=None) -> Dict[str, int]:
+        """
+        Regera os sitemaps a partir do storage. Retorna contagens de URLs e de shards regravados.
+        Com `building_index`, só entram os edifícios que ainda passam na regra de mínimo de imóveis.
+        """
+        if not self._lock.acquire(blocking=False):
+            logger.info("Geração de sitemap já em andamento; ignorando")
+            return {"urls": 0, "shards": 0, "written": 0}
+        try:
+            return self._build(storage, building_index)
+        finally:
+            self._lock.release()
+
+    def _build(self, storage, building_index=None) -> Dict[str, int]:
+        os.makedirs(self.output_dir, exist_ok=True)
+        today = date.today().isoformat()
+        previous_state = self._load_json(self.state_path)
+        previous_shards = self.manifest.get('shards', {})
+        state: Dict[str, List] = {}
+        shards: Dict[str, Dict] = {}
+        written = 0
+
+        for section, entries in self._entries(storage, building_index).items():
+            # loc -> lastmod (dict também elimina slugs duplicados)
+            urls: Dict[str, Optional[str]] = {}
+            for loc, fingerprint, updated_at in entries:
+                lastmod = _lastmod(updated_at)
+                if fingerprint:
+                    known = previous_state.get(loc)
+                    if known and known[0] == fingerprint:
+                        lastmod = known[1]
+                    elif known:
+                        lastmod = today  # Conteúdo mudou desde a última geração
+                    state[loc] = [fingerprint, lastmod]
+                urls[loc] = lastmod
+            if not urls:
+                continue
+
+            count = math.ceil(len(urls) / self.target_urls) or 1
+            while True:
+                buckets: List[List[Tuple[str, Optional[str]]]] = [[] for _ in range(count)]
+                for loc, lastmod in urls.items():
+                    buckets[_shard_of(loc, count)].append((loc, lastmod))
+                if max(map(len, buckets)) <= self.max_urls:
+                    break
+                count += 1
+
+            changefreq, priority = SECTIONS[section]
+            for i, bucket in enumerate(buckets):
+                bucket.sort()
+                name = f"sitemap-{section}-{i}.xml.gz"
+                digest = hashlib.blake2b(
+                    "".join(f"{loc}\t{lastmod}\n" for loc, lastmod in bucket).encode('utf-8'), digest_size=16
+                ).hexdigest()
+                old = previous_shards.get(name)
+                path = os.path.join(self.output_dir, name)
+                if old and old['digest'] == digest and os.path.exists(path):
+                    shards[name] = old
+                    continue
+                _atomic_write(path, gzip.compress(self._urlset(bucket, changefreq, priority), mtime=0))
+                shards[name] = {'digest': digest, 'urls': len(bucket), 'lastmod': today}
+                written += 1
+
+        for name in set(previous_shards) - set(shards):
+            try:
+                os.remove(os.path.join(self.output_dir, name))
+            except OSError:
+                pass
+
+        index_etag = self.manifest.get('index_etag')
+        if written or set(previous_shards) != set(shards) or not os.path.exists(self._path(INDEX_NAME)):
+            index = self._index(shards)
+            _atomic_write(self._path(INDEX_NAME), index)
+            index_etag = hashlib.blake2b(index, digest_size=16).hexdigest()
+
+        manifest = {'shards': shards, 'index_etag': index_etag, 'built_at': datetime.now().isoformat()}
+        _atomic_write(self.state_path, json.dumps(state, ensure_ascii=False).encode('utf-8'))
+        _atomic_write(self.manifest_path, json.dumps(manifest).encode('utf-8'))
+        self.manifest = manifest
+
+        total = sum(shard['urls'] for shard in shards.values())
+        logger.info(f"Sitemap: {total} URLs em {len(shards)} shards ({written} regravados)")
+        return {"urls": total, "shards": len(shards), "written": written}
+
+    def _urlset(self, bucket: List[Tuple[str, Optional[str]]], changefreq: str, priority: str) -> bytes:
+        parts = ['<?xml version="1.0" encoding="UTF-8"?>\n'
+                 '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n']
+        for loc, lastmod in bucket:
+            lastmod_tag = f"<lastmod>{lastmod}</lastmod>" if lastmod else ""
+            parts.append(f"<url><loc>{escape(loc)}</loc>{lastmod_tag}"
+                         f"<changefreq>{changefreq}</changefreq><priority>{priority}</priority></url>\n")
+        parts.append('</urlset>\n')
+        return "".join(parts).encode('utf-8')
+
+    def _index(self, shards: Dict[str, Dict]) -> bytes:
+        parts = ['<?xml version="1.0" encoding="UTF-8"?>\n'
+                 '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n']
+        for name in sorted(shards):
+            parts.append(f"<sitemap><loc>{escape(self.base_url)}/sitemaps/{name}</loc>"
+                         f"<lastmod>{shards[name]['lastmod']}</lastmod></sitemap>\n")
+        parts.append('</sitemapindex>\n')
+        return "".join(parts).encode('utf-8')
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.output_dir, name)
+
+    def read(self, name: str = INDEX_NAME) -> Optional[Tuple[bytes, str]]:
+        """
+        (conteúdo, etag) de um arquivo já gerado. Só nomes presentes no manifesto são servidos.
+        """
+        manifest = self.manifest
+        if name == INDEX_NAME:
+            etag = manifest.get('index_etag')
+        elif SHARD_NAME_RE.match(name) and name in manifest.get('shards', {}):
+            etag = manifest['shards'][name]['digest']
+        else:
+            return None
+        if not etag:
+            return None
+        try:
+            with open(self._path(name), 'rb') as f:
+                return f.read(), etag
+        except OSError:
+            return None
+
+
+if __name__ == "__main__":
+    # Benchmark: geração completa e incremental com 120k imóveis
+    import shutil
+    import tempfile
+    import time
+
+    from services.storage import Storage
+
+    class FakeStorage:
+        def __init__(self, properties):
+            self.properties = properties
+
+        def iter_building_slugs(self):
+            return iter([("mansao-wildberger", datetime(2024, 5, 1)), ("edf-costa-pinto", datetime(2024, 5, 2))])
+
+        def iter_sitemap_properties(self):
+            return iter(self.properties)
+
+    collected = datetime(2024, 6, 1)
+    inventory = [(f"apartamento-{i}-salvador", f"fp{i}", collected) for i in range(120_000)]
+    directory = tempfile.mkdtemp()
+    try:
+        builder = SitemapBuilder(output_dir=directory)
+        start = time.perf_counter()
+        stats = builder.build(FakeStorage(inventory))
+        print(f"Geração completa: {time.perf_counter() - start:.2f}s {stats}")
+
+        start = time.perf_counter()
+        stats = builder.build(FakeStorage(inventory))
+        print(f"Sem mudanças: {time.perf_counter() - start:.2f}s {stats}")
+
+        inventory[42] = ("apartamento-42-salvador", "fp-novo", collected)
+        start = time.perf_counter()
+        stats = builder.build(FakeStorage(inventory))
+        print(f"1 imóvel alterado: {time.perf_counter() - start:.2f}s {stats}")
+
+        start = time.perf_counter()
+        for _ in range(1000):
+            builder.read(INDEX_NAME)
+        print(f"Leitura do índice: {(time.perf_counter() - start) * 1000:.3f} ms/1000")
+
+        # Storage real (SQLite em memória)
+        storage = Storage("sqlite://")
+        storage.upsert_properties([{'link': f"https://x/{i}", 'seo_slug': f"imovel-{i}", 'fingerprint': f"f{i}"}
+                                   for i in range(10)] + [{'link': "https://x/d", 'seo_slug': "d", 'status': 'DELISTED'}])
+        print(SitemapBuilder(output_dir=os.path.join(directory, "db")).build(storage))
+    finally:
+        shutil.rmtree(directory)
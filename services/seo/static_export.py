@@ -0,0 +1,354 @@
+import hashlib
+import html
+import json
+import logging
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from services.building_index import BuildingIndex, building_slug
+from services.seo.schema import SchemaFactory
+from services.seo.sitemap import DEFAULT_BASE_URL, INDEX_NAME, SitemapBuilder
+
+# Configuração de Logs
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("StaticExport")
+
+# Saída própria (/imoveis/{slug} -> imoveis/{slug}/index.html), fora do `outputDirectory` do
+# vercel.json: o `vite build` esvazia o dist, então o buildCommand copia a exportação para lá
+# depois do build (`publish`)
+DEFAULT_EXPORT_DIR = os.getenv("STATIC_EXPORT_DIR", os.path.join(".cache", "static_site"))
+# Estado incremental da exportação (manifesto, sitemaps e redirecionamentos), fora da saída publicada
+DEFAULT_STATE_DIR = os.getenv("STATIC_EXPORT_STATE_DIR", os.path.join(".cache", "static_export"))
+# Redirecionamentos 301 gerados (no estado); mesclados ao vercel.json do build por `publish`
+REDIRECTS_NAME = "redirects.json"
+# Limite de rotas (redirects + rewrites + headers) por deploy na Vercel
+VERCEL_MAX_ROUTES = 2048
+
+# Versão dos templates: incrementar força a re-renderização de todas as páginas
+TEMPLATE_VERSION = 1
+
+# Campos que aparecem na página do imóvel (mudou algum deles, a página é re-renderizada)
+LISTING_PAGE_FIELDS = (
+    'seo_slug', 'seo_title', 'meta_description', 'title', 'ai_title', 'description', 'ai_description',
+    'type', 'price', 'bedrooms', 'bathrooms', 'area', 'parking', 'photos', 'location', 'building_slug',
+)
+BUILDING_PAGE_FIELDS = ('slug', 'name', 'neighborhood', 'description', 'features')
+BUILDING_LISTING_FIELDS = ('seo_slug', 'title', 'price', 'bedrooms', 'area')
+
+# Páginas por tarefa enviada ao process pool (amortiza o pickling)
+BATCH_SIZE = 200
+
+_schema_factory = SchemaFactory()
+
+
+def _fingerprint(kind: str, payload: Any) -> str:
+    encoded = json.dumps([kind, TEMPLATE_VERSION, payload], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(encoded.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _price(value) -> str:
+    return f"R$ {float(value or 0):,.0f}".replace(',', '.')
+
+
+def _page(title: str, description: str, canonical: str, body: str, json_ld: Optional[str] = None) -> str:
+    e = html.escape
+    json_ld_tag = f'<script type="application/ld+json">{json_ld}</script>\n' if json_ld else ''
+    return (
+        '<!DOCTYPE html>\n<html lang="pt-BR">\n<head>\n<meta charset="utf-8">\n'
+        '<meta name="viewport" content="width=device-width, initial-scale=1">\n'
+        f'<title>{e(title)}</title>\n<meta name="description" content="{e(description)}">\n'
+        f'<link rel="canonical" href="{e(canonical)}">\n{json_ld_tag}</head>\n<body>\n{body}</body>\n</html>\n'
+    )
+
+
+def _write(output_dir: str, relative: str, content: bytes):
+    path = os.path.join(output_dir, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def render_listing(prop: Dict, base_url: str) -> Dict[str, bytes]:
+    """
+    Arquivos da página de um imóvel: HTML (com JSON-LD embutido) e o JSON-LD avulso.
+    """
+    e = html.escape
+    slug = prop['seo_slug']
+    json_ld = json.dumps(_schema_factory.build_json_ld(prop), ensure_ascii=False, separators=(',', ':'))
+    safe_json_ld = json_ld.replace('</', '<\\/')
+    location = prop.get('location') or {}
+    neighborhood = location.get('neighborhood', 'Salvador') if isinstance(location, dict) else 'Salvador'
+
+    specs = [f"{prop[field]} {label}" for field, label in
+             (('bedrooms', 'quartos'), ('bathrooms', 'banheiros'), ('parking', 'vagas')) if prop.get(field)]
+    if prop.get('area'):
+        specs.append(f"{prop['area']} m²")
+    images = "".join(
+        f'<img src="{e(url)}" alt="{e(prop.get("title", ""))}" loading="lazy">\n' for url in (prop.get('photos') or [])[:6]
+    )
+    building = (f'<p><a href="{e(base_url)}/buildings/{e(prop["building_slug"])}">Ver o condomínio</a></p>\n'
+                if prop.get('building_slug') else '')
+    body = (
+        f'<main>\n<h1>{e(prop.get("ai_title") or prop.get("title") or "")}</h1>\n'
+        f'<p>{e(neighborhood)}, Salvador - BA</p>\n'
+        f'<p><strong>{_price(prop.get("price"))}</strong></p>\n'
+        f'<p>{e(" · ".join(specs))}</p>\n'
+        f'{images}<p>{e(prop.get("ai_description") or prop.get("description") or "")}</p>\n'
+        f'{building}</main>\n'
+    )
+    page = _page(
+        prop.get('seo_title') or prop.get('title') or slug,
+        prop.get('meta_description') or '',
+        f"{base_url}/imoveis/{slug}",
+        body,
+        safe_json_ld
+    )
+    return {
+        f"imoveis/{slug}/index.html": page.encode('utf-8'),
+        f"imoveis/{slug}/schema.json": json_ld.encode('utf-8'),
+    }
+
+
+def render_building(building: Dict, listings: List[Dict], base_url: str) -> Dict[str, bytes]:
+    """
+    Página de um edifício com a lista dos imóveis disponíveis.
+    """
+    e = html.escape
+    slug = building['slug']
+    neighborhood = building.get('neighborhood') or 'Salvador'
+    description = building.get('description') or \
+        f"{building['name']}: condomínio em {neighborhood}, Salvador, com {len(listings)} imóveis à venda."
+    features = "".join(f"<li>{e(feature)}</li>" for feature in building.get('features') or [])
+    items = "".join(
+        f'<li><a href="{e(base_url)}/imoveis/{e(prop["seo_slug"])}">{e(prop.get("title") or "")}</a> - '
+        f'{_price(prop.get("price"))}</li>\n'
+        for prop in listings
+    )
+    body = (
+        f'<main>\n<h1>{e(building["name"])}</h1>\n<p>{e(neighborhood)}, Salvador - BA</p>\n'
+        f'<p>{e(description)}</p>\n'
+        + (f'<ul class="features">{features}</ul>\n' if features else '')
+        + f'<h2>Imóveis disponíveis ({len(listings)})</h2>\n<ul>\n{items}</ul>\n</main>\n'
+    )
+    page = _page(f"{building['name']} - {neighborhood} | Bahia Satellite", description[:160],
+                 f"{base_url}/buildings/{slug}", body)
+    return {f"buildings/{slug}/index.html": page.encode('utf-8')}
+
+
+def _render_batch(jobs: List[Tuple[str, tuple]], output_dir: str, base_url: str) -> int:
+    """
+    Executado no process pool: renderiza e grava um lote de páginas. Retorna arquivos gravados.
+    """
+    written = 0
+    for kind, args in jobs:
+        files = render_listing(*args, base_url) if kind == 'listing' else render_building(*args, base_url)
+        for relative, content in files.items():
+            _write(output_dir, relative, content)
+            written += 1
+    return written
+
+
+class StaticExporter:
+    """
+    Exportação estática das páginas de SEO (imóveis, edifícios, JSON-LD e sitemaps) para CDN.
+
+    - Cada página tem uma impressão digital dos campos que ela exibe; só páginas alteradas
+      desde a última exportação são re-renderizadas (manifesto em `state_dir`).
+    - Renderização em paralelo num process pool, em lotes.
+    - Imóveis agrupados por edifício com o BuildingIndex (mesma regra da API), a partir do banco.
+    - Páginas de imóveis deslistados/slugs aposentados são removidas; slugs aposentados viram
+      redirecionamentos 301 num arquivo gerado, mesclados ao vercel.json só no build (`publish`).
+    """
+
+    def __init__(self, output_dir: str = DEFAULT_EXPORT_DIR, base_url: str = DEFAULT_BASE_URL,
+                 workers: Optional[int] = None, state_dir: str = DEFAULT_STATE_DIR):
+        self.output_dir = output_dir
+        self.state_dir = state_dir
+        self.base_url = base_url.rstrip('/')
+        self.workers = workers or os.cpu_count() or 2
+        self.manifest_path = os.path.join(state_dir, "manifest.json")
+        self.redirects_path = os.path.join(state_dir, REDIRECTS_NAME)
+
+    def _load_manifest(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.manifest_path):
+            return {}
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('pages', {})
+        except (OSError, ValueError) as e:
+            logger.error(f"Manifesto inválido ({self.manifest_path}), exportação completa: {e}")
+            return {}
+
+    def _pages(self, storage, index: BuildingIndex) -> Iterable[Tuple[str, str, List[str], Tuple[str, tuple]]]:
+        """
+        (chave da página, impressão digital, arquivos, job de renderização) de cada página.
+        """
+        properties = [
+            p for p in storage.load_properties()
+            if p.get('seo_slug') and p.get('link') and p.get('status') != 'DELISTED'
+        ]
+        buildings = storage.load_buildings()
+        published = {building['slug'] for building in buildings}
+        index.upsert_many(properties)
+
+        by_building: Dict[str, List[Dict]] = {}
+        for prop in properties:
+            payload = {field: prop[field] for field in LISTING_PAGE_FIELDS if field in prop}
+            key = index.key_of(prop['link'])
+            building = building_slug(key) if key else None
+            # Link para o edifício só se a página dele é exportada
+            payload['building_slug'] = building if building in published else None
+            slug = prop['seo_slug']
+            yield (f"imoveis/{slug}", _fingerprint('listing', payload),
+                   [f"imoveis/{slug}/index.html", f"imoveis/{slug}/schema.json"], ('listing', (payload,)))
+            if payload['building_slug']:
+                by_building.setdefault(building, []).append(
+                    {field: prop.get(field) for field in BUILDING_LISTING_FIELDS}
+                )
+
+        for building in buildings:
+            slug = building['slug']
+            # Edifício abaixo do mínimo de imóveis no ar: sem página (como na API e no sitemap)
+            if not index.live_key_for_slug(slug):
+                continue
+            listings = sorted(by_building.get(slug, []), key=lambda p: p.get('price') or 0)
+            payload = {field: building.get(field) for field in BUILDING_PAGE_FIELDS}
+            yield (f"buildings/{slug}", _fingerprint('building', [payload, listings]),
+                   [f"buildings/{slug}/index.html"], ('building', (payload, listings)))
+
+    def export(self, storage, force: bool = False) -> Dict[str, int]:
+        """
+        Exporta para `output_dir`. Retorna contagens de páginas renderizadas, mantidas e removidas.
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        previous = {} if force else self._load_manifest()
+        manifest: Dict[str, Dict[str, Any]] = {}
+        jobs: List[Tuple[str, tuple]] = []
+        index = BuildingIndex()
+
+        for key, fingerprint, files, job in self._pages(storage, index):
+            manifest[key] = {'fingerprint': fingerprint, 'files': files}
+            old = previous.get(key)
+            if old and old['fingerprint'] == fingerprint and \
+                    all(os.path.exists(os.path.join(self.output_dir, f)) for f in files):
+                continue
+            jobs.append(job)
+
+        written = 0
+        if jobs:
+            batches = [jobs[i:i + BATCH_SIZE] for i in range(0, len(jobs), BATCH_SIZE)]
+            if self.workers > 1 and len(batches) > 1:
+                with ProcessPoolExecutor(max_workers=min(self.workers, len(batches))) as pool:
+                    results = pool.map(_render_batch, batches, [self.output_dir] * len(batches),
+                                       [self.base_url] * len(batches))
+                    written = sum(results)
+            else:
+                written = sum(_render_batch(batch, self.output_dir, self.base_url) for batch in batches)
+
+        removed = 0
+        for key in set(previous) - set(manifest):
+            for relative in previous[key]['files']:
+                try:
+                    os.remove(os.path.join(self.output_dir, relative))
+                except OSError:
+                    pass
+            shutil.rmtree(os.path.join(self.output_dir, key), ignore_errors=True)
+            removed += 1
+
+        self._export_redirects(storage)
+        self._export_sitemaps(storage, index)
+        _write(self.state_dir, "manifest.json",
+               json.dumps({'template_version': TEMPLATE_VERSION, 'pages': manifest}).encode('utf-8'))
+
+        stats = {"pages": len(manifest), "rendered": len(jobs), "files": written,
+                 "unchanged": len(manifest) - len(jobs), "removed": removed}
+        logger.info(f"Exportação estática: {stats}")
+        return stats
+
+    def _export_redirects(self, storage):
+        """
+        Slugs aposentados -> slug atual (301), no arquivo de redirecionamentos do estado.
+        """
+        rows = storage.load_slugs()
+        active = {row['link']: row['slug'] for row in rows if row['active']}
+        redirects = [
+            {"source": f"/imoveis/{row['slug']}", "destination": f"/imoveis/{active[row['link']]}", "permanent": True}
+            for row in rows if not row['active'] and row['link'] in active
+        ]
+        redirects.sort(key=lambda r: r['source'])
+        # Saída de versões anteriores: a Vercel ignora este arquivo
+        try:
+            os.remove(os.path.join(self.output_dir, REDIRECTS_NAME))
+        except OSError:
+            pass
+        _write(self.state_dir, REDIRECTS_NAME, json.dumps(redirects, ensure_ascii=False).encode('utf-8'))
+
+    def publish(self, target_dir: str, vercel_config: Optional[str] = None) -> int:
+        """
+        Etapa do buildCommand, depois do `vite build`: copia a exportação para `target_dir` (dist)
+        e, com `vercel_config`, mescla os redirecionamentos na chave `redirects` do vercel.json do
+        checkout do build (as demais chaves são preservadas). Retorna quantos redirecionamentos.
+        """
+        shutil.copytree(self.output_dir, target_dir, dirs_exist_ok=True)
+        redirects = []
+        if os.path.exists(self.redirects_path):
+            with open(self.redirects_path, 'r', encoding='utf-8') as f:
+                redirects = json.load(f)
+        if not vercel_config:
+            return len(redirects)
+
+        with open(vercel_config, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        # Redirecionamentos escritos à mão no vercel.json vêm antes dos gerados
+        sources = {r['source'] for r in redirects}
+        config['redirects'] = [r for r in config.get('redirects', []) if r['source'] not in sources] + redirects
+        if not config['redirects']:
+            config.pop('redirects')
+        routes = sum(len(config.get(key, [])) for key in ('redirects', 'rewrites', 'headers'))
+        if routes > VERCEL_MAX_ROUTES:
+            logger.warning(f"vercel.json com {routes} rotas (limite da Vercel: {VERCEL_MAX_ROUTES})")
+        _write(os.path.dirname(os.path.abspath(vercel_config)), os.path.basename(vercel_config),
+               (json.dumps(config, ensure_ascii=False, indent=4) + "\n").encode('utf-8'))
+        return len(redirects)
+
+    def _export_sitemaps(self, storage, index: BuildingIndex):
+        """
+        Gera (incrementalmente) os sitemaps e copia o índice e os shards para a saída.
+        """
+        builder = SitemapBuilder(output_dir=os.path.join(self.state_dir, "sitemaps"), base_url=self.base_url)
+        builder.build(storage, index)
+        names = [INDEX_NAME] + [f"sitemaps/{name}" for name in builder.manifest.get('shards', {})]
+        for name in names:
+            cached = builder.read(os.path.basename(name))
+            if cached is not None:
+                _write(self.output_dir, name, cached[0])
+
+
+if __name__ == "__main__":
+    # Exportação: python -m services.seo.static_export [--output DIR] [--workers N] [--force]
+    # Build (vercel.json): ... --publish dist --vercel-config vercel.json, depois do `vite build`
+    import argparse
+    import time
+
+    from services.storage import Storage
+
+    parser = argparse.ArgumentParser(description="Exporta as páginas de SEO como arquivos estáticos.")
+    parser.add_argument("--output", default=DEFAULT_EXPORT_DIR, help="Diretório de saída")
+    parser.add_argument("--base-url", default=DEFAULT_BASE_URL, help="URL pública do site")
+    parser.add_argument("--workers", type=int, default=None, help="Processos de renderização")
+    parser.add_argument("--force", action="store_true", help="Re-renderiza todas as páginas")
+    parser.add_argument("--publish", default=None, help="Copia a exportação para este diretório (dist)")
+    parser.add_argument("--vercel-config", default=None,
+                        help="vercel.json do checkout do build que recebe os redirecionamentos 301 (com --publish)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    exporter = StaticExporter(args.output, args.base_url, args.workers)
+    stats = exporter.export(Storage(), force=args.force)
+    if args.publish:
+        stats['redirects'] = exporter.publish(args.publish, args.vercel_config)
+    print(json.dumps(stats), f"({time.perf_counter() - start:.2f}s)")
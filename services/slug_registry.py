@@ -0,0 +1,170 @@
+import logging
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+from services.listing import listing_id
+
+# Configuração de Logs
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("SlugRegistry")
+
+# Tamanho inicial do sufixo de desambiguação (hex do id público do imóvel)
+SUFFIX_LENGTH = 6
+
+
+class SlugRegistry:
+    """
+    Alocação única e estável de slugs de imóveis + índice slug -> imóvel para as rotas.
+
+    - Colisão de slug semântico: sufixo determinístico derivado do link ("...-pituba-exclusivo-3fa9c1").
+    - Slug emitido nunca é reutilizado por outro imóvel; o imóvel mantém o slug enquanto o
+      slug semântico (tipo, quartos, bairro, destaque) não mudar.
+    - Se o slug semântico mudar, um novo slug é emitido e o antigo vira redirecionamento.
+    - Persistido no Storage (tabela `slugs`); alterações acumulam até `flush`.
+    """
+
+    def __init__(self, storage=None):
+        self.storage = storage
+        self._by_slug: Dict[str, str] = {}  # slug (ativo ou aposentado) -> link
+        self._active: Dict[str, str] = {}  # link -> slug ativo
+        self._bases: Dict[str, str] = {}  # link -> slug semântico do slug ativo
+        self.listings: Dict[str, Dict] = {}  # link -> imóvel mais recente
+        self._pending: Dict[str, Dict] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._active)
+
+    def load(self) -> int:
+        """
+        Carrega os slugs emitidos do Storage.
+        """
+        if not self.storage:
+            return 0
+        rows = self.storage.load_slugs()
+        with self._lock:
+            for row in rows:
+                self._by_slug[row['slug']] = row['link']
+                if row['active']:
+                    self._active[row['link']] = row['slug']
+                    self._bases[row['link']] = row['base']
+        logger.info(f"{len(self._active)} slugs ativos, {len(rows) - len(self._active)} redirecionamentos")
+        return len(rows)
+
+    def flush(self) -> Dict[str, int]:
+        """
+        Grava no Storage os slugs emitidos/aposentados desde o último flush.
+        """
+        with self._lock:
+            pending, self._pending = list(self._pending.values()), {}
+        if not self.storage or not pending:
+            return {"inserted": 0, "updated": 0}
+        try:
+            return self.storage.save_slugs(pending)
+        except Exception:
+            with self._lock:
+                for item in pending:
+                    self._pending.setdefault(item['slug'], item)
+            raise
+
+    def assign(self, link: str, base: str) -> str:
+        """
+        Slug definitivo do imóvel para o slug semântico `base`.
+        """
+        with self._lock:
+            current = self._active.get(link)
+            if current is not None and self._bases.get(link) == base:
+                return current
+
+            slug = base
+            length = SUFFIX_LENGTH
+            suffix = listing_id(link)
+            while self._by_slug.get(slug, link) != link:
+                slug = f"{base}-{suffix[:length]}"
+                length += 2
+                if length > len(suffix):
+                    suffix += listing_id(suffix)
+
+            if current is not None and current != slug:
+                self._pending[current] = {'slug': current, 'link': link, 'base': self._bases[link], 'active': False}
+            self._by_slug[slug] = link
+            self._active[link] = slug
+            self._bases[link] = base
+            self._pending[slug] = {'slug': slug, 'link': link, 'base': base, 'active': True}
+            return slug
+
+    def adopt(self, properties: Iterable[Dict]) -> int:
+        """
+        Registra imóveis persistidos antes do registro existir (o `seo_slug` gravado vira o slug
+        semântico) e reescreve o `seo_slug` com o slug definitivo. Retorna quantos foram registrados.
+        """
+        adopted = 0
+        with self._lock:
+            for prop in properties:
+                link, base = prop.get('link'), prop.get('seo_slug')
+                if not link or not base:
+                    continue
+                if link not in self._active:
+                    adopted += 1
+                    prop['seo_slug'] = self.assign(link, base)
+                else:
+                    prop['seo_slug'] = self._active[link]
+        return adopted
+
+    def track(self, properties: Iterable[Dict]):
+        """
+        Aponta o índice para a versão mais recente de cada imóvel (O(1) por imóvel).
+        """
+        with self._lock:
+            for prop in properties:
+                link = prop.get('link')
+                if link:
+                    self.listings[link] = prop
+
+    def resolve(self, slug: str) -> Optional[Tuple[str, str]]:
+        """
+        (link, slug ativo) do slug pedido; slug ativo diferente do pedido = redirecionar.
+        """
+        link = self._by_slug.get(slug)
+        if link is None:
+            return None
+        return link, self._active.get(link, slug)
+
+    def lookup(self, slug: str) -> Tuple[Optional[Dict], Optional[str]]:
+        """
+        (imóvel, slug ativo) para a rota /imoveis/{slug}; (None, None) se o slug nunca foi emitido.
+        """
+        resolved = self.resolve(slug)
+        if resolved is None:
+            return None, None
+        link, active = resolved
+        return self.listings.get(link), active
+
+
+if __name__ == "__main__":
+    # Benchmark: 100k imóveis com slugs semânticos muito repetidos
+    import random
+    import time
+
+    random.seed(3)
+    bases = [f"apartamento-{q}-quartos-{b}-{d}" for q in range(1, 6)
+             for b in ("pituba", "barra", "graca", "ondina", "horto-florestal")
+             for d in ("exclusivo", "vista-mar", "alto-padrao")]
+    links = [f"https://www.lopes.com.br/imovel/REO{i:07d}" for i in range(100_000)]
+
+    registry = SlugRegistry()
+    start = time.perf_counter()
+    slugs = [registry.assign(link, random.choice(bases)) for link in links]
+    print(f"Alocação (100k, {len(bases)} slugs semânticos): {(time.perf_counter() - start) * 1000:.0f} ms, "
+          f"{len(set(slugs))} slugs únicos")
+
+    registry.track({'link': link, 'seo_slug': slug} for link, slug in zip(links, slugs))
+    start = time.perf_counter()
+    for slug in slugs:
+        registry.lookup(slug)
+    print(f"Lookup: {(time.perf_counter() - start) / len(slugs) * 1e9:.0f} ns/slug")
+
+    old = slugs[0]
+    new = registry.assign(links[0], "cobertura-4-quartos-barra-vista-mar")
+    print(f"Mudança de slug semântico: {old} -> {new}; antigo resolve para {registry.resolve(old)[1]}")
+    print(f"Reatribuição idempotente: {registry.assign(links[1], registry._bases[links[1]]) == slugs[1]}")
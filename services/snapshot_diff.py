@@ -0,0 +1,204 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+# Configuração de Logs
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("SnapshotDiff")
+
+# Contadores de ausência persistidos ao lado da fronteira da coleta incremental
+DEFAULT_DELISTING_PATH = os.getenv("DELISTING_STATE_PATH", os.path.join(".cache", "delisting.json"))
+
+
+def link_key(link: str) -> int:
+    """
+    Chave compacta de 64 bits para um link (blake2b).
+    """
+    return int.from_bytes(hashlib.blake2b(link.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class Snapshot:
+    """
+    Snapshot compacto de uma coleta: chaves de 64 bits ordenadas + preços alinhados.
+    Os links originais são mantidos apenas para montar o relatório.
+    """
+
+    def __init__(self, keys: np.ndarray, prices: np.ndarray, links: np.ndarray):
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.prices = prices[order]
+        self.links = links[order]
+
+    @classmethod
+    def from_prices(cls, prices_by_link: Dict[str, float]) -> "Snapshot":
+        links = np.array(list(prices_by_link), dtype=object)
+        keys = np.fromiter((link_key(link) for link in links), dtype=np.uint64, count=len(links))
+        prices = np.fromiter((prices_by_link[link] or 0.0 for link in links), dtype=np.float64, count=len(links))
+        return cls(keys, prices, links)
+
+    @classmethod
+    def from_properties(cls, properties: Iterable[Dict]) -> "Snapshot":
+        return cls.from_prices({p['link']: p.get('price') for p in properties if p.get('link')})
+
+    @classmethod
+    def empty(cls) -> "Snapshot":
+        return cls(np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.float64), np.empty(0, dtype=object))
+
+    def merge(self, newer: "Snapshot") -> "Snapshot":
+        """
+        União dos dois snapshots; em chaves comuns prevalece o preço de `newer`.
+        """
+        keys = np.concatenate([newer.keys, self.keys])
+        # np.unique devolve a primeira ocorrência de cada chave (as de `newer`)
+        _, first = np.unique(keys, return_index=True)
+        return Snapshot(
+            keys[first],
+            np.concatenate([newer.prices, self.prices])[first],
+            np.concatenate([newer.links, self.links])[first]
+        )
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+
+def diff_snapshots(old: Snapshot, new: Snapshot, detect_removed: bool = True) -> Dict:
+    """
+    Compara dois snapshots em uma passada vetorizada (join por chaves ordenadas).
+    `detect_removed=False` para coletas parciais, onde ausência não significa remoção.
+    """
+    _, old_idx, new_idx = np.intersect1d(old.keys, new.keys, assume_unique=True, return_indices=True)
+
+    added_mask = np.ones(len(new), dtype=bool)
+    added_mask[new_idx] = False
+
+    old_prices = old.prices[old_idx]
+    new_prices = new.prices[new_idx]
+    up = new_prices > old_prices
+    down = new_prices < old_prices
+
+    def price_changes(mask: np.ndarray) -> List[Dict]:
+        return [
+            {'link': link, 'old_price': float(before), 'new_price': float(after)}
+            for link, before, after in zip(new.links[new_idx][mask], old_prices[mask], new_prices[mask])
+        ]
+
+    removed = []
+    if detect_removed:
+        removed_mask = np.ones(len(old), dtype=bool)
+        removed_mask[old_idx] = False
+        removed = old.links[removed_mask].tolist()
+
+    return {
+        'added': new.links[added_mask].tolist(),
+        'removed': removed,
+        'price_up': price_changes(up),
+        'price_down': price_changes(down),
+        'unchanged_count': int(len(new_idx) - up.sum() - down.sum()),
+        'delisted': []
+    }
+
+
+class DelistingTracker:
+    """
+    Marca como deslistados os imóveis ausentes por `missing_runs` coletas completas seguidas.
+    Com `path`, os contadores sobrevivem a restarts (carregados aqui, gravados por `save`).
+    """
+
+    def __init__(self, missing_runs: int = 2, path: Optional[str] = None):
+        self.missing_runs = missing_runs
+        self.path = path
+        self.missing_keys = np.empty(0, dtype=np.uint64)
+        self.missing_counts = np.empty(0, dtype=np.int32)
+        self.missing_links = np.empty(0, dtype=object)
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                counts = json.load(f).get('missing', {})
+        except (OSError, ValueError) as e:
+            logger.error(f"Erro ao carregar contadores de ausência ({self.path}): {e}")
+            return
+        links = list(counts)
+        self.missing_links = np.array(links, dtype=object)
+        self.missing_keys = np.fromiter((link_key(link) for link in links), dtype=np.uint64, count=len(links))
+        self.missing_counts = np.fromiter((counts[link] for link in links), dtype=np.int32, count=len(links))
+        logger.info(f"{len(links)} imóveis ausentes em acompanhamento")
+
+    def save(self):
+        """
+        Grava os contadores de forma atômica (arquivo temporário + rename).
+        """
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'missing': dict(zip(self.missing_links.tolist(), self.missing_counts.tolist()))},
+                      f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def __len__(self) -> int:
+        return len(self.missing_keys)
+
+    def update(self, old: Snapshot, new: Snapshot) -> List[str]:
+        """
+        Atualiza os contadores após uma coleta completa e retorna os links deslistados.
+        """
+        # Quem ainda está ausente soma uma coleta; quem reapareceu sai do rastreamento
+        still_missing = ~np.isin(self.missing_keys, new.keys)
+        keys = self.missing_keys[still_missing]
+        counts = self.missing_counts[still_missing] + 1
+        links = self.missing_links[still_missing]
+
+        # Novos ausentes (removidos nesta coleta) começam com 1
+        removed_keys = old.keys[~np.isin(old.keys, new.keys, assume_unique=True)]
+        fresh = ~np.isin(removed_keys, keys)
+        removed_links = old.links[np.searchsorted(old.keys, removed_keys[fresh])]
+        keys = np.concatenate([keys, removed_keys[fresh]])
+        counts = np.concatenate([counts, np.ones(int(fresh.sum()), dtype=np.int32)])
+        links = np.concatenate([links, removed_links])
+
+        delisted = counts >= self.missing_runs
+
+        self.missing_keys = keys[~delisted]
+        self.missing_counts = counts[~delisted]
+        self.missing_links = links[~delisted]
+        return links[delisted].tolist()
+
+
+if __name__ == "__main__":
+    # Benchmark: diff entre dois snapshots de 200k imóveis
+    import time
+
+    rng = np.random.default_rng(42)
+    n = 200_000
+    base = {f"https://www.lopes.com.br/imovel/{i}": float(500_000 + i) for i in range(n)}
+    changed = dict(base)
+    for i in rng.choice(n, 5_000, replace=False):
+        changed[f"https://www.lopes.com.br/imovel/{i}"] *= rng.choice([0.95, 1.05])
+    for i in range(10_000):
+        changed.pop(f"https://www.lopes.com.br/imovel/{i}")
+        changed[f"https://www.lopes.com.br/imovel/novo-{i}"] = 750_000.0
+
+    start = time.perf_counter()
+    old_snapshot, new_snapshot = Snapshot.from_prices(base), Snapshot.from_prices(changed)
+    built = time.perf_counter()
+    report = diff_snapshots(old_snapshot, new_snapshot)
+    done = time.perf_counter()
+
+    print(f"Construção dos snapshots (2 x {n}): {built - start:.3f}s")
+    print(f"Diff: {(done - built) * 1000:.1f} ms")
+    print(
+        f"Novos: {len(report['added'])}, removidos: {len(report['removed'])}, "
+        f"alta: {len(report['price_up'])}, baixa: {len(report['price_down'])}, "
+        f"inalterados: {report['unchanged_count']}"
+    )
@@ -5,6 +5,8 @@ from typing import List, Dict
 import json
 from googlesearch import search
 
+from services.executor import executor
+
 # Configuração de Logs
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("StealthRadar")
@@ -31,6 +33,12 @@ class StealthRadar:
             dorks.append(dork)
         return dorks
 
+    async def run_radar_async(self, max_results_per_dork: int = 10) -> List[Dict]:
+        """
+        Versão assíncrona: a varredura (com pausas de 5-15s por dork) roda no thread pool.
+        """
+        return await executor.run_io(self.run_radar, max_results_per_dork)
+
     def run_radar(self, max_results_per_dork: int = 10) -> List[Dict]:
         """
         Executa a varredura OSINT.
@@ -0,0 +1,414 @@
+import logging
+import os
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import (
+    Boolean, Column, DateTime, Float, Index, Integer, JSON, MetaData, String, Table, Text,
+    bindparam, create_engine, func, insert, or_, select, update
+)
+
+from services.listing import listing_id
+from services.price_history import PriceHistoryStore
+
+# Configuração de Logs
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("Storage")
+
+DEFAULT_DATABASE_URL = "sqlite:///bahia_satellite.db"
+
+# Tamanho dos lotes de IN (...) — SQLite limita o número de parâmetros por query
+LOOKUP_CHUNK = 500
+
+metadata = MetaData()
+
+properties_table = Table(
+    "properties", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("link", String(500), nullable=False, unique=True),
+    Column("slug", String(255)),
+    Column("title", String(500)),
+    Column("neighborhood", String(100)),
+    Column("price", Float),
+    Column("status", String(20)),
+    Column("data", JSON),  # Objeto completo do imóvel (sem o histórico de preços)
+    Column("created_at", DateTime, default=datetime.now),
+    Column("updated_at", DateTime, default=datetime.now),
+    Index("idx_properties_slug", "slug"),
+    Index("idx_properties_neighborhood", "neighborhood"),
+)
+
+price_history_table = Table(
+    "price_history", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("link", String(500), nullable=False),
+    Column("price", Float, nullable=False),
+    Column("recorded_at", DateTime, nullable=False),
+    Index("idx_price_history_link", "link", "recorded_at"),
+)
+
+# Espelha database/buildings.sql (JSONB -> JSON para funcionar também no SQLite)
+buildings_table = Table(
+    "buildings", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("name", String(255), nullable=False),  # Nome de exibição; a identidade é o slug
+    Column("slug", String(255), nullable=False, unique=True),
+    Column("neighborhood", String(100)),
+    Column("description", Text),  # Gerado por IA
+    Column("features", JSON),  # Características extraídas por IA (ex: "Piscina", "Academia")
+    Column("created_at", DateTime, default=datetime.now),
+    Column("updated_at", DateTime, default=datetime.now),
+    Index("idx_buildings_slug", "slug"),
+)
+
+# Espelha database/slugs.sql: slugs emitidos (ativos e aposentados) nunca são reutilizados
+slugs_table = Table(
+    "slugs", metadata,
+    Column("slug", String(255), primary_key=True),
+    Column("link", String(500), nullable=False),
+    Column("base", String(255), nullable=False),  # Slug semântico antes da desambiguação
+    Column("active", Boolean, nullable=False, default=True),
+    Column("created_at", DateTime, default=datetime.now),
+    Column("retired_at", DateTime),
+    Index("idx_slugs_link", "link"),
+)
+
+
+def _parse_timestamp(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    if value:
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    return datetime.now()
+
+
+def _chunks(items: List, size: int = LOOKUP_CHUNK) -> Iterable[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class Storage:
+    """
+    Camada de persistência (SQLAlchemy Core).
+    SQLite localmente; qualquer URL SQLAlchemy em produção via DATABASE_URL.
+    """
+
+    def __init__(self, database_url: Optional[str] = None, pool_size: int = 5):
+        self.database_url = database_url or os.getenv("DATABASE_URL", DEFAULT_DATABASE_URL)
+
+        engine_kwargs = {"pool_pre_ping": True}
+        if self.database_url.startswith("sqlite"):
+            # Conexões do pool são compartilhadas entre threads do servidor
+            engine_kwargs["connect_args"] = {"check_same_thread": False}
+        else:
+            engine_kwargs["pool_size"] = pool_size
+
+        self.engine = create_engine(self.database_url, **engine_kwargs)
+        metadata.create_all(self.engine)
+        logger.info(f"Storage inicializado: {self.engine.url.render_as_string(hide_password=True)}")
+
+    def _existing_values(self, conn, column, keys: List[str]) -> set:
+        existing = set()
+        for chunk in _chunks(keys):
+            existing.update(conn.execute(select(column).where(column.in_(chunk))).scalars())
+        return existing
+
+    # --- Imóveis ---
+
+    def upsert_properties(self, properties: List[Dict]) -> Dict[str, int]:
+        """
+        Insere/atualiza imóveis em lote (executemany para inserts e updates).
+        Em imóveis existentes, os campos recebidos são mesclados ao `data` gravado: um item bruto
+        da coleta não apaga o enriquecimento (seo_slug, meta_description, schema_json, ai_*).
+        """
+        incoming = {}
+        for prop in properties:
+            link = prop.get('link')
+            if link:
+                incoming[link] = {k: v for k, v in prop.items() if k != 'price_history'}
+
+        if not incoming:
+            return {"inserted": 0, "updated": 0}
+
+        table = properties_table
+        with self.engine.begin() as conn:
+            existing = self._existing_data(conn, list(incoming))
+            new_rows = []
+            updated_rows = []
+            for link, data in incoming.items():
+                if link not in existing:
+                    new_rows.append(self._property_row(link, data))
+                    continue
+                row = self._property_row(link, dict(existing[link] or {}, **data))
+                row.pop("created_at")
+                row["b_link"] = row.pop("link")
+                if row["slug"] is None:
+                    # Não apagar o slug gerado pelo enriquecimento SEO
+                    row.pop("slug")
+                updated_rows.append(row)
+
+            if new_rows:
+                conn.execute(insert(table), new_rows)
+            for batch in self._group_by_columns(updated_rows):
+                conn.execute(update(table).where(table.c.link == bindparam("b_link")), batch)
+
+        return {"inserted": len(new_rows), "updated": len(updated_rows)}
+
+    @staticmethod
+    def _property_row(link: str, data: Dict) -> Dict:
+        location = data.get('location') or {}
+        return {
+            "link": link,
+            "slug": data.get('seo_slug'),
+            "title": data.get('title'),
+            "neighborhood": location.get('neighborhood') if isinstance(location, dict) else None,
+            "price": data.get('price'),
+            "status": data.get('status'),
+            "data": data,
+            "created_at": _parse_timestamp(data.get('created_at') or data.get('collected_at')),
+            "updated_at": _parse_timestamp(data.get('updated_at') or data.get('collected_at')),
+        }
+
+    def _existing_data(self, conn, links: List[str]) -> Dict[str, Optional[Dict]]:
+        table = properties_table
+        existing = {}
+        for chunk in _chunks(links):
+            existing.update(conn.execute(select(table.c.link, table.c.data).where(table.c.link.in_(chunk))).all())
+        return existing
+
+    def load_properties(self) -> List[Dict]:
+        """
+        Carrega todos os imóveis persistidos (para aquecer caches após restart).
+        """
+        table = properties_table
+        with self.engine.connect() as conn:
+            result = conn.execute(select(table.c.data, table.c.created_at, table.c.updated_at))
+            properties = []
+            for data, created_at, updated_at in result:
+                prop = dict(data or {})
+                if prop.get('link'):
+                    prop.setdefault('id', listing_id(prop['link']))  # Registros anteriores ao id público
+                prop['created_at'] = created_at.isoformat() if created_at else None
+                prop['updated_at'] = updated_at.isoformat() if updated_at else None
+                properties.append(prop)
+        return properties
+
+    def load_delisted_links(self) -> List[str]:
+        """
+        Links dos imóveis marcados como DELISTED (pelo scheduler, após varreduras completas).
+        """
+        table = properties_table
+        with self.engine.connect() as conn:
+            return list(conn.execute(select(table.c.link).where(table.c.status == 'DELISTED')).scalars())
+
+    def iter_sitemap_properties(self, batch_size: int = 1000) -> Iterator[Tuple[str, Optional[str], datetime]]:
+        """
+        (slug, fingerprint, updated_at) dos imóveis publicáveis (com slug e não deslistados), em streaming.
+        """
+        table = properties_table
+        with self.engine.connect() as conn:
+            result = conn.execution_options(yield_per=batch_size).execute(
+                select(table.c.slug, table.c.data, table.c.updated_at)
+                .where(table.c.slug.isnot(None))
+                .where(or_(table.c.status.is_(None), table.c.status != 'DELISTED'))
+            )
+            for slug, data, updated_at in result:
+                yield slug, (data or {}).get('fingerprint'), updated_at
+
+    # --- Histórico de Preços ---
+
+    def append_price_points(self, points: List[Dict]) -> int:
+        """
+        Grava pontos de preço em lote. Cada ponto: {'link', 'price', 'date'}.
+        API e scheduler coletam o mesmo inventário: um ponto que repete o último preço gravado
+        do imóvel já foi registrado pelo outro coletor e é descartado. Retorna quantos foram gravados.
+        """
+        rows = sorted(({
+            "link": point['link'],
+            "price": point['price'],
+            "recorded_at": _parse_timestamp(point.get('date'))
+        } for point in points if point.get('link')), key=lambda row: row["recorded_at"])
+        if not rows:
+            return 0
+
+        table = price_history_table
+        with self.engine.begin() as conn:
+            last_price: Dict[str, float] = {}
+            for chunk in _chunks(list({row["link"] for row in rows})):
+                # Só o ponto mais recente de cada imóvel (índice link, recorded_at), não o histórico todo
+                latest = (
+                    select(table.c.link, func.max(table.c.recorded_at).label("recorded_at"))
+                    .where(table.c.link.in_(chunk))
+                    .group_by(table.c.link)
+                    .subquery()
+                )
+                for link, price in conn.execute(
+                    select(table.c.link, table.c.price)
+                    .join(latest, (table.c.link == latest.c.link) & (table.c.recorded_at == latest.c.recorded_at))
+                    .order_by(table.c.id)
+                ):
+                    last_price[link] = price
+            new_rows = []
+            for row in rows:
+                if last_price.get(row["link"]) != row["price"]:
+                    new_rows.append(row)
+                    last_price[row["link"]] = row["price"]
+            if new_rows:
+                conn.execute(insert(table), new_rows)
+        return len(new_rows)
+
+    def load_price_history(self) -> PriceHistoryStore:
+        """
+        Carrega o histórico completo em um PriceHistoryStore (colunas compactas por imóvel).
+        """
+        table = price_history_table
+        with self.engine.connect() as conn:
+            result = conn.execute(
+                select(table.c.link, table.c.price, table.c.recorded_at)
+                .order_by(table.c.link, table.c.recorded_at, table.c.id)
+            )
+            return PriceHistoryStore.from_points(result)
+
+    # --- Slugs ---
+
+    def load_slugs(self) -> List[Dict]:
+        """
+        Todos os slugs emitidos: {'slug', 'link', 'base', 'active'}.
+        """
+        table = slugs_table
+        with self.engine.connect() as conn:
+            rows = conn.execute(select(table.c.slug, table.c.link, table.c.base, table.c.active)).mappings().all()
+        return [dict(row) for row in rows]
+
+    def save_slugs(self, slugs: List[Dict]) -> Dict[str, int]:
+        """
+        Grava slugs novos e mudanças de estado (aposentado/ativo). Cada item: {'slug', 'link', 'base', 'active'}.
+        """
+        if not slugs:
+            return {"inserted": 0, "updated": 0}
+        now = datetime.now()
+        rows = {item['slug']: item for item in slugs}
+
+        table = slugs_table
+        with self.engine.begin() as conn:
+            existing = self._existing_values(conn, table.c.slug, list(rows))
+            new_rows = [
+                dict(item, created_at=now, retired_at=None if item['active'] else now)
+                for slug, item in rows.items() if slug not in existing
+            ]
+            # Slug aposentado pode voltar a ser ativo (o imóvel voltou ao slug semântico anterior)
+            changed = [{"b_slug": slug, "active": rows[slug]['active'],
+                        "retired_at": None if rows[slug]['active'] else now} for slug in existing]
+            if new_rows:
+                conn.execute(insert(table), new_rows)
+            if changed:
+                conn.execute(update(table).where(table.c.slug == bindparam("b_slug")), changed)
+
+        return {"inserted": len(new_rows), "updated": len(changed)}
+
+    # --- Edifícios ---
+
+    def upsert_buildings(self, buildings: List[Dict]) -> Dict[str, int]:
+        """
+        Insere/atualiza edifícios pelo slug. Cada edifício: {'name', 'slug', 'neighborhood', ...}.
+        Registros antigos com o mesmo nome e slug derivado do nome (formato anterior ao
+        BuildingIndex) são migrados para o slug novo em vez de duplicados.
+        """
+        now = datetime.now()
+        rows = {}
+        for building in buildings:
+            if not building.get('slug'):
+                continue
+            row = {"name": building['name'], "slug": building['slug'], "updated_at": now}
+            for optional in ("neighborhood", "description", "features"):
+                if optional in building:
+                    row[optional] = building[optional]
+            rows[building['slug']] = row
+
+        if not rows:
+            return {"inserted": 0, "updated": 0}
+
+        table = buildings_table
+        with self.engine.begin() as conn:
+            existing = self._existing_values(conn, table.c.slug, list(rows))
+            legacy = self._legacy_building_slugs(conn, [row for slug, row in rows.items() if slug not in existing])
+            new_rows = [dict(row, created_at=now) for slug, row in rows.items()
+                        if slug not in existing and slug not in legacy]
+            updated_rows = [dict(rows[slug], b_slug=slug) for slug in existing]
+            updated_rows += [dict(rows[slug], b_slug=old_slug) for slug, old_slug in legacy.items()]
+
+            # executemany exige o mesmo conjunto de colunas por lote
+            for batch in self._group_by_columns(new_rows):
+                conn.execute(insert(table), batch)
+            for batch in self._group_by_columns(updated_rows):
+                conn.execute(update(table).where(table.c.slug == bindparam("b_slug")), batch)
+
+        return {"inserted": len(new_rows), "updated": len(updated_rows)}
+
+    def _legacy_building_slugs(self, conn, rows: List[Dict]) -> Dict[str, str]:
+        """
+        slug novo -> slug antigo, para edifícios já gravados com o mesmo nome sob outro slug
+        (o nome determina a chave do edifício, logo é o mesmo edifício).
+        """
+        by_name = {row['name']: row['slug'] for row in rows}
+        if not by_name:
+            return {}
+        table = buildings_table
+        legacy = {}
+        for chunk in _chunks(list(by_name)):
+            for name, old_slug in conn.execute(
+                select(table.c.name, table.c.slug).where(table.c.name.in_(chunk))
+            ):
+                if by_name[name] not in legacy:
+                    legacy[by_name[name]] = old_slug
+        return legacy
+
+    def iter_building_slugs(self, batch_size: int = 1000) -> Iterator[Tuple[str, datetime]]:
+        """
+        (slug, updated_at) de todos os edifícios, em streaming.
+        """
+        table = buildings_table
+        with self.engine.connect() as conn:
+            result = conn.execution_options(yield_per=batch_size).execute(
+                select(table.c.slug, table.c.updated_at)
+            )
+            yield from result
+
+    @staticmethod
+    def _group_by_columns(rows: List[Dict]) -> List[List[Dict]]:
+        groups: Dict[tuple, List[Dict]] = {}
+        for row in rows:
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+        return list(groups.values())
+
+    def load_buildings(self) -> List[Dict]:
+        """
+        Todos os edifícios (para exportação estática).
+        """
+        table = buildings_table
+        with self.engine.connect() as conn:
+            rows = conn.execute(select(table)).mappings().all()
+        return [dict(row) for row in rows]
+
+    def load_buildings_without_description(self, limit: int = 10) -> List[Dict]:
+        """
+        Edifícios ainda sem descrição gerada (fila do job de background).
+        """
+        table = buildings_table
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                select(table.c.name, table.c.slug, table.c.neighborhood)
+                .where(table.c.description.is_(None))
+                .order_by(table.c.created_at)
+                .limit(limit)
+            ).mappings().all()
+        return [dict(row) for row in rows]
+
+    def get_building(self, slug: str) -> Optional[Dict]:
+        table = buildings_table
+        with self.engine.connect() as conn:
+            row = conn.execute(select(table).where(table.c.slug == slug)).mappings().first()
+        return dict(row) if row else None
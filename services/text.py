@@ -0,0 +1,17 @@
+import re
+import unicodedata
+
+
+def fold_accents(text: str) -> str:
+    """
+    Remove acentos via decomposição Unicode NFKD ("Graça" -> "Graca").
+    """
+    return unicodedata.normalize('NFKD', text or '').encode('ascii', 'ignore').decode('ascii')
+
+
+def slugify(text: str) -> str:
+    """
+    Converte texto para slug URL-friendly ("Edf. Mansão Wildberger" -> "edf-mansao-wildberger").
+    """
+    text = re.sub(r'[^\w\s-]', '', fold_accents(text)).lower()
+    return re.sub(r'[-\s]+', '-', text).strip('-')
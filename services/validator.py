@@ -1,5 +1,7 @@
 import logging
-from playwright.async_api import async_playwright
+from typing import Optional
+
+from services.browser_pool import BrowserPool
 
 # Configuração de Logs
 logging.basicConfig(level=logging.INFO)
@@ -9,8 +11,13 @@ class GhostValidator:
     """
     Módulo 'Ghost Validator' - Validação de WhatsApp sem API paga.
     """
-    def __init__(self):
-        pass
+    def __init__(self, pool: Optional[BrowserPool] = None):
+        """
+        Args:
+            pool: Pool de navegador compartilhado (iniciado no lifespan da aplicação).
+                  Sem ele, um pool próprio é iniciado no primeiro uso.
+        """
+        self.pool = pool or BrowserPool()
 
     async def validate_phone(self, phone_number: str) -> bool:
         """
@@ -27,11 +34,8 @@ class GhostValidator:
 
         is_valid = False
 
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
-            
-            try:
+        try:
+            async with self.pool.page() as page:
                 await page.goto(url, timeout=30000)
                 
                 # Lógica de detecção:
@@ -44,21 +48,19 @@ class GhostValidator:
 
                 content = await page.content()
                 
-                # Verificar mensagens de erro comuns na página pública do WA
-                if "Phone number shared via url is invalid" in content or "O número de telefone compartilhado através de url é inválido" in content:
-                    is_valid = False
-                    logger.info(f"Número {clean_number} INVÁLIDO.")
-                else:
-                    # Se não deu erro explícito e carregou a página de redirecionamento, assumimos válido preliminarmente
-                    # Para certeza absoluta precisaria tentar abrir o web.whatsapp, mas isso exige login (QR Code), o que viola a premissa "Headless/No Login" para este escopo simples.
-                    # A validação aqui é "Soft": O formato é aceito pelo gateway do WA?
-                    is_valid = True
-                    logger.info(f"Número {clean_number} VÁLIDO (Soft Check).")
-
-            except Exception as e:
-                logger.error(f"Erro na validação do número {clean_number}: {e}")
-                is_valid = False # Fail safe
+            # Verificar mensagens de erro comuns na página pública do WA
+            if "Phone number shared via url is invalid" in content or "O número de telefone compartilhado através de url é inválido" in content:
+                is_valid = False
+                logger.info(f"Número {clean_number} INVÁLIDO.")
+            else:
+                # Se não deu erro explícito e carregou a página de redirecionamento, assumimos válido preliminarmente
+                # Para certeza absoluta precisaria tentar abrir o web.whatsapp, mas isso exige login (QR Code), o que viola a premissa "Headless/No Login" para este escopo simples.
+                # A validação aqui é "Soft": O formato é aceito pelo gateway do WA?
+                is_valid = True
+                logger.info(f"Número {clean_number} VÁLIDO (Soft Check).")
 
-            await browser.close()
+        except Exception as e:
+            logger.error(f"Erro na validação do número {clean_number}: {e}")
+            is_valid = False # Fail safe
 
         return is_valid
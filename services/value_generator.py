@@ -8,10 +8,25 @@ from reportlab.pdfgen import canvas
 from reportlab.lib.utils import ImageReader
 from datetime import datetime
 
+from services.llm_cache import cached_model
+from services.executor import executor
+
 # Configuração de Logs
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("ValueGenerator")
 
+def _parse_json(text: str):
+    # A resposta pode vir com markdown ```json ... ```
+    text_response = text.strip()
+    if text_response.startswith("```json"):
+        text_response = text_response.replace("```json", "").replace("```", "")
+    return json.loads(text_response)
+
+
+def _is_json_object(text: str) -> bool:
+    return isinstance(_parse_json(text), dict)
+
+
 class ValueGenerator:
     """
     Módulo 'Value Generator Engine' - Isca de Alto Valor.
@@ -22,7 +37,19 @@ class ValueGenerator:
             logger.warning("API Key do Gemini não fornecida. ValueGenerator funcionará em modo limitado.")
         else:
             genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel('gemini-pro')
+            self.model = cached_model(genai.GenerativeModel('gemini-pro'))
+
+    async def generate_renovation_vision_async(self, property_data: Dict) -> Dict:
+        return await executor.run_io(self.generate_renovation_vision, property_data)
+
+    async def generate_neighborhood_guide_async(self, neighborhood: str) -> Dict:
+        return await executor.run_io(self.generate_neighborhood_guide, neighborhood)
+
+    async def create_dossier_pdf_async(self, property_data: Dict, thesis: Dict, filename: str = "dossier.pdf") -> str:
+        """
+        Renderiza o PDF no process pool (reportlab é CPU-bound e não libera o GIL).
+        """
+        return await executor.run_cpu(render_dossier_pdf, property_data, thesis, filename)
 
     def generate_renovation_vision(self, property_data: Dict) -> Dict:
         """
@@ -53,13 +80,8 @@ class ValueGenerator:
         """
 
         try:
-            response = self.model.generate_content(prompt)
-            text_response = response.text.strip()
-            if text_response.startswith("```json"):
-                text_response = text_response.replace("```json", "").replace("```", "")
-            
-            thesis = json.loads(text_response)
-            return thesis
+            response = self.model.generate_content(prompt, validate=_is_json_object)
+            return _parse_json(response.text)
         except Exception as e:
             logger.error(f"Erro ao gerar tese de investimento: {e}")
             return {"error": str(e)}
@@ -84,13 +106,8 @@ class ValueGenerator:
         """
 
         try:
-            response = self.model.generate_content(prompt)
-            text_response = response.text.strip()
-            if text_response.startswith("```json"):
-                text_response = text_response.replace("```json", "").replace("```", "")
-            
-            guide = json.loads(text_response)
-            return guide
+            response = self.model.generate_content(prompt, validate=_is_json_object)
+            return _parse_json(response.text)
         except Exception as e:
             logger.error(f"Erro ao gerar guia de bairro: {e}")
             return {"error": str(e)}
@@ -99,47 +116,54 @@ class ValueGenerator:
         """
         Gera um PDF simples com a tese de investimento.
         """
-        try:
-            c = canvas.Canvas(filename, pagesize=letter)
-            width, height = letter
-
-            # Header
-            c.setFont("Helvetica-Bold", 20)
-            c.drawString(50, height - 50, "Bahia Satellite | Investment Dossier")
-            
-            c.setFont("Helvetica", 12)
-            c.drawString(50, height - 80, f"Imóvel: {property_data.get('title', 'N/A')}")
-            c.drawString(50, height - 100, f"Valor Atual: R$ {property_data.get('price', 0):,.2f}")
-
-            # Thesis Content
-            y_position = height - 150
-            
-            c.setFont("Helvetica-Bold", 14)
-            c.drawString(50, y_position, "1. O Potencial Oculto")
-            c.setFont("Helvetica", 11)
-            c.drawString(50, y_position - 20, thesis.get('hidden_potential', 'N/A')[:90] + "...") # Truncate for simple PDF
-            
-            y_position -= 60
-            c.setFont("Helvetica-Bold", 14)
-            c.drawString(50, y_position, "2. Estimativa de Valorização")
-            c.setFont("Helvetica", 11)
-            c.drawString(50, y_position - 20, thesis.get('valuation_estimate', 'N/A'))
-
-            y_position -= 60
-            c.setFont("Helvetica-Bold", 14)
-            c.drawString(50, y_position, "3. Perfil de Comprador")
-            c.setFont("Helvetica", 11)
-            c.drawString(50, y_position - 20, thesis.get('buyer_profile', 'N/A'))
-
-            # Footer
-            c.setFont("Helvetica-Oblique", 10)
-            c.drawString(50, 50, "Gerado automaticamente por Bahia Satellite AI Engine.")
-            c.drawString(50, 35, f"Data: {datetime.now().strftime('%d/%m/%Y')}")
-
-            c.save()
-            logger.info(f"PDF gerado com sucesso: {filename}")
-            return filename
+        return render_dossier_pdf(property_data, thesis, filename)
 
-        except Exception as e:
-            logger.error(f"Erro ao gerar PDF: {e}")
-            return ""
+
+def render_dossier_pdf(property_data: Dict, thesis: Dict, filename: str = "dossier.pdf") -> str:
+    """
+    Renderização do dossiê (função de módulo para poder rodar em um process pool).
+    """
+    try:
+        c = canvas.Canvas(filename, pagesize=letter)
+        width, height = letter
+
+        # Header
+        c.setFont("Helvetica-Bold", 20)
+        c.drawString(50, height - 50, "Bahia Satellite | Investment Dossier")
+        
+        c.setFont("Helvetica", 12)
+        c.drawString(50, height - 80, f"Imóvel: {property_data.get('title', 'N/A')}")
+        c.drawString(50, height - 100, f"Valor Atual: R$ {property_data.get('price', 0):,.2f}")
+
+        # Thesis Content
+        y_position = height - 150
+        
+        c.setFont("Helvetica-Bold", 14)
+        c.drawString(50, y_position, "1. O Potencial Oculto")
+        c.setFont("Helvetica", 11)
+        c.drawString(50, y_position - 20, thesis.get('hidden_potential', 'N/A')[:90] + "...") # Truncate for simple PDF
+        
+        y_position -= 60
+        c.setFont("Helvetica-Bold", 14)
+        c.drawString(50, y_position, "2. Estimativa de Valorização")
+        c.setFont("Helvetica", 11)
+        c.drawString(50, y_position - 20, thesis.get('valuation_estimate', 'N/A'))
+
+        y_position -= 60
+        c.setFont("Helvetica-Bold", 14)
+        c.drawString(50, y_position, "3. Perfil de Comprador")
+        c.setFont("Helvetica", 11)
+        c.drawString(50, y_position - 20, thesis.get('buyer_profile', 'N/A'))
+
+        # Footer
+        c.setFont("Helvetica-Oblique", 10)
+        c.drawString(50, 50, "Gerado automaticamente por Bahia Satellite AI Engine.")
+        c.drawString(50, 35, f"Data: {datetime.now().strftime('%d/%m/%Y')}")
+
+        c.save()
+        logger.info(f"PDF gerado com sucesso: {filename}")
+        return filename
+
+    except Exception as e:
+        logger.error(f"Erro ao gerar PDF: {e}")
+        return ""
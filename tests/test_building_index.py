@@ -0,0 +1,43 @@
+from services.building_index import BuildingIndex, building_slug
+from services.storage import Storage
+
+
+def listing(i, title):
+    return {'link': f"https://x/{i}", 'title': title, 'fingerprint': str(i)}
+
+
+def test_slug_resolves_keys_with_accents_and_punctuation():
+    index = BuildingIndex()
+    index.upsert_many([listing(i, "Apartamento Edf. Sta. Mônica d'Ávila - Graça") for i in range(3)])
+    key = next(iter(index.groups()))
+    slug = building_slug(key)
+
+    assert index.key_for_slug(slug) == key
+    assert len(index.properties_of(index.key_for_slug(slug))) == 3
+
+    index.remove_many([f"https://x/{i}" for i in range(3)])
+    assert index.key_for_slug(slug) is None
+
+
+def test_legacy_building_row_is_migrated_to_the_new_slug():
+    storage = Storage("sqlite://")
+    # Formato anterior: slug derivado do nome de exibição
+    storage.upsert_buildings([{'name': "Edf. Mar Azul", 'slug': "edf-mar-azul", 'description': "Texto"}])
+
+    result = storage.upsert_buildings([{'name': "Edf. Mar Azul", 'slug': "mar-azul", 'neighborhood': "Pituba"}])
+
+    assert result == {"inserted": 0, "updated": 1}
+    assert storage.get_building("edf-mar-azul") is None
+    building = storage.get_building("mar-azul")
+    assert building['description'] == "Texto" and building['neighborhood'] == "Pituba"
+    assert len(storage.load_buildings()) == 1
+
+
+def test_building_below_minimum_has_no_live_slug():
+    index = BuildingIndex()
+    index.upsert_many([listing(i, "Apartamento Edf. Mar Azul - Pituba") for i in range(3)])
+    assert index.live_key_for_slug("mar-azul") == "mar azul"
+
+    index.remove_many(["https://x/0"])
+    assert index.key_for_slug("mar-azul") == "mar azul"
+    assert index.live_key_for_slug("mar-azul") is None
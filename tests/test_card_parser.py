@@ -0,0 +1,39 @@
+import os
+
+import pytest
+
+from services.card_parser import SoupCardParser, get_card_parser
+
+pytest.importorskip("lxml")
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "lopes_results_page.html")
+
+
+def parse(parser, content):
+    cards, fallback = parser.find_cards(content)
+    return [parser.extract(card) for card in cards], fallback
+
+
+def test_lxml_output_matches_beautifulsoup_reference():
+    with open(FIXTURE, 'rb') as f:
+        content = f.read()
+    # Página salva em ISO-8859-1, com <script>, <style>, <template>, comentários e data-src
+    with pytest.raises(UnicodeDecodeError):
+        content.decode('utf-8')
+
+    reference = parse(SoupCardParser(), content)
+    assert parse(get_card_parser('lxml'), content) == reference
+
+    items, fallback = reference
+    assert not fallback and len(items) == 3
+    assert items[0]['title'] == "Apartamento 3 quartos Edf. Maré Alta - Pituba"
+    assert items[0]['priceText'] == "R$ 1.250.000"
+    assert items[1]['photos'] == ["https://img.lopes.com.br/REO1002/1.jpg"]
+    assert items[1]['location'] == "Avenida Euclides da Cunha, Graça, Salvador"
+    assert items[2]['priceText'] == "0"
+
+
+def test_fallback_selector_matches():
+    content = ('<html><body><article><h2>Casa no Horto</h2><p>R$ 900.000</p>'
+               '<!-- x --><ul><li>3 quartos</li></ul></article></body></html>').encode('utf-8')
+    assert parse(get_card_parser('lxml'), content) == parse(SoupCardParser(), content)
@@ -0,0 +1,23 @@
+import pytest
+
+pytest.importorskip("playwright")
+
+from services.collector import MassCollector
+from services.storage import Storage
+
+
+def card(link, price):
+    return {'title': "Apartamento", 'priceText': f"R$ {price}", 'link': link, 'details': [], 'location': ''}
+
+
+def test_run_is_written_through_storage():
+    storage = Storage("sqlite://")
+    collector = MassCollector(storage=storage)
+    price_points = []
+    items = [collector._process_item(card("https://x/1", "500.000"), price_points),
+             collector._process_item(card("https://x/2", "700.000"), price_points)]
+
+    collector._persist_run(items, price_points)
+
+    assert {p['link'] for p in storage.load_properties()} == {"https://x/1", "https://x/2"}
+    assert MassCollector(storage=storage)._process_item(card("https://x/1", "450.000"))['status'] == 'PRICE_CHANGED'
@@ -0,0 +1,40 @@
+from services.dossier_cache import DossierCache
+
+
+def render(cache, listing, size):
+    thesis = {'listing': listing}
+    dossier = cache.dossier_id(listing, thesis)
+    path = cache.tmp_path(dossier)
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    cache.commit(listing, thesis, dossier, path)
+    return dossier
+
+
+def test_least_recently_used_dossier_is_evicted(tmp_path):
+    cache = DossierCache(str(tmp_path), max_bytes=250, pin_seconds=0)
+    first = render(cache, 'a', 100)
+    second = render(cache, 'b', 100)
+    cache.open(first)  # "a" passa a ser o mais recente
+    render(cache, 'c', 100)
+
+    assert cache.open(second) is None
+    assert cache.open(first) is not None
+    assert cache.lookup('b') is None
+
+
+def test_looked_up_dossier_survives_eviction_until_downloaded(tmp_path):
+    cache = DossierCache(str(tmp_path), max_bytes=150, pin_seconds=60)
+    dossier = render(cache, 'a', 100)
+    assert cache.lookup('a')[0] == dossier
+
+    # Outro imóvel estoura o limite antes do download de "a"
+    render(cache, 'b', 100)
+
+    assert cache.open(dossier) is not None
+
+
+def test_tmp_paths_are_unique_per_render(tmp_path):
+    cache = DossierCache(str(tmp_path))
+    dossier = cache.dossier_id('a', {})
+    assert cache.tmp_path(dossier) != cache.tmp_path(dossier)
@@ -0,0 +1,59 @@
+import json
+
+from services.enrichment_cache import EnrichmentCache
+from services.listing import content_fingerprint, listing_id
+
+
+def scraped(link="https://x/1", price=500000.0, **extra):
+    return dict({'link': link, 'title': "Apartamento Pituba", 'price': price,
+                 'location': {'neighborhood': "Pituba"}, 'collected_at': "2024-06-01T10:00:00"}, **extra)
+
+
+def enriched(prop, refined=False):
+    prop.update(seo_slug="apartamento-pituba", meta_description="meta", schema_json={'@type': "Offer"},
+                ai_title="Título IA", refined=refined)
+    return prop
+
+
+def test_unchanged_listing_reuses_enrichment():
+    cache = EnrichmentCache()
+    assert cache.apply(scraped()) is None
+    cache.store(enriched(scraped(), refined=True))
+
+    # Nova coleta do mesmo conteúdo (outro collected_at, status diferente)
+    again = scraped(collected_at="2024-06-02T10:00:00", status='UNCHANGED')
+    assert cache.apply(again) is not None
+    assert again['seo_slug'] == "apartamento-pituba" and again['ai_title'] == "Título IA"
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 1
+
+
+def test_content_change_misses_and_failed_refinement_is_not_cached():
+    cache = EnrichmentCache()
+    cache.store(enriched(scraped(), refined=False))
+
+    assert cache.apply(scraped(price=450000.0)) is None
+    hit = scraped()
+    cache.apply(hit)
+    assert 'ai_title' not in hit and hit['meta_description'] == "meta"
+
+
+def test_lru_bound_and_serialized_schema():
+    cache = EnrichmentCache(max_entries=2)
+    for i in range(3):
+        cache.store(enriched(scraped(link=f"https://x/{i}")))
+
+    assert len(cache.entries) == 2
+    assert cache.apply(scraped(link="https://x/0")) is None
+    assert json.loads(cache.schema_bytes(listing_id("https://x/2"))) == {'@type': "Offer"}
+    assert cache.schema_bytes("desconhecido") is None
+
+
+def test_seed_skips_stale_fingerprints():
+    fresh = enriched(scraped(link="https://x/1"))
+    fresh['fingerprint'] = content_fingerprint(fresh)
+    stale = enriched(scraped(link="https://x/2"))
+    stale['fingerprint'] = "fingerprint-de-outra-versao"
+
+    cache = EnrichmentCache()
+    assert cache.seed([fresh, stale, scraped(link="https://x/3")]) == 1
+    assert cache.apply(scraped(link="https://x/1")) is not None
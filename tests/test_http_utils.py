@@ -0,0 +1,70 @@
+import pytest
+
+from services.http_utils import etag_matches, file_response, parse_byte_range
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    ("bytes=900-5000", (900, 999)),
+    ("bytes=0-0,10-20", None),
+    ("bytes=abc-10", None),
+    ("bytes=-", None),
+    ("bytes=50-10", None),
+    ("items=0-10", None),
+])
+def test_parse_byte_range(header, expected):
+    assert parse_byte_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=-0"])
+def test_unsatisfiable_range_raises(header):
+    with pytest.raises(ValueError):
+        parse_byte_range(header, 1000)
+
+
+def test_etag_matches_weak_and_wildcard():
+    assert etag_matches('W/"abc"', '"abc"')
+    assert etag_matches('"x", "abc"', '"abc"')
+    assert etag_matches('*', '"abc"')
+    assert not etag_matches('"other"', '"abc"')
+    assert not etag_matches(None, '"abc"')
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    path = tmp_path / "file.pdf"
+    path.write_bytes(bytes(range(256)) * 4)
+    return str(path), 1024
+
+
+def test_file_response_statuses(pdf):
+    path, size = pdf
+    etag = '"abc"'
+
+    assert file_response(path, size, etag, "application/pdf", {}, if_none_match=etag).status_code == 304
+
+    partial = file_response(path, size, etag, "application/pdf", {}, range_header="bytes=0-99")
+    assert partial.status_code == 206
+    assert partial.headers["Content-Range"] == "bytes 0-99/1024"
+    assert partial.headers["Content-Length"] == "100"
+
+    unsatisfiable = file_response(path, size, etag, "application/pdf", {}, range_header="bytes=2000-")
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers["Content-Range"] == "bytes */1024"
+
+    full = file_response(path, size, etag, "application/pdf", {"Cache-Control": "no-cache"})
+    assert full.status_code == 200
+    assert full.headers["Content-Length"] == "1024"
+    assert full.headers["Cache-Control"] == "no-cache"
+    assert full.headers["ETag"] == etag
+
+
+def test_if_range_with_stale_etag_returns_whole_file(pdf):
+    path, size = pdf
+    response = file_response(path, size, '"abc"', "application/pdf", {},
+                             range_header="bytes=0-99", if_range='"old"')
+    assert response.status_code == 200
+    assert response.headers["Content-Length"] == "1024"
@@ -0,0 +1,89 @@
+import random
+
+import pytest
+
+from services.inventory_index import PRICE_PROFILES, InventoryIndex, decode_cursor, encode_cursor
+from services.text import fold_accents
+
+NEIGHBORHOODS = ["Pituba", "Barra", "Graça", "Caminho das Árvores"]
+
+
+def make_inventory(n=400):
+    rng = random.Random(3)
+    return [{
+        'link': f"https://x/{i}",
+        'price': float(rng.choice([250, 400, 400, 950, 3000]) * 1000 + rng.randint(0, 50) * 1000),
+        'bedrooms': rng.choice([1, 2, 3, 4, 6, None]),
+        'location': {'neighborhood': rng.choice(NEIGHBORHOODS)},
+    } for i in range(n)]
+
+
+def reference(inventory, min_price=None, max_price=None, neighborhoods=(), profile=None, bedrooms=None,
+              sort='relevance'):
+    """
+    Filtro por varredura linear (comportamento esperado do índice).
+    """
+    low, high = PRICE_PROFILES.get(profile, (None, None))
+    keys = {fold_accents(n).casefold() for n in neighborhoods}
+    matches = [
+        p for p in inventory
+        if (min_price is None or p['price'] >= min_price) and (max_price is None or p['price'] <= max_price)
+        and (low is None or low <= p['price'] <= high)
+        and (not keys or fold_accents(p['location']['neighborhood']).casefold() in keys)
+        and (bedrooms is None or (p['bedrooms'] is not None and min(p['bedrooms'], 5) == min(bedrooms, 5)))
+    ]
+    if sort == 'price_asc':
+        matches.sort(key=lambda p: p['price'])
+    elif sort == 'price_desc':
+        matches.sort(key=lambda p: p['price'], reverse=True)
+    return matches
+
+
+QUERIES = [
+    {},
+    {'min_price': 390_000, 'max_price': 1_000_000},
+    {'profile': 'standard'},
+    {'profile': 'luxury', 'min_price': 960_000},
+    {'neighborhoods': ['graca']},
+    {'neighborhoods': ['Pituba', 'caminho das arvores'], 'bedrooms': 3},
+    {'bedrooms': 5},
+    {'neighborhoods': ['Inexistente']},
+]
+
+
+@pytest.mark.parametrize("params", QUERIES)
+@pytest.mark.parametrize("sort", ['relevance', 'price_asc', 'price_desc'])
+def test_query_matches_linear_scan(params, sort):
+    inventory = make_inventory()
+    index = InventoryIndex(inventory)
+    expected = reference(inventory, sort=sort, **params)
+
+    page, total = index.query(sort=sort, limit=len(inventory), **params)
+
+    assert total == len(expected)
+    if sort == 'relevance':
+        assert page == expected
+    else:
+        # Empates de preço podem sair em qualquer ordem
+        assert [p['price'] for p in page] == [p['price'] for p in expected]
+        assert sorted(p['link'] for p in page) == sorted(p['link'] for p in expected)
+
+
+def test_pages_concatenate_to_the_full_result():
+    inventory = make_inventory()
+    index = InventoryIndex(inventory)
+    full, total = index.query(profile='standard', sort='price_desc', limit=len(inventory))
+
+    pages, offset = [], 0
+    while offset < total:
+        page, _ = index.query(profile='standard', sort='price_desc', limit=7, offset=offset)
+        pages.extend(page)
+        offset = decode_cursor(encode_cursor(offset + len(page)))
+    assert pages == full
+
+
+def test_invalid_cursor_raises():
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(-1))
+    with pytest.raises(ValueError):
+        decode_cursor("nao-e-numero")
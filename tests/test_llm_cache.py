@@ -0,0 +1,89 @@
+import json
+
+import pytest
+
+from services.llm_cache import CachedModel, LLMCache
+
+
+class StubResponse:
+    def __init__(self, text):
+        self._text = text
+
+    @property
+    def text(self):
+        if isinstance(self._text, Exception):
+            raise self._text
+        return self._text
+
+
+class StubModel:
+    model_name = "stub"
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def generate_content(self, prompt, **kwargs):
+        self.calls.append((prompt, kwargs))
+        return StubResponse(self.responses.pop(0))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMCache(path=str(tmp_path / "llm.sqlite3"))
+
+
+def is_json(text):
+    return isinstance(json.loads(text), list)
+
+
+def test_repeated_prompt_is_served_from_cache(cache):
+    model = StubModel('["ok"]')
+    cached = CachedModel(model, cache)
+    assert cached.generate_content("p").text == '["ok"]'
+    assert cached.generate_content("p").text == '["ok"]'
+    assert len(model.calls) == 1
+
+
+def test_kwargs_are_part_of_the_key(cache):
+    model = StubModel("frio", "quente")
+    cached = CachedModel(model, cache)
+    assert cached.generate_content("p", generation_config={'temperature': 0}).text == "frio"
+    assert cached.generate_content("p", generation_config={'temperature': 1}).text == "quente"
+    assert cached.generate_content("p", generation_config={'temperature': 0}).text == "frio"
+    assert len(model.calls) == 2
+
+
+def test_invalid_response_is_not_cached(cache):
+    model = StubModel("lixo", '["ok"]')
+    cached = CachedModel(model, cache)
+    assert cached.generate_content("p", validate=is_json).text == "lixo"
+    assert cached.generate_content("p", validate=is_json).text == '["ok"]'
+    assert len(model.calls) == 2
+
+
+def test_blocked_or_empty_response_is_not_cached(cache):
+    model = StubModel(ValueError("bloqueado"), "  ", "texto")
+    cached = CachedModel(model, cache)
+    with pytest.raises(ValueError):
+        cached.generate_content("p").text
+    assert cached.generate_content("p").text == "  "
+    assert cached.generate_content("p").text == "texto"
+    assert len(model.calls) == 3
+
+
+def test_poisoned_entry_is_replaced(cache):
+    cache.set("stub", "p", "lixo")
+    model = StubModel('["ok"]')
+    cached = CachedModel(model, cache)
+    assert cached.generate_content("p", validate=is_json).text == '["ok"]'
+    assert cache.get("stub", "p") == '["ok"]'
+
+
+def test_invalidate_drops_the_entry(cache):
+    model = StubModel("a", "b")
+    cached = CachedModel(model, cache)
+    cached.generate_content("p")
+    assert cached.invalidate("p")
+    assert cached.generate_content("p").text == "b"
+    assert not cached.invalidate("outro")
@@ -0,0 +1,157 @@
+import asyncio
+import threading
+
+import pytest
+
+from services.crawl_frontier import CrawlFrontier
+from services.lopes_scraper import LopesScraper
+from services.price_history import PriceHistoryStore
+from services.scheduler import PropertyScheduler
+
+
+class RecordingStorage:
+    def __init__(self):
+        self.batches = []
+        self.threads = set()
+
+    def load_price_history(self):
+        return PriceHistoryStore()
+
+    def append_price_points(self, points):
+        self.threads.add(threading.get_ident())
+        self.batches.append(list(points))
+
+
+def results_page(*cards, pagination=True):
+    html = "".join(f'<a class="lead-button" href="{link}"><h2>Apartamento</h2><p>R$ {price}</p></a>'
+                   for link, price in cards)
+    if pagination:
+        html += '<nav><a href="/busca/venda/br/ba?pagina=1">1</a></nav>'
+    return f"<html><body>{html}</body></html>".encode('utf-8')
+
+
+CAPTCHA_PAGE = b"<html><body><h1>Verifique que voc\xc3\xaa \xc3\xa9 humano</h1></body></html>"
+
+
+def make_scraper(pages, storage=None):
+    """
+    Scraper sem rede: `pages` mapeia número da página -> HTML ou None (erro de rede).
+    """
+    scraper = LopesScraper(concurrency=2, storage=storage, parser='html.parser')
+
+    async def fetch(page, semaphore, stats):
+        await asyncio.sleep(0)
+        if pages.get(page) is None:
+            return None
+        return {'url': f"p{page}", 'unchanged': False, 'content': pages[page], 'validators': {}}
+
+    scraper._fetch_page = fetch
+    return scraper
+
+
+def test_concurrent_runs_keep_their_own_stats_and_price_points():
+    storage = RecordingStorage()
+    scraper = make_scraper({1: results_page(("https://x/a", 100)), 2: results_page(("https://x/b", 200))}, storage)
+
+    async def collect(pages):
+        stats = {}
+        return [item async for item in scraper.iter_inventory(max_pages=pages, stats=stats)], stats
+
+    async def main():
+        return await asyncio.gather(collect(1), collect(2))
+
+    (one, one_stats), (two, two_stats) = asyncio.run(main())
+    assert len(one) == 1 and one_stats['pages_parsed'] == 1
+    assert len(two) == 2 and two_stats['pages_parsed'] == 2
+    # Cada coleta grava só os seus pontos, fora do event loop
+    assert sorted(len(batch) for batch in storage.batches) == [1, 1]
+    assert threading.get_ident() not in storage.threads
+
+
+def test_price_points_are_flushed_when_the_consumer_stops_early():
+    storage = RecordingStorage()
+    scraper = make_scraper({1: results_page(("https://x/a", 100), ("https://x/b", 200))}, storage)
+
+    async def first_item():
+        gen = scraper.iter_inventory(max_pages=1)
+        item = await gen.__anext__()
+        await gen.aclose()
+        return item
+
+    asyncio.run(first_item())
+    assert [point['link'] for point in storage.batches[0]] == ["https://x/a", "https://x/b"]
+
+
+def sweep(scraper, frontier):
+    async def run():
+        stats = {}
+        items = [item async for item in scraper.iter_incremental(frontier, max_pages=10, full_sweep=True,
+                                                                   stats=stats)]
+        return items, stats
+    return asyncio.run(run())
+
+
+def test_clean_empty_page_ends_a_full_sweep(tmp_path):
+    frontier = CrawlFrontier(path=str(tmp_path / "frontier.json"))
+    scraper = make_scraper({1: results_page(("https://x/a", 100)), 2: results_page()})
+    items, stats = sweep(scraper, frontier)
+    assert [item['link'] for item in items] == ["https://x/a"]
+    assert stats['full_sweep'] is True
+    assert frontier.last_full_sweep is not None
+
+
+@pytest.mark.parametrize("page_two", [CAPTCHA_PAGE, results_page(pagination=False)])
+def test_empty_page_without_end_markers_is_not_the_end(tmp_path, page_two):
+    frontier = CrawlFrontier(path=str(tmp_path / "frontier.json"))
+    scraper = make_scraper({1: results_page(("https://x/a", 100)), 2: page_two})
+    items, stats = sweep(scraper, frontier)
+    assert len(items) == 1
+    assert stats['full_sweep'] is False
+    assert frontier.last_full_sweep is None
+
+
+def test_empty_first_page_is_not_the_end(tmp_path):
+    frontier = CrawlFrontier(path=str(tmp_path / "frontier.json"))
+    _, stats = sweep(make_scraper({1: results_page()}), frontier)
+    assert stats['full_sweep'] is False
+
+
+def test_blocked_sweep_does_not_delist_the_catalogue(tmp_path):
+    scheduler = PropertyScheduler(delisted_after_runs=1, full_sweep_hours=0,
+                                  delisting_path=str(tmp_path / "delisting.json"))
+    scheduler.frontier = CrawlFrontier(path=str(tmp_path / "frontier.json"))
+    catalogue = [(f"https://x/{i}", 100 + i) for i in range(5)]
+
+    scheduler.collector = make_scraper({1: results_page(*catalogue[:3]), 2: results_page(*catalogue[3:]),
+                                        3: results_page()})
+    asyncio.run(scheduler._run_scraping())
+    assert len(scheduler.get_properties()) == 5
+
+    # Página 2 virou captcha: a varredura é incompleta e nada sai do ar
+    scheduler.collector = make_scraper({1: results_page(*catalogue[:3]), 2: CAPTCHA_PAGE})
+    asyncio.run(scheduler._run_scraping())
+    assert scheduler.last_changes['delisted'] == []
+    assert not any(p.get('status') == 'DELISTED' for p in scheduler.get_properties())
+
+    # Varredura completa e limpa sem os imóveis da página 2: esses sim saem do ar
+    scheduler.collector = make_scraper({1: results_page(*catalogue[:3]), 2: results_page()})
+    asyncio.run(scheduler._run_scraping())
+    assert sorted(scheduler.last_changes['delisted']) == ["https://x/3", "https://x/4"]
+
+
+def test_concurrent_fetches_yield_items_in_page_order():
+    scraper = make_scraper({})
+    pages = {page: results_page((f"https://x/{page}", 100 * page)) for page in range(1, 6)}
+
+    async def fetch(page, semaphore, stats):
+        async with semaphore:
+            # Páginas iniciais demoram mais: terminam fora de ordem
+            await asyncio.sleep(0.01 * (6 - page))
+        return {'url': f"p{page}", 'unchanged': False, 'content': pages[page], 'validators': {}}
+
+    scraper._fetch_page = fetch
+
+    async def collect():
+        return [item['link'] async for item in scraper.iter_inventory(max_pages=5)]
+
+    assert asyncio.run(collect()) == [f"https://x/{page}" for page in range(1, 6)]
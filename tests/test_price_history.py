@@ -0,0 +1,75 @@
+from datetime import datetime
+
+import pytest
+
+from services.listing import listing_id
+from services.price_history import PriceHistoryStore, lttb_indices, minmax_indices, uniform_indices
+
+DOWNSAMPLERS = {'lttb': lttb_indices, 'minmax': minmax_indices, 'uniform': uniform_indices}
+DAY = 86_400
+START = int(datetime(2024, 1, 1).timestamp())
+
+
+def test_only_price_changes_become_points():
+    store = PriceHistoryStore()
+    assert store.record("https://x/1", 100.0, START) is True
+    assert store.record("https://x/1", 100.0, START + DAY) is False
+    assert store.record("https://x/1", 90.0, START + 2 * DAY) is True
+
+    assert store.point_count == 2
+    assert store.last_price("https://x/1") == 90.0
+    assert store.last_price("https://x/desconhecido") is None
+    assert [point['price'] for point in store.get_history("https://x/1")] == [100.0, 90.0]
+    assert store.get_history("https://x/1")[1]['date'] == datetime.fromtimestamp(START + 2 * DAY).isoformat()
+
+
+def test_columns_are_typed_and_sliced_by_period():
+    store = PriceHistoryStore.from_points(
+        ("https://x/1", 100.0 + day, START + day * DAY) for day in range(10)
+    )
+    times, prices = store.columns("https://x/1", start=START + 3 * DAY, end=START + 5 * DAY)
+
+    assert times.typecode == 'q' and prices.typecode == 'd'
+    assert list(prices) == [103.0, 104.0, 105.0]
+    assert store.columns("https://x/desconhecido") == (type(times)('q'), type(prices)('d'))
+
+
+def test_links_are_interned_and_resolvable_by_public_id():
+    store = PriceHistoryStore.from_points([("https://x/1", 1.0, "2024-06-01T10:00:00"),
+                                           ("https://x/2", 2.0, "2024-06-01T10:00:00")])
+    assert len(store) == 2 and "https://x/2" in store
+    assert store.link_for(listing_id("https://x/2")) == "https://x/2"
+    assert store.link_for("nao-existe") is None
+
+
+def series(n, spike_at=None):
+    times = [START + i * DAY for i in range(n)]
+    values = [100.0 + (i % 5) for i in range(n)]
+    if spike_at is not None:
+        values[spike_at] = 1000.0
+    return times, values
+
+
+@pytest.mark.parametrize("method", DOWNSAMPLERS)
+def test_downsampling_keeps_endpoints_order_and_bound(method):
+    times, values = series(1000)
+    indices = DOWNSAMPLERS[method](times, values, 50)
+
+    assert indices[0] == 0 and indices[-1] == 999
+    assert indices == sorted(set(indices))
+    assert len(indices) <= 50
+
+
+@pytest.mark.parametrize("method", ['lttb', 'minmax'])
+def test_downsampling_preserves_a_spike(method):
+    times, values = series(1000, spike_at=437)
+    assert 437 in DOWNSAMPLERS[method](times, values, 20)
+
+
+def test_get_history_downsamples_only_above_max_points():
+    store = PriceHistoryStore.from_points(("https://x/1", 100.0 + day, START + day * DAY) for day in range(300))
+
+    assert len(store.get_history("https://x/1", max_points=500)) == 300
+    reduced = store.get_history("https://x/1", max_points=30, method='lttb')
+    assert len(reduced) == 30
+    assert reduced[0]['price'] == 100.0 and reduced[-1]['price'] == 399.0
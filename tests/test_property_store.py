@@ -0,0 +1,40 @@
+from services.property_store import PropertyStore
+
+
+def prop(link, neighborhood="Pituba", status='NEW', **extra):
+    return dict({'link': link, 'title': "Apartamento", 'location': {'neighborhood': neighborhood},
+                 'status': status}, **extra)
+
+
+def test_upsert_counts_and_keeps_created_at():
+    store = PropertyStore()
+    assert store.upsert_many([prop("https://x/1"), prop("https://x/2"), {'title': "sem link"}],
+                             timestamp="2024-06-01T10:00:00") == {"inserted": 2, "updated": 0}
+
+    result = store.upsert_many([prop("https://x/1", price=90.0)], timestamp="2024-06-02T10:00:00")
+
+    assert result == {"inserted": 0, "updated": 1}
+    assert len(store) == 2
+    updated = store.get("https://x/1")
+    assert updated['price'] == 90.0
+    assert updated['created_at'] == "2024-06-01T10:00:00" and updated['updated_at'] == "2024-06-02T10:00:00"
+
+
+def test_secondary_indexes_follow_updates_and_removals():
+    store = PropertyStore()
+    store.upsert_many([prop("https://x/1"), prop("https://x/2", neighborhood="Barra"),
+                       prop("https://x/3", status='PRICE_CHANGED')])
+
+    assert {p['link'] for p in store.find(neighborhood="Pituba")} == {"https://x/1", "https://x/3"}
+    assert [p['link'] for p in store.find(neighborhood="Pituba", status='NEW')] == ["https://x/1"]
+
+    # Mudança de bairro/status reindexa; índice vazio é descartado
+    store.upsert_many([{'link': "https://x/2", 'location': {'neighborhood': "Pituba"}, 'status': 'DELISTED'}])
+    assert "Barra" not in store.by_neighborhood
+    assert [p['link'] for p in store.find(status='DELISTED')] == ["https://x/2"]
+
+    assert store.remove("https://x/1")['link'] == "https://x/1"
+    assert store.remove("https://x/1") is None
+    assert {p['link'] for p in store.find(neighborhood="Pituba")} == {"https://x/2", "https://x/3"}
+    assert store.find(neighborhood="Ondina") == []
+    assert len(store.find()) == 2
@@ -0,0 +1,53 @@
+import asyncio
+import time
+
+import pytest
+
+from services.rate_limiter import HostRateLimiter, TokenBucket
+
+
+def elapsed(coro_factory):
+    async def run():
+        start = time.perf_counter()
+        await coro_factory()
+        return time.perf_counter() - start
+    return asyncio.run(run())
+
+
+def test_burst_is_immediate_then_requests_follow_the_rate():
+    bucket = TokenBucket(rate=50, burst=3)
+
+    async def acquire(n):
+        for _ in range(n):
+            await bucket.acquire()
+
+    assert elapsed(lambda: acquire(3)) < 0.05
+    # Balde vazio: 5 tokens a 50/s levam ~100 ms
+    assert 0.08 <= elapsed(lambda: acquire(5)) < 1.0
+
+
+def test_concurrent_waiters_do_not_overdraw_the_bucket():
+    bucket = TokenBucket(rate=50, burst=1)
+
+    async def run():
+        await asyncio.gather(*(bucket.acquire() for _ in range(6)))
+
+    assert elapsed(run) >= 0.09
+    assert bucket.tokens < 1
+
+
+def test_buckets_are_per_host():
+    limiter = HostRateLimiter(rate=1, burst=1)
+
+    async def run():
+        await limiter.acquire("https://www.lopes.com.br/busca?pagina=1")
+        # Outro host não espera pelo balde esgotado do primeiro
+        await limiter.acquire("https://img.lopes.com.br/foto.jpg")
+
+    assert elapsed(run) < 0.5
+    assert limiter.bucket_for("https://www.lopes.com.br/x") is limiter.bucket_for("https://www.lopes.com.br/y")
+
+
+def test_rate_must_be_positive():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+pytest.importorskip("google.generativeai")
+
+from services.listing import listing_id  # noqa: E402
+from services.llm_cache import CachedModel, LLMCache  # noqa: E402
+from services.refiner import ChameleonRefiner  # noqa: E402
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModel:
+    model_name = "stub"
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.prompts = []
+
+    def generate_content(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return StubResponse(self.responses.pop(0))
+
+
+def make_refiner(tmp_path, *responses):
+    refiner = ChameleonRefiner.__new__(ChameleonRefiner)
+    model = StubModel(*responses)
+    refiner.model = CachedModel(model, LLMCache(path=str(tmp_path / "llm.sqlite3")))
+    return refiner, model
+
+
+def listing(i):
+    return {'link': f"https://www.lopes.com.br/imovel/{i}", 'title': f"Apartamento {i}", 'price': 500000}
+
+
+def item(prop, title):
+    return {'id': listing_id(prop['link']), 'ai_title': title, 'ai_description': "desc"}
+
+
+def test_retry_after_unparseable_batch_reaches_the_model(tmp_path):
+    props = [listing(1), listing(2)]
+    good = json.dumps([item(props[0], "A"), item(props[1], "B")])
+    refiner, model = make_refiner(tmp_path, "não é json", good)
+    refiner.refine_batch(props, max_retries=1)
+    assert len(model.prompts) == 2
+    assert [p['ai_title'] for p in props] == ["A", "B"]
+
+    # A resposta inválida não ficou em cache: um novo lote igual é servido da resposta válida
+    again = [listing(1), listing(2)]
+    refiner.refine_batch(again)
+    assert len(model.prompts) == 2
+    assert all(p['refined'] for p in again)
+
+
+def test_items_are_matched_by_listing_id(tmp_path):
+    props = [listing(1), listing(2), listing(3)]
+    # Primeiro item omitido e os demais fora de ordem: nada pode ser desalinhado
+    first = json.dumps([item(props[2], "C"), item(props[1], "B")])
+    retry = json.dumps([item(props[0], "A")])
+    refiner, model = make_refiner(tmp_path, first, retry)
+    refiner.refine_batch(props, max_retries=1)
+    assert [p['ai_title'] for p in props] == ["A", "B", "C"]
+    assert listing_id(props[0]['link']) in model.prompts[1]
+    assert listing_id(props[1]['link']) not in model.prompts[1]
+
+
+def test_useless_response_is_evicted_before_retry(tmp_path):
+    props = [listing(1)]
+    refiner, model = make_refiner(tmp_path, json.dumps([{'id': "1", 'ai_title': "X", 'ai_description': ""}]),
+                                  json.dumps([item(props[0], "A")]))
+    refiner.refine_batch(props, max_retries=1)
+    assert len(model.prompts) == 2
+    assert props[0]['refined'] and props[0]['ai_title'] == "A"
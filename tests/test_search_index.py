@@ -0,0 +1,41 @@
+from services.search_index import SearchIndex, prefix_token
+
+
+def test_complete_always_includes_the_exact_token():
+    index = SearchIndex()
+    # "mar" é raro; "marina", "mares"... são mais frequentes e lotariam o top N
+    inventory = [{'link': f"https://x/{i}", 'title': f"Apartamento mar{chr(97 + i % 20)}{i % 3}"} for i in range(200)]
+    inventory.append({'link': "https://x/mar", 'title': "Vista mar"})
+    index.upsert_many(inventory)
+
+    suggestions = index.complete("mar", limit=5)
+    assert len(suggestions) == 5
+    assert "mar" in suggestions
+    assert index.complete("ma", limit=3) != [] and "ma" not in index.complete("ma", limit=3)
+
+
+def test_remove_many_drops_delisted_listings_from_results():
+    index = SearchIndex()
+    index.upsert_many([{'link': "https://x/1", 'title': "Cobertura Pituba"},
+                       {'link': "https://x/2", 'title': "Cobertura Barra"}])
+    assert index.remove_many(["https://x/1", "https://x/desconhecido"]) == 1
+    hits, total = index.search("cobertura ")
+    assert total == 1 and hits[0][0]['link'] == "https://x/2"
+
+
+def test_prefix_applies_only_to_a_trailing_token_that_survives_normalization():
+    index = SearchIndex()
+    index.upsert_many([{'link': "https://x/1", 'title': "Casa em Itapuã"},
+                       {'link': "https://x/2", 'title': "Casarão na Barra"}])
+
+    assert index.search("casa")[1] == 2
+    # Stopword no fim: "casa" já foi digitado por inteiro
+    assert [hit['link'] for hit, _ in index.search("casa em")[0]] == ["https://x/1"]
+    assert index.search("casa,")[1] == 1
+
+
+def test_prefix_token():
+    assert prefix_token("vista mar hor") == "hor"
+    assert prefix_token("apartamento em") == ""
+    assert prefix_token("Graça ") == ""
+    assert prefix_token("Graç") == "grac"
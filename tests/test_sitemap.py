@@ -0,0 +1,83 @@
+import gzip
+import re
+from datetime import date, datetime
+
+from services.seo.sitemap import INDEX_NAME, SitemapBuilder
+
+
+class FakeStorage:
+    def __init__(self, properties, buildings=()):
+        self.properties = properties
+        self.buildings = list(buildings)
+
+    def iter_building_slugs(self):
+        return iter(self.buildings)
+
+    def iter_sitemap_properties(self):
+        return iter(self.properties)
+
+
+def inventory(n, updated_at=datetime(2024, 5, 1)):
+    return [(f"imovel-{i}", f"fp{i}", updated_at) for i in range(n)]
+
+
+def urls(builder, name):
+    content, _ = builder.read(name)
+    return re.findall(r"<url><loc>([^<]+)</loc>(?:<lastmod>([^<]+)</lastmod>)?", gzip.decompress(content).decode())
+
+
+def shard_names(builder):
+    return sorted(builder.manifest['shards'])
+
+
+def test_shards_respect_the_url_limit_and_are_listed_in_the_index(tmp_path):
+    builder = SitemapBuilder(output_dir=str(tmp_path), base_url="https://exemplo.com", max_urls=10, target_urls=8)
+    stats = builder.build(FakeStorage(inventory(50), buildings=[("mar-azul", datetime(2024, 4, 1))]))
+
+    assert stats['urls'] == 52  # 50 imóveis + 1 edifício + home
+    properties = [name for name in shard_names(builder) if "properties" in name]
+    assert len(properties) > 1
+    locs = [loc for name in properties for loc, _ in urls(builder, name)]
+    assert all(len(urls(builder, name)) <= 10 for name in properties)
+    assert sorted(locs) == sorted(f"https://exemplo.com/imoveis/imovel-{i}" for i in range(50))
+
+    index, etag = builder.read(INDEX_NAME)
+    assert all(f"https://exemplo.com/sitemaps/{name}".encode() in index for name in shard_names(builder))
+    assert etag == builder.manifest['index_etag']
+    assert builder.read("sitemap-properties-99.xml.gz") is None
+    assert builder.read("../manifest.json") is None
+
+
+def test_lastmod_only_moves_when_the_fingerprint_changes(tmp_path):
+    builder = SitemapBuilder(output_dir=str(tmp_path), base_url="https://exemplo.com", max_urls=10, target_urls=8)
+    builder.build(FakeStorage(inventory(30)))
+    first_etag = builder.manifest['index_etag']
+
+    # Nova coleta: updated_at muda para todos, o conteúdo não
+    stats = builder.build(FakeStorage(inventory(30, updated_at=datetime(2024, 6, 1))))
+    assert stats['written'] == 0
+    assert builder.manifest['index_etag'] == first_etag
+
+    changed = inventory(30, updated_at=datetime(2024, 6, 1))
+    changed[7] = ("imovel-7", "fp-novo", datetime(2024, 6, 1))
+    stats = builder.build(FakeStorage(changed))
+    assert stats['written'] == 1
+
+    lastmods = {loc: lastmod for name in shard_names(builder) if "properties" in name
+                for loc, lastmod in urls(builder, name)}
+    assert lastmods["https://exemplo.com/imoveis/imovel-7"] == date.today().isoformat()
+    assert lastmods["https://exemplo.com/imoveis/imovel-8"] == "2024-05-01"
+
+
+def test_buildings_below_the_minimum_are_left_out(tmp_path):
+    class LiveIndex:
+        def live_key_for_slug(self, slug):
+            return "chave" if slug == "mar-azul" else None
+
+    builder = SitemapBuilder(output_dir=str(tmp_path), base_url="https://exemplo.com")
+    storage = FakeStorage(inventory(3), buildings=[("mar-azul", datetime(2024, 4, 1)),
+                                                   ("solar-pequeno", datetime(2024, 4, 1))])
+    builder.build(storage, building_index=LiveIndex())
+
+    locs = [loc for name in shard_names(builder) if "buildings" in name for loc, _ in urls(builder, name)]
+    assert locs == ["https://exemplo.com/buildings/mar-azul"]
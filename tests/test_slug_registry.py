@@ -0,0 +1,95 @@
+import pytest
+
+from services.listing import listing_id
+from services.slug_registry import SUFFIX_LENGTH, SlugRegistry
+from services.storage import Storage
+
+BASE = "apartamento-3-quartos-pituba-exclusivo"
+LINKS = [f"https://www.lopes.com.br/imovel/REO{i:07d}" for i in range(3)]
+
+
+def test_collisions_get_a_deterministic_suffix_from_the_link():
+    registry = SlugRegistry()
+    first = registry.assign(LINKS[0], BASE)
+    second = registry.assign(LINKS[1], BASE)
+
+    assert first == BASE
+    assert second == f"{BASE}-{listing_id(LINKS[1])[:SUFFIX_LENGTH]}"
+    assert SlugRegistry().assign(LINKS[1], BASE) == BASE  # sem colisão, sem sufixo
+    assert registry.resolve(second) == (LINKS[1], second)
+
+
+def test_suffix_grows_when_the_short_suffix_is_taken():
+    registry = SlugRegistry()
+    registry.assign(LINKS[0], BASE)
+    short = f"{BASE}-{listing_id(LINKS[1])[:SUFFIX_LENGTH]}"
+    registry.assign(LINKS[2], short)  # outro imóvel ocupa o sufixo curto
+
+    slug = registry.assign(LINKS[1], BASE)
+    assert slug == f"{BASE}-{listing_id(LINKS[1])[:SUFFIX_LENGTH + 2]}"
+    assert registry.resolve(short) == (LINKS[2], short)
+
+
+def test_assign_is_stable_while_the_base_is_unchanged():
+    registry = SlugRegistry()
+    registry.assign(LINKS[0], BASE)
+    slug = registry.assign(LINKS[1], BASE)
+    assert registry.assign(LINKS[1], BASE) == slug
+    assert len(registry) == 2
+
+
+def test_base_change_issues_a_new_slug_and_the_old_one_redirects():
+    registry = SlugRegistry()
+    old = registry.assign(LINKS[0], BASE)
+    registry.track([{'link': LINKS[0], 'preco': 1}])
+    new = registry.assign(LINKS[0], "cobertura-4-quartos-barra-vista-mar")
+
+    assert new != old
+    assert registry.resolve(old) == (LINKS[0], new)
+    listing, active = registry.lookup(old)
+    assert listing == {'link': LINKS[0], 'preco': 1} and active == new
+    # Slug aposentado nunca vai para outro imóvel
+    assert registry.assign(LINKS[1], BASE) != old
+    assert registry.lookup("nunca-emitido") == (None, None)
+
+
+def test_adopt_registers_legacy_slugs_and_rewrites_them():
+    registry = SlugRegistry()
+    properties = [{'link': LINKS[0], 'seo_slug': BASE}, {'link': LINKS[1], 'seo_slug': BASE}, {'link': None}]
+
+    assert registry.adopt(properties) == 2
+    assert properties[0]['seo_slug'] == BASE
+    assert properties[1]['seo_slug'] == f"{BASE}-{listing_id(LINKS[1])[:SUFFIX_LENGTH]}"
+    assert registry.adopt([{'link': LINKS[1], 'seo_slug': BASE}]) == 0
+
+
+def test_flush_and_load_round_trip_through_storage():
+    storage = Storage("sqlite://")
+    registry = SlugRegistry(storage)
+    old = registry.assign(LINKS[0], BASE)
+    collided = registry.assign(LINKS[1], BASE)
+    registry.flush()
+    new = registry.assign(LINKS[0], "casa-4-quartos-horto-florestal")
+    registry.flush()
+    assert registry.flush() == {"inserted": 0, "updated": 0}
+
+    reloaded = SlugRegistry(storage)
+    assert reloaded.load() == 3
+    assert len(reloaded) == 2
+    assert reloaded.resolve(old) == (LINKS[0], new)
+    assert reloaded.assign(LINKS[1], BASE) == collided
+    assert reloaded.assign(LINKS[2], BASE) not in (old, collided)
+
+
+def test_failed_flush_keeps_pending_slugs():
+    class BrokenStorage:
+        def save_slugs(self, slugs):
+            raise RuntimeError("banco fora")
+
+    registry = SlugRegistry(BrokenStorage())
+    registry.assign(LINKS[0], BASE)
+    with pytest.raises(RuntimeError):
+        registry.flush()
+
+    registry.storage = Storage("sqlite://")
+    assert registry.flush()["inserted"] == 1
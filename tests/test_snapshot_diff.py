@@ -0,0 +1,56 @@
+from services.snapshot_diff import DelistingTracker, Snapshot, diff_snapshots
+
+
+def snapshot(*links):
+    return Snapshot.from_prices({link: 100.0 for link in links})
+
+
+def test_missing_counts_survive_a_restart(tmp_path):
+    path = str(tmp_path / "delisting.json")
+    tracker = DelistingTracker(missing_runs=2, path=path)
+    assert tracker.update(snapshot("a", "b"), snapshot("a")) == []
+    tracker.save()
+
+    # Processo reiniciado: a segunda ausência seguida ainda deslista
+    restarted = DelistingTracker(missing_runs=2, path=path)
+    assert len(restarted) == 1
+    assert restarted.update(snapshot("a"), snapshot("a")) == ["b"]
+
+
+def test_diff_reports_added_removed_and_price_moves():
+    old = Snapshot.from_prices({"a": 100.0, "b": 200.0, "c": 300.0, "d": 400.0})
+    new = Snapshot.from_prices({"a": 100.0, "b": 250.0, "c": 280.0, "e": 500.0})
+
+    report = diff_snapshots(old, new)
+
+    assert report['added'] == ["e"]
+    assert report['removed'] == ["d"]
+    assert report['price_up'] == [{'link': "b", 'old_price': 200.0, 'new_price': 250.0}]
+    assert report['price_down'] == [{'link': "c", 'old_price': 300.0, 'new_price': 280.0}]
+    assert report['unchanged_count'] == 1
+
+
+def test_partial_collection_does_not_report_removals():
+    old = Snapshot.from_prices({"a": 100.0, "b": 200.0})
+    report = diff_snapshots(old, Snapshot.from_prices({"a": 90.0}), detect_removed=False)
+    assert report['removed'] == []
+    assert report['price_down'][0]['link'] == "a"
+
+
+def test_merge_keeps_unvisited_links_and_newer_prices():
+    merged = Snapshot.from_prices({"a": 100.0, "b": 200.0}).merge(Snapshot.from_prices({"b": 150.0, "c": 1.0}))
+    assert dict(zip(merged.links.tolist(), merged.prices.tolist())) == {"a": 100.0, "b": 150.0, "c": 1.0}
+
+
+def test_listing_is_delisted_only_after_consecutive_misses():
+    tracker = DelistingTracker(missing_runs=2)
+    full = snapshot("a", "b", "c")
+
+    assert tracker.update(full, snapshot("a", "b")) == []
+    # "c" voltou: o contador zera
+    assert tracker.update(snapshot("a", "b"), full) == []
+    assert len(tracker) == 0
+
+    assert tracker.update(full, snapshot("a")) == []
+    assert sorted(tracker.update(snapshot("a"), snapshot("a"))) == ["b", "c"]
+    assert len(tracker) == 0
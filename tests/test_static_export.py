@@ -0,0 +1,86 @@
+import json
+import os
+
+from services.building_index import building_key, building_slug
+from services.seo.static_export import StaticExporter
+from services.storage import Storage
+
+
+def make_storage():
+    storage = Storage("sqlite://")
+    storage.upsert_properties([{
+        'link': f"https://x/{i}", 'seo_slug': f"apartamento-{i}", 'title': f"Apartamento Edf. Mar Azul - Pituba {i}",
+        'price': 500000 + i, 'photos': [f"https://img/{i}.jpg"], 'location': {'neighborhood': "Pituba"}
+    } for i in range(3)] + [{
+        'link': "https://x/solto", 'seo_slug': "casa-solta", 'title': "Casa em Itapuã", 'price': 1
+    }])
+    storage.upsert_buildings([{'name': "Mar Azul", 'slug': building_slug(building_key("Mar Azul")),
+                               'neighborhood': "Pituba"}])
+    storage.save_slugs([
+        {'slug': "apartamento-0", 'link': "https://x/0", 'base': "apartamento-0", 'active': True},
+        {'slug': "apartamento-antigo", 'link': "https://x/0", 'base': "apartamento-antigo", 'active': False},
+    ])
+    return storage
+
+
+def read(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def test_export_groups_listings_by_building(tmp_path):
+    output = tmp_path / "site"
+    exporter = StaticExporter(str(output), "https://exemplo.com", workers=1, state_dir=str(tmp_path / "state"))
+
+    stats = exporter.export(make_storage())
+
+    building = read(output / "buildings" / "mar-azul" / "index.html")
+    assert "Imóveis disponíveis (3)" in building
+    assert all(f"/imoveis/apartamento-{i}" in building for i in range(3))
+
+    listing = read(output / "imoveis" / "apartamento-0" / "index.html")
+    assert 'href="https://exemplo.com/buildings/mar-azul"' in listing
+    assert 'src="https://img/0.jpg"' in listing
+    assert "/buildings/" not in read(output / "imoveis" / "casa-solta" / "index.html")
+    assert not os.path.exists(output / "redirects.json")
+
+    # Segunda exportação sem mudanças: nada é re-renderizado
+    assert exporter.export(make_storage())['rendered'] == 0
+    assert stats['rendered'] == stats['pages'] == 5
+
+
+def test_publish_copies_into_dist_and_merges_redirects_at_build_time(tmp_path):
+    vercel = tmp_path / "vercel.json"
+    manual = {"source": "/antigo", "destination": "/", "permanent": True}
+    vercel.write_text(json.dumps({"rewrites": [{"source": "/api/(.*)", "destination": "/api/index.py"}],
+                                  "redirects": [manual]}))
+    exporter = StaticExporter(str(tmp_path / "site"), "https://exemplo.com", workers=1,
+                              state_dir=str(tmp_path / "state"))
+    exporter.export(make_storage())
+    # A exportação não altera a configuração de deploy
+    assert "apartamento-antigo" not in vercel.read_text()
+
+    dist = tmp_path / "dist"
+    dist.mkdir()
+    (dist / "index.html").write_text("<div id=root></div>")  # Saída do vite build
+    for _ in range(2):
+        assert exporter.publish(str(dist), str(vercel)) == 1
+
+    assert (dist / "index.html").exists()
+    assert (dist / "imoveis" / "apartamento-0" / "index.html").exists()
+    config = json.loads(vercel.read_text())
+    assert config['rewrites'] == [{"source": "/api/(.*)", "destination": "/api/index.py"}]
+    assert config['redirects'] == [
+        manual, {"source": "/imoveis/apartamento-antigo", "destination": "/imoveis/apartamento-0", "permanent": True}
+    ]
+
+
+def test_building_below_minimum_is_not_exported(tmp_path):
+    storage = make_storage()
+    storage.upsert_properties([{'link': "https://x/2", 'status': 'DELISTED'}])
+    output = tmp_path / "site"
+    StaticExporter(str(output), "https://exemplo.com", workers=1, state_dir=str(tmp_path / "state")).export(storage)
+
+    assert not os.path.exists(output / "buildings" / "mar-azul" / "index.html")
+    assert "/buildings/" not in read(output / "imoveis" / "apartamento-0" / "index.html")
+    assert not any("buildings" in path.name for path in (output / "sitemaps").iterdir())
@@ -0,0 +1,74 @@
+from services.storage import Storage
+
+
+def scraped(link, price=500000.0, **extra):
+    return dict({'link': link, 'title': "Apartamento Pituba", 'price': price,
+                 'location': {'neighborhood': "Pituba"}, 'collected_at': "2024-06-01T10:00:00"}, **extra)
+
+
+def by_link(storage):
+    return {prop['link']: prop for prop in storage.load_properties()}
+
+
+def test_raw_scraped_item_keeps_seo_and_ai_fields():
+    storage = Storage("sqlite://")
+    storage.upsert_properties([scraped(
+        "https://x/1", seo_slug="apartamento-pituba", meta_description="meta", schema_json={'@type': "Offer"},
+        ai_title="Título IA", refined=True
+    )])
+
+    result = storage.upsert_properties([scraped("https://x/1", price=450000.0, status='PRICE_CHANGED')])
+
+    assert result == {"inserted": 0, "updated": 1}
+    prop = by_link(storage)["https://x/1"]
+    assert prop['price'] == 450000.0 and prop['status'] == 'PRICE_CHANGED'
+    assert prop['seo_slug'] == "apartamento-pituba"
+    assert prop['meta_description'] == "meta"
+    assert prop['schema_json'] == {'@type': "Offer"}
+    assert prop['ai_title'] == "Título IA" and prop['refined'] is True
+    assert list(storage.iter_sitemap_properties())[0][0] == "apartamento-pituba"
+
+
+def test_partial_update_keeps_columns():
+    storage = Storage("sqlite://")
+    storage.upsert_properties([scraped("https://x/1", seo_slug="a")])
+    storage.upsert_properties([{'link': "https://x/1", 'status': 'DELISTED'}])
+
+    prop = by_link(storage)["https://x/1"]
+    assert prop['status'] == 'DELISTED' and prop['title'] == "Apartamento Pituba"
+    assert list(storage.iter_sitemap_properties()) == []
+
+
+def test_price_points_from_two_collectors_are_not_duplicated():
+    storage = Storage("sqlite://")
+    assert storage.append_price_points([{'link': "https://x/1", 'price': 100.0, 'date': "2024-06-01T10:00:00"}]) == 1
+    # Segundo coletor observa o mesmo preço (outro horário) e depois a mesma mudança
+    assert storage.append_price_points([
+        {'link': "https://x/1", 'price': 100.0, 'date': "2024-06-01T11:00:00"},
+        {'link': "https://x/1", 'price': 90.0, 'date': "2024-06-02T11:00:00"},
+    ]) == 1
+    assert storage.append_price_points([{'link': "https://x/1", 'price': 90.0, 'date': "2024-06-02T12:00:00"}]) == 0
+
+    history = storage.load_price_history()
+    assert [point['price'] for point in history.get_history("https://x/1")] == [100.0, 90.0]
+
+
+def test_load_delisted_links():
+    storage = Storage("sqlite://")
+    storage.upsert_properties([scraped("https://x/1"), scraped("https://x/2", status='DELISTED')])
+    assert storage.load_delisted_links() == ["https://x/2"]
+
+
+def test_last_price_is_the_most_recent_point_per_link():
+    storage = Storage("sqlite://")
+    storage.append_price_points([
+        {'link': "https://x/1", 'price': 80.0, 'date': "2024-06-03T10:00:00"},
+        {'link': "https://x/2", 'price': 50.0, 'date': "2024-06-01T10:00:00"},
+    ])
+    # Ponto atrasado (mais antigo) gravado depois: o último preço continua sendo o de 03/06
+    storage.append_price_points([{'link': "https://x/1", 'price': 100.0, 'date': "2024-06-01T10:00:00"}])
+
+    assert storage.append_price_points([
+        {'link': "https://x/1", 'price': 80.0, 'date': "2024-06-04T10:00:00"},
+        {'link': "https://x/2", 'price': 55.0, 'date': "2024-06-04T10:00:00"},
+    ]) == 1